@@ -1,8 +1,3 @@
-
-import os
-from datetime import timedelta
-from dotenv import load_dotenv
-
 # Flask imports
 from flask import Flask
 from flask_migrate import Migrate
@@ -11,64 +6,26 @@ from flask_restful import Api
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-
-#resource imports
-from models import db, TokenBlocklist
-from resources.user import UserResources, LoginResource, TokenRefreshResource, UserReportsResource
-from resources.status_update import ReportStatusUpdateResource
-from resources.emergency_contact import EmergencyContactResource
-from resources.report import ReportResource
-from resources.location import LocationResource
-from resources.adminResource import AdminResource
-from resources.user import LogoutResource
-from resources.report import MediaResource
-
-load_dotenv()
-
-
-app = Flask(__name__)
-
-# configuring our flask app through the config object
-ENVIRONMENT = os.environ.get("ENVIRONMENT", "development")
-if ENVIRONMENT == "production":
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("SUPABASE_URL")
-else:
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-
-app.config["SQLALCHEMY_ECHO"] = True
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-# Add upload folder configuration
-app.config["UPLOAD_FOLDER"] = os.path.join(os.getcwd(), "uploads")
-
-# access token and JWT configuration
-app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET")
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=2)
-app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=7)
-app.config["JWT_TOKEN_LOCATION"] = ["cookies", "headers"]
-app.config["JWT_COOKIE_SECURE"] = ENVIRONMENT == "production"
-app.config["JWT_COOKIE_CSRF_PROTECT"] = False  # Disable CSRF for API usage
-app.config["JWT_COOKIE_SAMESITE"] = "Lax"
-app.config["BUNDLE_ERRORS"] = True
-
-# Initialize extensions
-jwt = JWTManager(app)
-bcrypt = Bcrypt(app)
-api = Api(app)
-migrate = Migrate(app, db)
-db.init_app(app)
-
-#Initialize rate limiter
+
+from config import get_config
+from replicas import client_key
+
+# Extensions are created unbound and attached to each app in create_app
+jwt = JWTManager()
+bcrypt = Bcrypt()
+migrate = Migrate()
+
+#Initialize rate limiter, keyed by JWT identity so users behind a shared IP get their own limits
 limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
+    key_func=client_key,
     default_limits=["1000 per day", "100 per hour"]
 )
 
+
 # JWT token revocation callback
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
+    from models import TokenBlocklist
     jti = jwt_payload["jti"]
     token = TokenBlocklist.query.filter_by(jti=jti).first()
     return token is not None
@@ -88,84 +45,110 @@ def invalid_token_callback(error):
 def revoked_token_callback(jwt_header, jwt_payload):
     return {"Success": False, "message": "Token has been revoked"}, 401
 
-# CORS Configuration
-BASE_URL = os.environ.get("BASE_URL")
-
-# CORS setup with proper credentials support
-CORS(
-    app,
-    resources={
-        r"/*": {
-            "origins": [
-                "http://127.0.0.1:5000",
-                "http://localhost:5173",
-                "https://localhost:5173",
-                "https://ajali.vercel.app",  # Production frontend
-                BASE_URL
-            ] if BASE_URL else [
-                "http://127.0.0.1:5000",
-                "http://localhost:5173",
-                "https://localhost:5173",
-                "https://ajali.vercel.app"  # Production frontend
-            ],
-            "supports_credentials": True,
-            "allow_headers": ["Content-Type", "Authorization", "X-CSRF-Token", "Accept"],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "expose_headers": ["Access-Control-Allow-Origin"]
-        }
-    }
-)
 
-# # Test endpoint for debugging
-# @app.route("/test/db")
-# def test_db():
-#     try:
-#         # Test database connection
-#         db.engine.execute("SELECT 1")
-#         return {"status": "success", "message": "Database connection OK"}
-#     except Exception as e:
-#         return {"status": "error", "message": f"Database error: {str(e)}"}, 500
-
-# @app.route("/test/tables")
-# def test_tables():
-#     try:
-#         # Check if tables exist
-#         from sqlalchemy import inspect
-#         inspector = inspect(db.engine)
-#         tables = inspector.get_table_names()
-#         return {"status": "success", "tables": tables}
-#     except Exception as e:
-#         return {"status": "error", "message": f"Table check error: {str(e)}"}, 500
-
-# Resource routes
-api.add_resource(UserResources, "/users", "/users/<int:id>")
-api.add_resource(UserReportsResource, "/users/<int:user_id>/reports")
-# api.add_resource(DebugUserReportsResource, "/debug/users/<int:user_id>/reports")
-api.add_resource(LoginResource, "/login")
-api.add_resource(TokenRefreshResource, "/token/refresh")
-api.add_resource(LogoutResource, "/logout")
-api.add_resource(ReportResource, "/reports", "/reports/<int:report_id>")
-api.add_resource(MediaResource, "/reports/<int:report_id>/media")
-api.add_resource(LocationResource, "/locations", "/locations/<int:location_id>")
-api.add_resource(EmergencyContactResource, "/emergency-contacts", "/emergency-contacts/<int:id>")
-api.add_resource(AdminResource, "/admin/reports", "/admin/reports/<int:report_id>")
-api.add_resource(ReportStatusUpdateResource, "/reports/<int:report_id>/status")
-
-# @app.after_request
-# def after_request(response):
-#     # CORS headers
-#     response.headers.add('Access-Control-Allow-Origin', BASE_URL)
-#     response.headers.add('Access-Control-Allow-Credentials', 'true')
-#     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-CSRF-Token')
-#     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-    
-#     # Security headers
-#     response.headers['X-Content-Type-Options'] = 'nosniff'
-#     response.headers['X-Frame-Options'] = 'DENY'
-#     response.headers['X-XSS-Protection'] = '1; mode=block'
-    
-#     return response
+def create_app(config=None):
+    """
+    Build and configure a Flask application.
+
+    Args:
+        config: A config class/object, an environment name ("development",
+            "production", "testing") or None to use the ENVIRONMENT variable.
+
+    Returns:
+        Flask: The configured application
+    """
+    app = Flask(__name__)
+
+    if config is None or isinstance(config, str):
+        config = get_config(config)
+    app.config.from_object(config)
+
+    from logs import configure_logging
+    configure_logging(app)
+
+    # Initialize extensions
+    from models import db
+    from replicas import configure_replica_binds, init_replica_routing
+    configure_replica_binds(app)
+    db.init_app(app)
+    init_replica_routing(app)
+    jwt.init_app(app)
+    bcrypt.init_app(app)
+    migrate.init_app(app, db)
+    limiter.init_app(app)
+
+    configure_cors(app)
+    register_resources(Api(app))
+
+    from commands import register_commands
+    register_commands(app)
+
+    return app
+
+
+def configure_cors(app):
+    # CORS setup with proper credentials support
+    origins = [
+        "http://127.0.0.1:5000",
+        "http://localhost:5173",
+        "https://localhost:5173",
+        "https://ajali.vercel.app",  # Production frontend
+    ]
+    if app.config.get("BASE_URL"):
+        origins.append(app.config["BASE_URL"])
+
+    CORS(
+        app,
+        resources={
+            r"/*": {
+                "origins": origins,
+                "supports_credentials": True,
+                "allow_headers": ["Content-Type", "Authorization", "X-CSRF-Token", "Accept", "Idempotency-Key", "X-Upload-Token", "X-Request-ID"],
+                "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+                "expose_headers": ["Access-Control-Allow-Origin", "Idempotent-Replayed", "X-Request-ID"]
+            }
+        }
+    )
+
+
+def register_resources(api):
+    # resource imports are deferred until an app is actually built
+    from resources.user import UserResources, LoginResource, TokenRefreshResource, UserReportsResource
+    from resources.status_update import ReportStatusUpdateResource
+    from resources.emergency_contact import EmergencyContactResource, UserEmergencyContactsResource, PanicResource
+    from resources.report import ReportResource
+    from resources.location import LocationResource
+    from resources.adminResource import AdminResource, ReportExportResource, TriageQueueResource
+    from resources.adminResource import ArchivedReportsResource, CacheStatsResource, DeletionJobResource
+    from resources.user import LogoutResource
+    from resources.sync import UserReportChangesResource
+    from resources.subscription import AreaSubscriptionResource
+    from resources.report import MediaResource, MediaUploadResource, MediaStatusResource
+
+    # Resource routes
+    api.add_resource(UserResources, "/users", "/users/<int:id>")
+    api.add_resource(UserReportsResource, "/users/<int:user_id>/reports")
+    api.add_resource(UserReportChangesResource, "/users/<int:user_id>/reports/changes")
+    api.add_resource(LoginResource, "/login")
+    api.add_resource(TokenRefreshResource, "/token/refresh")
+    api.add_resource(LogoutResource, "/logout")
+    api.add_resource(ReportResource, "/reports", "/reports/<int:report_id>")
+    api.add_resource(MediaResource, "/reports/<int:report_id>/media")
+    api.add_resource(MediaUploadResource, "/reports/<int:report_id>/media/uploads")
+    api.add_resource(MediaStatusResource, "/reports/<int:report_id>/media/status")
+    api.add_resource(LocationResource, "/locations", "/locations/<int:location_id>")
+    api.add_resource(EmergencyContactResource, "/emergency-contacts", "/emergency-contacts/<int:id>")
+    api.add_resource(UserEmergencyContactsResource, "/users/<int:user_id>/emergency-contacts")
+    api.add_resource(PanicResource, "/panic")
+    api.add_resource(AdminResource, "/admin/reports", "/admin/reports/<int:report_id>")
+    api.add_resource(ReportExportResource, "/admin/reports/export")
+    api.add_resource(TriageQueueResource, "/admin/queue")
+    api.add_resource(CacheStatsResource, "/admin/cache")
+    api.add_resource(DeletionJobResource, "/admin/deletions", "/admin/deletions/<int:job_id>")
+    api.add_resource(ArchivedReportsResource, "/admin/archive/reports", "/admin/archive/reports/<int:report_id>")
+    api.add_resource(ReportStatusUpdateResource, "/reports/<int:report_id>/status")
+    api.add_resource(AreaSubscriptionResource, "/subscriptions", "/subscriptions/<int:id>")
 
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    create_app().run()
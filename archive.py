@@ -0,0 +1,191 @@
+"""
+Cold archival of closed reports.
+
+Reports whose latest status is closed and that are older than the retention
+window are written to gzipped NDJSON files under ARCHIVE_FOLDER, one file per
+creation month and batch, and then deleted from the hot tables. Each file is
+described by a ReportArchive row so reads only open the files whose id and
+date ranges can match.
+"""
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from models import db, Report, StatusUpdate, ReportArchive
+from media import delete_media_files
+from tasks import enqueue
+
+CLOSED_STATUSES = ("resolved", "rejected")
+
+
+def archive_folder():
+    return current_app.config["ARCHIVE_FOLDER"]
+
+
+def serialize_archived(report):
+    def iso(value):
+        return value.isoformat() if value else None
+
+    location = report.location
+    return {
+        "id": report.id,
+        "user_id": report.user_id,
+        "incident": report.incident,
+        "details": report.details,
+        "latitude": report.latitude,
+        "longitude": report.longitude,
+        "created_at": iso(report.created_at),
+        "updated_at": iso(report.updated_at),
+        "status_history": [
+            {"status": s.status, "updated_by": s.updated_by, "timestamp": iso(s.timestamp)}
+            for s in sorted(report.status_updates, key=lambda s: s.timestamp)
+        ],
+        "location": {
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "address": location.address,
+        } if location else None,
+        "media": [
+            {"media_type": m.media_type, "file_url": m.file_url, "uploaded_at": iso(m.uploaded_at)}
+            for m in report.media_attachments
+        ],
+    }
+
+
+def closed_reports_query(cutoff):
+    latest_status = (
+        select(StatusUpdate.status)
+        .where(StatusUpdate.report_id == Report.id)
+        .order_by(StatusUpdate.timestamp.desc())
+        .limit(1)
+        .correlate(Report)
+        .scalar_subquery()
+    )
+    return Report.query.filter(Report.created_at < cutoff, latest_status.in_(CLOSED_STATUSES))
+
+
+def write_archive_file(month, records):
+    """Write ``records`` to a new gzipped NDJSON file and return its relative path."""
+    relative = os.path.join("reports", month, f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson.gz")
+    path = os.path.join(archive_folder(), relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write under a temporary name so a crash never leaves a truncated archive
+    with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    os.replace(path + ".tmp", path)
+    return relative
+
+
+def archive_reports(older_than=None, batch_size=500, dry_run=False, echo=print):
+    """
+    Move closed reports older than the retention window into archive files.
+
+    Returns:
+        int: Number of reports archived (or that would be, with ``dry_run``)
+    """
+    older_than = older_than or timedelta(days=current_app.config["REPORT_RETENTION_DAYS"])
+    query = closed_reports_query(datetime.utcnow() - older_than)
+    if dry_run:
+        return query.count()
+
+    total = 0
+    while True:
+        reports = (
+            query
+            .options(
+                selectinload(Report.status_updates),
+                selectinload(Report.location),
+                selectinload(Report.media_attachments),
+            )
+            .order_by(Report.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not reports:
+            return total
+
+        by_month = {}
+        for report in reports:
+            by_month.setdefault(f"{report.created_at:%Y-%m}", []).append(report)
+
+        written = []
+        try:
+            for month, month_reports in by_month.items():
+                path = write_archive_file(month, map(serialize_archived, month_reports))
+                written.append(path)
+                db.session.add(ReportArchive(
+                    path=path,
+                    month=month,
+                    report_count=len(month_reports),
+                    min_report_id=min(r.id for r in month_reports),
+                    max_report_id=max(r.id for r in month_reports),
+                    min_created_at=min(r.created_at for r in month_reports),
+                    max_created_at=max(r.created_at for r in month_reports),
+                ))
+            keys = [media.file_url for report in reports for media in report.media_attachments]
+            for report in reports:
+                db.session.delete(report)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for path in written:
+                os.remove(os.path.join(archive_folder(), path))
+            raise
+
+        if keys:
+            enqueue(delete_media_files, keys)
+        total += len(reports)
+        echo(f"archived {len(reports)} report(s) into {len(written)} file(s)")
+
+
+def read_archived(start=None, end=None, report_id=None, user_id=None, incident=None):
+    """
+    Return an iterator of archived report records matching the filters, oldest file first.
+
+    Every matching file is opened and its first record parsed before this
+    returns, so a missing or corrupt archive raises OSError or ValueError
+    here rather than partway through the iteration.
+    """
+    files = ReportArchive.query
+    if start:
+        files = files.filter(ReportArchive.max_created_at >= start)
+    if end:
+        files = files.filter(ReportArchive.min_created_at < end)
+    if report_id is not None:
+        files = files.filter(ReportArchive.min_report_id <= report_id, ReportArchive.max_report_id >= report_id)
+    paths = [
+        os.path.join(archive_folder(), path)
+        for (path,) in files.with_entities(ReportArchive.path).order_by(ReportArchive.min_created_at)
+    ]
+    for path in paths:
+        check_archive(path)
+    return archived_records(paths, start, end, report_id, user_id, incident)
+
+
+def check_archive(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        json.loads(f.readline())
+
+
+def archived_records(paths, start, end, report_id, user_id, incident):
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                created_at = datetime.fromisoformat(record["created_at"])
+                if start and created_at < start:
+                    continue
+                if end and created_at >= end:
+                    continue
+                if report_id is not None and record["id"] != report_id:
+                    continue
+                if user_id is not None and record["user_id"] != user_id:
+                    continue
+                if incident and record["incident"] != incident:
+                    continue
+                yield record
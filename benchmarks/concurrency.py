@@ -0,0 +1,93 @@
+"""
+Compare sync and gevent worker modes under concurrent load.
+
+Start the server in each mode, then point this script at it:
+
+    GUNICORN_WORKER_CLASS=sync   gunicorn -c gunicorn.conf.py wsgi:app
+    GUNICORN_WORKER_CLASS=gevent gunicorn -c gunicorn.conf.py wsgi:app
+
+    python benchmarks/concurrency.py --url http://127.0.0.1:8000 \\
+        --token <admin access token> --report-id 1 --concurrency 50
+
+It exercises the report list (``GET /reports``) and media upload
+(``POST /reports/<id>/media``) routes and prints throughput and latency
+percentiles for each.
+"""
+import argparse
+import os
+import statistics
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def timed(request):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError:
+        status = None
+    return time.perf_counter() - start, status
+
+
+def list_request(args):
+    return urllib.request.Request(
+        f"{args.url}/reports", headers={"Authorization": f"Bearer {args.token}"}
+    )
+
+
+def upload_request(args, payload):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="media"; filename="bench.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return urllib.request.Request(
+        f"{args.url}/reports/{args.report_id}/media",
+        data=body,
+        method="POST",
+        headers={
+            "Authorization": f"Bearer {args.token}",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        },
+    )
+
+
+def run(name, make_request, args):
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: timed(make_request()), range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    failures = sum(1 for _, status in results if status is None or status >= 500)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<8} {args.requests / elapsed:8.1f} req/s  "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p95 {p95 * 1000:7.1f} ms  failures {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--report-id", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--upload-kb", type=int, default=512)
+    args = parser.parse_args()
+
+    payload = os.urandom(args.upload_kb * 1024)
+    run("list", lambda: list_request(args), args)
+    run("upload", lambda: upload_request(args, payload), args)
+
+
+if __name__ == "__main__":
+    main()
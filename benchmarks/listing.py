@@ -0,0 +1,143 @@
+"""
+Compare list endpoint serialization: ORM entities versus Core row tuples.
+
+Seeds a scratch database with synthetic reports (a location for every
+fourth one, a status update for every third), then times building each
+list body both ways at every requested size. The best of several runs is
+reported:
+
+    python benchmarks/listing.py --sizes 10000 100000
+
+Pass ``--database-url`` to run against PostgreSQL instead of a temporary
+SQLite file; its tables are created and then dropped.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import TestingConfig
+from models import db, User, Report, Location, StatusUpdate
+from utils import to_dict_fields
+from resources.adminResource import AdminResource
+import listing
+
+PAGE_SIZE = 100
+
+
+def seed(start, stop, user_id):
+    now = datetime.utcnow()
+    for offset in range(start, stop, 5000):
+        ids = range(offset + 1, min(offset + 5000, stop) + 1)
+        db.session.execute(Report.__table__.insert(), [{
+            "id": i, "user_id": user_id, "incident": ("Fire", "Flood", "Accident")[i % 3],
+            "details": f"Synthetic report {i}", "latitude": -1.0 + i * 1e-6, "longitude": 36.0 + i * 1e-6,
+            "created_at": now - timedelta(minutes=i), "updated_at": now,
+        } for i in ids])
+        db.session.execute(Location.__table__.insert(), [{
+            "report_id": i, "latitude": -1.0, "longitude": 36.0, "address": "Nairobi",
+            "created_at": now, "updated_at": now,
+        } for i in ids if i % 4 == 0])
+        db.session.execute(StatusUpdate.__table__.insert(), [{
+            "report_id": i, "status": "under investigation", "updated_by": "1", "timestamp": now,
+            "created_at": now, "updated_at": now,
+        } for i in ids if i % 3 == 0])
+    db.session.commit()
+
+
+def orm_reports():
+    return json.dumps([to_dict_fields(r, None) for r in Report.query.yield_per(500)])
+
+
+def core_reports():
+    rows, serialize = listing.report_rows(stream=True)
+    return json.dumps([serialize(row) for row in rows])
+
+
+def orm_locations():
+    return json.dumps([to_dict_fields(loc, None) for loc in Location.query.yield_per(500)])
+
+
+def core_locations():
+    rows, serialize = listing.location_rows(stream=True)
+    return json.dumps([serialize(row) for row in rows])
+
+
+def orm_admin_page():
+    resource = AdminResource()
+    reports = Report.query.order_by(Report.id).offset(PAGE_SIZE * 10).limit(PAGE_SIZE + 1).all()
+    return json.dumps([resource.serialize_report(r) for r in reports[:PAGE_SIZE]])
+
+
+def core_admin_page():
+    rows, serialize = listing.admin_report_rows(AdminResource.REPORT_FIELDS, {}, PAGE_SIZE * 10, PAGE_SIZE + 1)
+    return json.dumps([serialize(row) for row in rows][:PAGE_SIZE])
+
+
+def best_of(app, fn, repeats):
+    best = None
+    for _ in range(repeats):
+        with app.test_request_context("/"):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            db.session.remove()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeats", type=int, default=3, help="Best of N runs is reported")
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    scratch = None
+    if not args.database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.database_url = f"sqlite:///{scratch.name}"
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = args.database_url
+        RESPONSE_CACHE_BACKEND = "none"
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(first_name="Bench", last_name="User", email="bench@example.com", password="x",
+                    phone_number="0700000000")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    try:
+        seeded = 0
+        for size in sorted(args.sizes):
+            with app.app_context():
+                seed(seeded, size, user_id)
+            seeded = size
+            print(f"{size} reports")
+            for label, orm, core in (
+                ("GET /reports", orm_reports, core_reports),
+                ("GET /locations", orm_locations, core_locations),
+                (f"GET /admin/reports (page of {PAGE_SIZE})", orm_admin_page, core_admin_page),
+            ):
+                old = best_of(app, orm, args.repeats)
+                new = best_of(app, core, args.repeats)
+                print(f"  {label:<34} orm {old * 1000:9.1f} ms  core {new * 1000:9.1f} ms  ({old / new:.1f}x)")
+    finally:
+        with app.app_context():
+            db.drop_all()
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Check the panic endpoint against its latency SLO, with the database under load.
+
+Start the server, then point this script at it with a regular user's token:
+
+    python benchmarks/panic.py --url http://127.0.0.1:8000 \\
+        --token <user access token> --user-id 1 --load-threads 8
+
+``--load-threads`` background threads keep submitting reports and listing
+them while the panic bundle (``GET /panic``) and the per-user contact list
+(``GET /users/<id>/emergency-contacts``) are timed one request at a time.
+Prints p50/p95/p99 for each and exits non-zero when the panic p99 misses
+``--slo-ms``.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def timed(request):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError:
+        status = None
+    return time.perf_counter() - start, status
+
+
+def percentile(latencies, fraction):
+    return latencies[max(int(len(latencies) * fraction) - 1, 0)]
+
+
+def load(args, stop):
+    headers = {"Authorization": f"Bearer {args.token}", "Content-Type": "application/json"}
+    while not stop.is_set():
+        body = json.dumps({
+            "user_id": args.user_id,
+            "incident": "Benchmark",
+            "details": "Background write load",
+            "latitude": random.uniform(-4.0, 4.0),
+            "longitude": random.uniform(34.0, 41.0),
+        }).encode()
+        timed(urllib.request.Request(f"{args.url}/reports", data=body, method="POST", headers=headers))
+        timed(urllib.request.Request(f"{args.url}/reports", headers=headers))
+
+
+def run(name, path, args):
+    request = urllib.request.Request(f"{args.url}{path}", headers={"Authorization": f"Bearer {args.token}"})
+    results = [timed(request) for _ in range(args.requests)]
+    latencies = sorted(latency for latency, _ in results)
+    failures = sum(1 for _, status in results if status != 200)
+    p99 = percentile(latencies, 0.99)
+    print(f"{name:<9} p50 {percentile(latencies, 0.50) * 1000:7.2f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.2f} ms  "
+          f"p99 {p99 * 1000:7.2f} ms  failures {failures}")
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--load-threads", type=int, default=0, help="Background threads writing and listing reports")
+    parser.add_argument("--slo-ms", type=float, default=5.0, help="Target p99 for GET /panic")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=load, args=(args, stop), daemon=True) for _ in range(args.load_threads)]
+    for thread in threads:
+        thread.start()
+    try:
+        p99 = run("panic", "/panic", args)
+        run("contacts", f"/users/{args.user_id}/emergency-contacts", args)
+    finally:
+        stop.set()
+
+    met = p99 * 1000 <= args.slo_ms
+    print(f"panic p99 {'meets' if met else 'misses'} the {args.slo_ms:g} ms SLO")
+    sys.exit(0 if met else 1)
+
+
+if __name__ == "__main__":
+    main()
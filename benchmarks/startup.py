@@ -0,0 +1,47 @@
+"""
+Measure cold application startup time.
+
+Each sample runs in a fresh interpreter so import caches are not shared:
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({config!r})
+built = time.perf_counter()
+print(imported - start, built - imported)
+"""
+
+
+def sample(config):
+    output = subprocess.check_output(
+        [sys.executable, "-c", SNIPPET.format(config=config)], cwd=ROOT, text=True
+    )
+    return [float(value) for value in output.split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--config", default="testing")
+    args = parser.parse_args()
+
+    samples = [sample(args.config) for _ in range(args.runs)]
+    for label, values in zip(("import app", "create_app()"), zip(*samples)):
+        print(f"{label:<14} median {statistics.median(values) * 1000:8.1f} ms  "
+              f"max {max(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
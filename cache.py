@@ -0,0 +1,259 @@
+"""
+Cache of serialized GET responses, invalidated by generation counters.
+
+Every cached entity type (reports, status updates, ...) has a generation
+counter that is bumped after each commit touching a row of that type. A
+cached response's key includes the current generation of every entity it
+depends on, so a write makes the old entries unreachable at once and they
+simply age out of the LRU. Keys also include the route, query string and
+JWT role; responses for non-admins are keyed by identity too, because their
+handlers apply per-user access checks.
+
+Two backends are provided. ``memory`` is a per-process LRU bounded by entry
+count and bytes, which only sees writes made in the same process. ``redis``
+is shared by every worker and sees every write. Metrics are kept per
+process.
+"""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, g, has_app_context, request
+from flask_jwt_extended import get_jwt
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import User, Report, StatusUpdate, MediaAttachment, Location, EmergencyContact
+
+try:
+    import redis
+except ImportError:  # only needed for RESPONSE_CACHE_BACKEND=redis
+    redis = None
+
+CACHE_ENTITIES = {
+    User: "users",
+    Report: "reports",
+    StatusUpdate: "status_updates",
+    MediaAttachment: "media",
+    Location: "locations",
+    EmergencyContact: "emergency_contacts",
+}
+
+
+class CacheBackend(ABC):
+    """Interface every response cache backend implements."""
+
+    @abstractmethod
+    def get(self, key):
+        """Return the bytes stored under ``key``, or None."""
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove ``key``; missing keys are ignored."""
+
+    @abstractmethod
+    def generations(self, names):
+        """Return the current generation of each entity name, in order."""
+
+    @abstractmethod
+    def bump(self, names):
+        """Advance the generation of each entity name."""
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_entries=10_000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.size = 0
+        self.counters = {}
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.size += len(value)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, value = self.entries.pop(key)
+        self.size -= len(value)
+
+    def generations(self, names):
+        return [self.counters.get(name, 0) for name in names]
+
+    def bump(self, names):
+        with self.lock:
+            for name in names:
+                self.counters[name] = self.counters.get(name, 0) + 1
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared backend. Configure the server with ``maxmemory-policy volatile-lru``:
+    entries carry a TTL and may be evicted, generation counters do not and must not be.
+    """
+
+    def __init__(self, url, prefix="response-cache:"):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def generations(self, names):
+        return [int(value or 0) for value in self.client.mget([f"{self.prefix}gen:{name}" for name in names])]
+
+    def bump(self, names):
+        pipeline = self.client.pipeline()
+        for name in names:
+            pipeline.incr(f"{self.prefix}gen:{name}")
+        pipeline.execute()
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "uncacheable": 0, "invalidations": 0}
+
+    def key(self, depends):
+        claims = get_jwt()
+        role = claims.get("role") or "anonymous"
+        # Non-admin handlers check ownership, so their responses are per user
+        viewer = role if role == "admin" else f"{role}:{claims.get('sub')}"
+        generations = self.backend.generations(depends)
+        versions = ",".join(f"{name}={generation}" for name, generation in zip(depends, generations))
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        return f"{request.path}?{query}|{viewer}|{versions}"
+
+    def invalidate(self, names):
+        self.backend.bump(sorted(names))
+        self.stats["invalidations"] += 1
+
+
+def get_cache(app=None):
+    """Return the app's response cache, or None when RESPONSE_CACHE_BACKEND is "none"."""
+    app = app or current_app
+    if "response_cache" not in app.extensions:
+        backend_name = app.config.get("RESPONSE_CACHE_BACKEND", "memory")
+        if backend_name == "redis":
+            backend = RedisBackend(app.config["REDIS_URL"])
+        elif backend_name == "memory":
+            backend = MemoryBackend(
+                max_entries=app.config.get("RESPONSE_CACHE_MAX_ENTRIES", 10_000),
+                max_bytes=app.config.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+            )
+        else:
+            backend = None
+        app.extensions["response_cache"] = (
+            ResponseCache(backend, app.config.get("RESPONSE_CACHE_TTL", 60)) if backend else None
+        )
+    return app.extensions["response_cache"]
+
+
+def cached_response(*depends, authorize=None):
+    """
+    Cache a GET handler's 200 responses until an entity in ``depends`` changes.
+
+    Apply inside ``jwt_required`` so the key can use the caller's claims.
+    Streamed responses are passed through uncached. A hit skips the handler,
+    so a handler that authorizes against anything but the claims in the key
+    must pass that check as ``authorize``: it runs before every lookup and
+    returns an error response to send instead, or None.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return fn(*args, **kwargs)
+
+            if authorize is not None:
+                denied = authorize()
+                if denied is not None:
+                    return denied
+
+            key = cache.key(depends)
+            body = cache.backend.get(key)
+            if body is not None:
+                cache.stats["hits"] += 1
+                return Response(body, mimetype="application/json", headers={"X-Cache": "HIT"})
+
+            result = fn(*args, **kwargs)
+            if isinstance(result, Response):
+                cache.stats["uncacheable"] += 1
+                return result
+            cache.stats["misses"] += 1
+            data, status = result if isinstance(result, tuple) else (result, 200)
+            body = json.dumps(data).encode()
+            if status == 200:
+                ttl = cache.ttl
+                if g.get("db_replica"):
+                    # A lagging replica may have served pre-write data under the new generation
+                    ttl = min(ttl, current_app.config.get("REPLICA_MAX_LAG", ttl))
+                cache.backend.set(key, body, ttl)
+                cache.stats["stores"] += 1
+            return Response(body, status=status, mimetype="application/json", headers={"X-Cache": "MISS"})
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Session, "after_flush")
+def collect_cache_changes(session, flush_context):
+    changed = session.info.setdefault("cache_changes", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        name = CACHE_ENTITIES.get(type(obj))
+        if name:
+            changed.add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def bump_cache_generations(session):
+    # Bumped only once committed, so a concurrent read cannot re-cache old rows
+    changed = session.info.pop("cache_changes", None)
+    if changed and has_app_context():
+        cache = get_cache()
+        if cache is not None:
+            cache.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_cache_changes(session):
+    session.info.pop("cache_changes", None)
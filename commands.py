@@ -0,0 +1,196 @@
+import click
+from datetime import timedelta
+from flask.cli import AppGroup
+
+media_cli = AppGroup("media", help="Media maintenance commands.")
+
+
+@media_cli.command("finalize-pending")
+def finalize_pending():
+    """Re-run finalization for pending uploads and ones left processing past MEDIA_PROCESSING_TIMEOUT."""
+    from models import MediaUpload
+    from media import finalize_upload, stale_processing
+
+    upload_ids = [
+        upload_id for (upload_id,) in
+        MediaUpload.query.with_entities(MediaUpload.id)
+        .filter((MediaUpload.status == "pending") | stale_processing())
+        .order_by(MediaUpload.id)
+    ]
+    for upload_id in upload_ids:
+        finalize_upload(upload_id)
+    click.echo(f"Finalized {len(upload_ids)} pending upload(s)")
+
+
+@media_cli.command("reconcile")
+@click.option("--delete", is_flag=True, help="Delete orphans instead of only listing them.")
+@click.option("--batch-size", default=1000, show_default=True, help="Stored keys compared per batch.")
+@click.option("--max-batches", type=int, default=None, help="Stop after N batches; the next run resumes from the checkpoint.")
+@click.option("--min-age", default=60, show_default=True, help="Minutes an orphan file must be untouched before it is deleted.")
+@click.option("--restart", is_flag=True, help="Ignore the saved checkpoint and start a new pass.")
+def reconcile(delete, batch_size, max_batches, min_age, restart):
+    """Find orphaned media files and attachment rows whose file is gone."""
+    from models import JobCheckpoint
+    from reconcile import reconcile_media, CHECKPOINT
+
+    if restart:
+        JobCheckpoint.set_value(CHECKPOINT, None)
+    stats = reconcile_media(
+        batch_size=batch_size,
+        max_batches=max_batches,
+        delete=delete,
+        min_age=timedelta(minutes=min_age),
+        echo=click.echo,
+    )
+    click.echo(
+        f"Checked {stats['files']} file(s): {stats['orphan_files']} orphan file(s), "
+        f"{stats['missing_files']} row(s) missing their file, {stats['deleted_files']} file(s) "
+        f"and {stats['deleted_rows']} row(s) deleted"
+        + ("" if stats["complete"] else " (partial pass, run again to continue)")
+    )
+
+
+triage_cli = AppGroup("triage", help="Admin triage queue commands.")
+
+
+@triage_cli.command("rebuild")
+@click.option("--batch-size", default=1000, show_default=True, help="Reports queued per transaction.")
+def rebuild(batch_size):
+    """Rebuild the triage queue from every report still pending, e.g. after changing weights."""
+    from triage import rebuild_queue
+
+    count = rebuild_queue(batch_size=batch_size)
+    click.echo(f"Queued {count} pending report(s)")
+
+
+panic_cli = AppGroup("panic", help="Panic button bundle commands.")
+
+
+@panic_cli.command("rebuild")
+@click.option("--batch-size", default=1000, show_default=True, help="Users written per transaction.")
+def rebuild_panic(batch_size):
+    """Store every user's panic bundle, e.g. after importing users or changing its format."""
+    from panic import rebuild_bundles
+
+    count = rebuild_bundles(batch_size=batch_size)
+    click.echo(f"Rebuilt {count} bundle(s)")
+
+
+partitions_cli = AppGroup("partitions", help="Monthly table partitioning (PostgreSQL only).")
+
+
+def postgres_engine():
+    from models import db
+
+    if db.engine.dialect.name != "postgresql":
+        raise click.ClickException("Partitioning is only supported on PostgreSQL")
+    return db.engine
+
+
+@partitions_cli.command("setup")
+@click.option("--months-ahead", default=3, show_default=True, help="Future monthly partitions to create.")
+def partitions_setup(months_ahead):
+    """Convert the tables to monthly partitions; existing rows stay in a legacy partition. Locks each table while it runs."""
+    from datetime import datetime
+    from partitions import PARTITIONED_TABLES, is_partitioned, convert_table, ensure_partitions, month_start
+
+    # Rows already written this month must still fit in the legacy partition
+    boundary = month_start(datetime.utcnow(), 1)
+    for table, column in PARTITIONED_TABLES.items():
+        with postgres_engine().begin() as conn:
+            if is_partitioned(conn, table):
+                click.echo(f"{table} is already partitioned")
+            else:
+                convert_table(conn, table, column, boundary)
+                click.echo(f"Partitioned {table} by {column}")
+            ensure_partitions(conn, table, months_ahead)
+
+
+@partitions_cli.command("maintain")
+@click.option("--months-ahead", default=3, show_default=True, help="Future monthly partitions to create.")
+def partitions_maintain(months_ahead):
+    """Create upcoming partitions and drop blocklist partitions past the refresh token lifetime; run daily."""
+    from datetime import datetime
+    from flask import current_app
+    from partitions import PARTITIONED_TABLES, is_partitioned, ensure_partitions, drop_partitions_before
+
+    with postgres_engine().begin() as conn:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(conn, table):
+                raise click.ClickException(f"{table} is not partitioned yet, run flask partitions setup")
+            for name in ensure_partitions(conn, table, months_ahead):
+                click.echo(f"Created {name}")
+        # Revoked tokens cannot be used once they would have expired anyway
+        cutoff = datetime.utcnow() - current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+        for name in drop_partitions_before(conn, "token_blocklist", cutoff):
+            click.echo(f"Dropped {name}")
+
+
+reports_cli = AppGroup("reports", help="Report retention commands.")
+
+
+@reports_cli.command("archive")
+@click.option("--older-than-days", type=int, default=None, help="Retention window; defaults to REPORT_RETENTION_DAYS.")
+@click.option("--batch-size", default=500, show_default=True, help="Reports archived per transaction.")
+@click.option("--dry-run", is_flag=True, help="Only count the reports that would be archived.")
+def archive(older_than_days, batch_size, dry_run):
+    """Move closed reports older than the retention window into gzipped NDJSON archives."""
+    from archive import archive_reports
+
+    count = archive_reports(
+        older_than=timedelta(days=older_than_days) if older_than_days is not None else None,
+        batch_size=batch_size,
+        dry_run=dry_run,
+        echo=click.echo,
+    )
+    click.echo(f"{'Would archive' if dry_run else 'Archived'} {count} report(s)")
+
+
+deletions_cli = AppGroup("deletions", help="Background user and report deletion commands.")
+
+
+@deletions_cli.command("resume")
+def resume():
+    """Finish deletion jobs left pending or failed, e.g. after a worker restart."""
+    from deletion import resume_deletion_jobs
+
+    count = resume_deletion_jobs()
+    click.echo(f"Ran {count} unfinished deletion job(s)")
+
+
+@click.command("seed")
+@click.option("--users", default=1000, show_default=True, help="Users to create.")
+@click.option("--reports-per-user", default=5.0, show_default=True, help="Mean reports per user.")
+@click.option("--seed", "seed_value", default=0, show_default=True, help="Random seed; the same seed gives the same data.")
+@click.option("--batch-size", default=5000, show_default=True, help="Users written per transaction.")
+@click.option("--days", default=365, show_default=True, help="Days of report history before --end-date.")
+@click.option("--end-date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Latest timestamp; defaults to today.")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation in production.")
+def seed(users, reports_per_user, seed_value, batch_size, days, end_date, yes):
+    """Bulk insert synthetic users, reports, statuses, locations, contacts and media stubs."""
+    from flask import current_app
+    from seed import seed_data, SEED_PASSWORD
+
+    if current_app.config.get("ENVIRONMENT") == "production" and not yes:
+        click.confirm("This inserts synthetic data into the production database. Continue?", abort=True)
+    inserted = seed_data(
+        users,
+        reports_per_user=reports_per_user,
+        seed=seed_value,
+        batch_size=batch_size,
+        days=days,
+        end=end_date,
+        echo=click.echo,
+    )
+    click.echo(", ".join(f"{count} {table}" for table, count in inserted.items()) + " inserted")
+    click.echo(f"Seeded accounts log in with password {SEED_PASSWORD!r}; run flask triage rebuild and flask panic rebuild")
+
+
+def register_commands(app):
+    app.cli.add_command(media_cli)
+    app.cli.add_command(triage_cli)
+    app.cli.add_command(panic_cli)
+    app.cli.add_command(partitions_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(deletions_cli)
+    app.cli.add_command(seed)
@@ -0,0 +1,139 @@
+import os
+from datetime import timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Config:
+    """Base configuration shared by every environment."""
+
+    ENVIRONMENT = os.environ.get("ENVIRONMENT", "development")
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    # Echo writes synchronously to stdout; LOG_SQL sends statements through the log queue instead
+    SQLALCHEMY_ECHO = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Per-worker connection pool; see "Deployment modes" in the README for sizing
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "30")),
+        "pool_pre_ping": True,
+    }
+
+    # Optional read replicas (comma separated); GET requests read from them
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if uri]
+    READ_YOUR_WRITES_WINDOW = int(os.environ.get("READ_YOUR_WRITES_WINDOW", "5"))  # seconds on the primary after a write
+    REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", "5"))  # seconds behind before a replica is skipped
+    REPLICA_CHECK_INTERVAL = 5  # seconds between replica health checks
+
+    # Add upload folder configuration
+    UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
+
+    # Media storage: "local" (sharded under UPLOAD_FOLDER) or "s3"
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+    S3_BUCKET = os.environ.get("S3_BUCKET")
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # e.g. a local MinIO
+    S3_REGION = os.environ.get("S3_REGION")
+    S3_PREFIX = os.environ.get("S3_PREFIX", "")
+
+    # access token and JWT configuration
+    JWT_SECRET_KEY = os.environ.get("JWT_SECRET")
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=2)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
+    JWT_TOKEN_LOCATION = ["cookies", "headers"]
+    JWT_COOKIE_SECURE = False
+    JWT_COOKIE_CSRF_PROTECT = False  # Disable CSRF for API usage
+    JWT_COOKIE_SAMESITE = "Lax"
+    BUNDLE_ERRORS = True
+
+    # Background tasks run on an in-process thread pool
+    TASK_WORKERS = int(os.environ.get("TASK_WORKERS", "4"))
+    TASKS_EAGER = False
+
+    # Lifetime of the token returned by POST /reports for uploading media
+    UPLOAD_TOKEN_TTL = 15 * 60
+    # An upload left "processing" this long is taken to belong to a dead worker
+    MEDIA_PROCESSING_TIMEOUT = int(os.environ.get("MEDIA_PROCESSING_TIMEOUT", "900"))  # seconds
+
+    # Offline reverse geocoding; leave GAZETTEER_PATH unset to disable
+    GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH")
+    GEOCODER_MAX_DISTANCE_KM = 50
+    GEOCODER_CACHE_PRECISION = 3  # decimals, roughly 100m
+
+    # Serialized GET response cache: "memory" (per worker), "redis" (shared) or "none"
+    RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "30"))  # seconds
+    RESPONSE_CACHE_MAX_ENTRIES = 10_000
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+    # Per-user token buckets on write endpoints: "redis" (shared), "memory" (per worker) or "none"
+    THROTTLE_BACKEND = os.environ.get("THROTTLE_BACKEND", "redis")
+    # name: (burst capacity, tokens refilled per second)
+    THROTTLE_BUCKETS = {
+        "reports": (10, 10 / 3600),  # 10 reports an hour
+        "media_bytes": (50 * 1024 * 1024, 50 * 1024 * 1024 / 3600),  # 50 MB an hour
+        "status_changes": (120, 1),
+    }
+
+    # Seconds a cached listing total is trusted before it is recounted
+    COUNT_CACHE_TTL = int(os.environ.get("COUNT_CACHE_TTL", "60"))
+    COUNT_CACHE_MAX_ENTRIES = int(os.environ.get("COUNT_CACHE_MAX_ENTRIES", "1000"))
+
+    # Closed reports older than the retention window move to gzipped NDJSON archives
+    ARCHIVE_FOLDER = os.environ.get("ARCHIVE_FOLDER", os.path.join(os.getcwd(), "archive"))
+    REPORT_RETENTION_DAYS = int(os.environ.get("REPORT_RETENTION_DAYS", "365"))
+
+    # Reports removed per transaction by background user/report deletion
+    DELETION_BATCH_SIZE = int(os.environ.get("DELETION_BATCH_SIZE", "500"))
+
+    # Structured logs: JSON lines written by a background thread (see logs.py)
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_FILE = os.environ.get("LOG_FILE")  # stdout only when unset
+    LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))  # records buffered before new ones are dropped
+    LOG_PAYLOAD_MAX_BYTES = int(os.environ.get("LOG_PAYLOAD_MAX_BYTES", "2048"))
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.01"))  # DEBUG and SQL records kept
+    LOG_SQL = os.environ.get("LOG_SQL", "false").lower() == "true"
+
+    # Idempotency-Key handling for retried POSTs
+    IDEMPOTENCY_TTL = timedelta(hours=24)
+    IDEMPOTENCY_WAIT_TIMEOUT = 10  # seconds a retry waits for the original request
+    IDEMPOTENCY_LOCK_TIMEOUT = 120  # seconds before an unfinished request is abandoned
+
+    BASE_URL = os.environ.get("BASE_URL")
+
+
+class DevelopmentConfig(Config):
+    LOG_SQL = os.environ.get("LOG_SQL", "true").lower() == "true"
+    THROTTLE_BACKEND = os.environ.get("THROTTLE_BACKEND", "memory")
+
+
+class ProductionConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.environ.get("SUPABASE_URL")
+    JWT_COOKIE_SECURE = True
+
+
+class TestingConfig(Config):
+    """Isolated configuration backed by an in-memory SQLite database."""
+
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    TASKS_EAGER = True
+    JWT_SECRET_KEY = "testing-secret-key-that-is-long-enough"
+    RATELIMIT_ENABLED = False
+    THROTTLE_BACKEND = "none"
+
+
+config_by_name = {
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+    "testing": TestingConfig,
+}
+
+
+def get_config(name=None):
+    """Return the config class for ``name``, defaulting to ``ENVIRONMENT``."""
+    return config_by_name.get(name or Config.ENVIRONMENT, DevelopmentConfig)
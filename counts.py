@@ -0,0 +1,187 @@
+"""
+Row counts for paginated listings, in several price ranges.
+
+- ``exact``: ``COUNT(*)`` with the listing's filters, every time.
+- ``estimated``: PostgreSQL planner statistics (``pg_class.reltuples``, or
+  the row estimate from EXPLAIN when filtered). Other databases fall back to
+  an exact count.
+- ``cached``: an exact count per model and filter combination, kept for
+  COUNT_CACHE_TTL seconds, for at most COUNT_CACHE_MAX_ENTRIES combinations
+  (least recently used go first). Meanwhile committed inserts and deletes in
+  this worker adjust every cached count whose filters match the row.
+- ``none``: no total; pages still report ``has_next``.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from models import db, Report
+
+COUNT_MODES = ("exact", "estimated", "cached", "none")
+
+# Columns whose equality filters have their own cached counts, per model
+COUNTED_MODELS = {Report: ("incident", "user_id")}
+
+
+def filter_clauses(model, filters):
+    return [getattr(model, column) == value for column, value in sorted(filters.items())]
+
+
+def exact_count(model, filters):
+    return db.session.query(func.count()).select_from(model).filter(*filter_clauses(model, filters)).scalar()
+
+
+def estimated_count(model, filters):
+    """Planner estimate on PostgreSQL; None where no estimate is available."""
+    if db.engine.dialect.name != "postgresql":
+        return None
+    if not filters:
+        estimate = db.session.execute(
+            db.text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": model.__tablename__},
+        ).scalar()
+        # -1 (or 0 on older servers) until the table is first analyzed
+        return int(estimate) if estimate and estimate > 0 else None
+    statement = db.select(model.id).filter(*filter_clauses(model, filters))
+    compiled = statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CountCache:
+    def __init__(self, ttl, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.counts = OrderedDict()  # (table, ((column, value), ...)) -> [count, expires_at], least recent first
+        self.lock = threading.Lock()
+
+    def get(self, model, filters):
+        key = (model.__tablename__, tuple(sorted(filters.items())))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.counts.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self.counts.move_to_end(key)
+                    return entry[0]
+                del self.counts[key]
+        count = exact_count(model, filters)
+        with self.lock:
+            self.counts[key] = [count, time.monotonic() + self.ttl]
+            self.counts.move_to_end(key)
+            self.evict(now)
+        return count
+
+    def evict(self, now):
+        # Drop least recently used entries while over the cap or expired; other expired
+        # entries go when they are next looked up or adjusted
+        while self.counts:
+            key, entry = next(iter(self.counts.items()))
+            if entry[1] > now and len(self.counts) <= self.max_entries:
+                break
+            del self.counts[key]
+
+    def clear(self):
+        """Forget every cached count, e.g. after a bulk UPDATE the session hooks cannot see."""
+        with self.lock:
+            self.counts.clear()
+
+    def apply(self, table, row, delta):
+        """Adjust every cached count of ``table`` whose filters match ``row``."""
+        items = sorted(row.items())
+        now = time.monotonic()
+        with self.lock:
+            # The matching filter combinations are the subsets of the row's values
+            for size in range(len(items) + 1):
+                for filters in itertools.combinations(items, size):
+                    entry = self.counts.get((table, filters))
+                    if entry is None:
+                        continue
+                    if entry[1] <= now:
+                        del self.counts[(table, filters)]
+                    else:
+                        entry[0] = max(entry[0] + delta, 0)
+
+
+def get_count_cache(app=None):
+    app = app or current_app
+    if "count_cache" not in app.extensions:
+        app.extensions["count_cache"] = CountCache(
+            app.config.get("COUNT_CACHE_TTL", 60), app.config.get("COUNT_CACHE_MAX_ENTRIES", 1000)
+        )
+    return app.extensions["count_cache"]
+
+
+def count_rows(model, filters, mode):
+    """
+    Count ``model`` rows matching equality ``filters`` using ``mode``.
+
+    Returns:
+        tuple: (count or None, the mode actually used)
+    """
+    if mode == "none":
+        return None, mode
+    if mode == "estimated":
+        estimate = estimated_count(model, filters)
+        if estimate is not None:
+            return estimate, mode
+        mode = "exact"
+    if mode == "cached":
+        return get_count_cache().get(model, filters), mode
+    return exact_count(model, filters), "exact"
+
+
+def counted_values(obj, columns, previous=False):
+    """Filter column values of ``obj``, optionally as they were before this flush."""
+    values = {}
+    state = inspect(obj)
+    for column in columns:
+        history = state.attrs[column].history
+        if previous and history.deleted:
+            values[column] = history.deleted[0]
+        else:
+            values[column] = getattr(obj, column)
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def collect_count_changes(session, flush_context):
+    changes = session.info.setdefault("count_changes", [])
+    for obj in session.new:
+        columns = COUNTED_MODELS.get(type(obj))
+        if columns:
+            changes.append((obj.__tablename__, counted_values(obj, columns), 1))
+    for obj in session.deleted:
+        columns = COUNTED_MODELS.get(type(obj))
+        if columns:
+            changes.append((obj.__tablename__, counted_values(obj, columns, previous=True), -1))
+    for obj in session.dirty:
+        columns = COUNTED_MODELS.get(type(obj))
+        if columns and obj.deleted_at is not None and inspect(obj).attrs.deleted_at.history.added:
+            # Soft-deleted rows are no longer listed
+            changes.append((obj.__tablename__, counted_values(obj, columns, previous=True), -1))
+        elif columns and any(inspect(obj).attrs[column].history.deleted for column in columns):
+            # A row moving between filter values leaves one count and joins another
+            changes.append((obj.__tablename__, counted_values(obj, columns, previous=True), -1))
+            changes.append((obj.__tablename__, counted_values(obj, columns), 1))
+
+
+@event.listens_for(Session, "after_commit")
+def apply_count_changes(session):
+    changes = session.info.pop("count_changes", None)
+    if changes and has_app_context():
+        cache = get_count_cache()
+        for table, row, delta in changes:
+            cache.apply(table, row, delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_count_changes(session):
+    session.info.pop("count_changes", None)
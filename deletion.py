@@ -0,0 +1,178 @@
+"""
+Soft deletion of users and reports, with the heavy lifting in the background.
+
+Deleting sets ``deleted_at`` and commits at once; from then on ORM queries
+leave the row out (see ``hide_soft_deleted`` in models.py), and a deleted
+user's reports are hidden with them. A DeletionJob then removes the rows and
+everything hanging off them with set-based DELETEs, DELETION_BATCH_SIZE
+reports per transaction. Each batch records its media and staged upload
+files in the job in the same transaction, and deletes them once it has
+committed. The job's counters show its progress. Every step can safely run
+again, so ``flask deletions resume`` finishes jobs a dead worker left behind,
+files included.
+"""
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, select, update
+from models import (
+    db, User, Report, Location, MediaAttachment, MediaUpload, StatusUpdate, TriageEntry,
+    EmergencyContact, EmergencyBundle, AreaSubscription, SubscriptionCell, AlertDelivery, DeletionJob,
+)
+from media import delete_media_files, delete_staged_files
+from triage import remove_entry, remove_from_queue
+from tasks import enqueue
+from cache import get_cache
+from counts import get_count_cache
+
+# Tables keyed by report, emptied before the reports themselves
+REPORT_DEPENDENTS = (StatusUpdate, Location, MediaAttachment, MediaUpload, TriageEntry, AlertDelivery)
+
+
+def soft_delete_report(report, requested_by=None):
+    """Hide ``report`` now and queue the removal of its rows and media."""
+    report.deleted_at = datetime.utcnow()
+    remove_from_queue(report.id)
+    job = DeletionJob(entity="report", entity_id=report.id, requested_by=requested_by, total_reports=1)
+    db.session.add(job)
+    db.session.commit()
+    enqueue(run_deletion_job, job.id)
+    return job
+
+
+def soft_delete_user(user, requested_by=None):
+    """Hide ``user`` and their reports now and queue the removal of everything they own."""
+    now = datetime.utcnow()
+    user.deleted_at = now
+    total = db.session.query(Report.id).filter(Report.user_id == user.id).count()
+    # One UPDATE however many reports there are; nothing is loaded into the session
+    db.session.execute(
+        update(Report).where(Report.user_id == user.id, Report.deleted_at.is_(None)).values(deleted_at=now),
+        execution_options={"synchronize_session": False},
+    )
+    # Only pending reports are queued, so there are few entries to dequeue one by one
+    for entry, incident in (
+        db.session.query(TriageEntry, Report.incident)
+        .join(Report, Report.id == TriageEntry.report_id)
+        .filter(Report.user_id == user.id)
+    ):
+        remove_entry(entry, incident)
+    job = DeletionJob(entity="user", entity_id=user.id, requested_by=requested_by, total_reports=total)
+    db.session.add(job)
+    db.session.commit()
+
+    # The session hooks only saw the user change, not the bulk UPDATE
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate({"reports"})
+    get_count_cache().clear()
+
+    enqueue(run_deletion_job, job.id)
+    return job
+
+
+def run_deletion_job(job_id):
+    job = db.session.get(DeletionJob, job_id)
+    if job is None or job.status == "completed":
+        return
+    job.status = "running"
+    job.error = None
+    db.session.commit()
+
+    try:
+        # Files of a batch whose rows were deleted before the last run died
+        delete_pending_files(job)
+        if job.entity == "user":
+            # Soft-deleted (or already removed) users are invisible here
+            if db.session.get(User, job.entity_id) is not None:
+                raise RuntimeError(f"User #{job.entity_id} is not marked as deleted")
+            report_ids = select(Report.id).where(Report.user_id == job.entity_id)
+        else:
+            report_ids = select(Report.id).where(Report.id == job.entity_id, Report.deleted_at.isnot(None))
+
+        batch_size = current_app.config.get("DELETION_BATCH_SIZE", 500)
+        while True:
+            ids = db.session.scalars(
+                report_ids.order_by(Report.id).limit(batch_size).execution_options(include_deleted=True)
+            ).all()
+            if not ids:
+                break
+            delete_reports(job, ids)
+
+        if job.entity == "user":
+            delete_user_rows(job)
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(DeletionJob, job_id)
+        job.status = "failed"
+        job.error = str(e)
+        db.session.commit()
+        raise
+
+
+def delete_reports(job, ids):
+    """Remove one batch of reports and their dependents in a single transaction, then their files."""
+    keys = db.session.scalars(
+        select(MediaAttachment.file_url).where(MediaAttachment.report_id.in_(ids)),
+        execution_options={"include_deleted": True},
+    ).all()
+    staged = db.session.scalars(select(MediaUpload.staging_path).where(MediaUpload.report_id.in_(ids))).all()
+    deleted = 0
+    for model in REPORT_DEPENDENTS:
+        deleted += db.session.execute(
+            delete(model).where(model.report_id.in_(ids)), execution_options={"synchronize_session": False}
+        ).rowcount
+    deleted += db.session.execute(
+        delete(Report).where(Report.id.in_(ids)), execution_options={"synchronize_session": False}
+    ).rowcount
+    job.deleted_reports += len(ids)
+    job.deleted_rows += deleted
+    # Committed with the deletes, so the files are never forgotten once their rows are gone
+    job.pending_files = json.dumps({"keys": keys, "staged": staged})
+    db.session.commit()
+    delete_pending_files(job)
+
+
+def delete_pending_files(job):
+    """Delete the files recorded by the last committed batch."""
+    if not job.pending_files:
+        return
+    files = json.loads(job.pending_files)
+    delete_media_files(files["keys"])
+    delete_staged_files(files["staged"])
+    job.deleted_files += len(files["keys"]) + len(files["staged"])
+    job.pending_files = None
+    db.session.commit()
+
+
+def delete_user_rows(job):
+    user_id = job.entity_id
+    subscriptions = select(AreaSubscription.id).where(AreaSubscription.user_id == user_id)
+    deleted = 0
+    for statement in (
+        delete(AlertDelivery).where(AlertDelivery.user_id == user_id),
+        delete(SubscriptionCell).where(SubscriptionCell.subscription_id.in_(subscriptions)),
+        delete(AreaSubscription).where(AreaSubscription.user_id == user_id),
+        delete(EmergencyContact).where(EmergencyContact.user_id == user_id),
+        delete(EmergencyBundle).where(EmergencyBundle.user_id == user_id),
+        delete(User).where(User.id == user_id),
+    ):
+        deleted += db.session.execute(statement, execution_options={"synchronize_session": False}).rowcount
+    job.deleted_rows += deleted
+    db.session.commit()
+
+
+def resume_deletion_jobs():
+    """Run every job that has not completed; returns how many were run."""
+    job_ids = db.session.scalars(
+        select(DeletionJob.id).where(DeletionJob.status != "completed").order_by(DeletionJob.id)
+    ).all()
+    for job_id in job_ids:
+        try:
+            run_deletion_job(job_id)
+        except Exception as e:
+            current_app.logger.error(f"Deletion job #{job_id} failed: {str(e)}")
+    return len(job_ids)
@@ -0,0 +1,127 @@
+"""
+Offline reverse geocoding against a locally loaded gazetteer.
+
+The gazetteer is either a CSV with ``name,latitude,longitude`` columns (and
+optional ``region``/``country``) or a GeoNames ``cities*.txt`` dump. Places
+are bucketed into a grid of CELL_SIZE degree cells so a lookup only measures
+distances to places in the surrounding cells, and results are memoized by
+coordinates rounded to GEOCODER_CACHE_PRECISION decimals.
+"""
+import csv
+import math
+from functools import lru_cache
+from flask import current_app
+from models import db, Report, Location
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.0
+CELL_SIZE = 0.25  # degrees, about 28km at the equator
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def read_gazetteer(path):
+    """Yield (name, latitude, longitude, region, country) tuples from ``path``."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".txt"):
+            # GeoNames: name=1, latitude=4, longitude=5, country=8, admin1=10
+            for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                yield row[1], float(row[4]), float(row[5]), row[10], row[8]
+        else:
+            for row in csv.DictReader(f):
+                yield (row["name"], float(row["latitude"]), float(row["longitude"]),
+                       row.get("region", ""), row.get("country", ""))
+
+
+class ReverseGeocoder:
+    """Nearest-place lookup over a grid index, memoized by rounded coordinates."""
+
+    def __init__(self, places, max_distance_km=50, precision=3, cache_size=100_000):
+        self.cells = {}
+        for name, lat, lon, region, country in places:
+            address = ", ".join(part for part in (name, region, country) if part)
+            self.cells.setdefault(self.cell(lat, lon), []).append((lat, lon, address))
+        self.max_distance_km = max_distance_km
+        self.max_ring = math.ceil(max_distance_km / (KM_PER_DEGREE * CELL_SIZE)) + 1
+        self.precision = precision
+        self._cached_lookup = lru_cache(maxsize=cache_size)(self.nearest_address)
+
+    @staticmethod
+    def cell(lat, lon):
+        return math.floor(lat / CELL_SIZE), math.floor(lon / CELL_SIZE)
+
+    def reverse(self, lat, lon):
+        """Address of the nearest known place, or None if none is close enough."""
+        return self._cached_lookup(round(lat, self.precision), round(lon, self.precision))
+
+    def nearest_address(self, lat, lon):
+        cell_lat, cell_lon = self.cell(lat, lon)
+        best_distance, best_address = None, None
+        found_ring = None
+        for ring in range(self.max_ring + 1):
+            for cell in self.ring_cells(cell_lat, cell_lon, ring):
+                for place_lat, place_lon, address in self.cells.get(cell, ()):
+                    distance = haversine_km(lat, lon, place_lat, place_lon)
+                    if best_distance is None or distance < best_distance:
+                        best_distance, best_address = distance, address
+            if best_address is not None:
+                # A place one ring further out can still be closer than one found
+                # in a corner of this ring, so always look at one more ring
+                if found_ring is not None:
+                    break
+                found_ring = ring
+        if best_distance is None or best_distance > self.max_distance_km:
+            return None
+        return best_address
+
+    @staticmethod
+    def ring_cells(cell_lat, cell_lon, ring):
+        if ring == 0:
+            yield cell_lat, cell_lon
+            return
+        for d_lat in range(-ring, ring + 1):
+            for d_lon in range(-ring, ring + 1):
+                if max(abs(d_lat), abs(d_lon)) == ring:
+                    yield cell_lat + d_lat, cell_lon + d_lon
+
+
+def get_geocoder(app=None):
+    """Return the app's geocoder, loading the gazetteer on first use (None if unconfigured)."""
+    app = app or current_app
+    if "geocoder" not in app.extensions:
+        path = app.config.get("GAZETTEER_PATH")
+        app.extensions["geocoder"] = ReverseGeocoder(
+            read_gazetteer(path),
+            max_distance_km=app.config.get("GEOCODER_MAX_DISTANCE_KM", 50),
+            precision=app.config.get("GEOCODER_CACHE_PRECISION", 3),
+        ) if path else None
+    return app.extensions["geocoder"]
+
+
+def fill_location_address(location_id):
+    """Background task: fill in a location's missing address."""
+    geocoder = get_geocoder()
+    location = Location.query.get(location_id)
+    if geocoder is None or location is None or location.address:
+        return
+    address = geocoder.reverse(location.latitude, location.longitude)
+    if address:
+        location.address = address
+        db.session.commit()
+
+
+def fill_report_location(report_id):
+    """Background task: give a new report a geocoded Location from its coordinates."""
+    geocoder = get_geocoder()
+    report = Report.query.get(report_id)
+    if geocoder is None or report is None or (report.latitude == 0 and report.longitude == 0):
+        return
+    location = Location.for_report(report.id, report.latitude, report.longitude)
+    if not location.address:
+        location.address = geocoder.reverse(location.latitude, location.longitude)
+    db.session.commit()
@@ -0,0 +1,150 @@
+"""
+Area subscriptions and matching of new reports against them.
+
+Each subscription is registered in every grid cell (CELL_SIZE degrees) its
+bounding box overlaps. A report only has to look up its own cell to find
+candidate subscriptions, which are then tested exactly against the shape.
+"""
+import json
+import math
+from datetime import datetime
+from models import db, Report, AreaSubscription, SubscriptionCell, AlertDelivery
+from geocoding import haversine_km, KM_PER_DEGREE
+
+CELL_SIZE = 0.1  # degrees, about 11km at the equator
+MAX_RADIUS_KM = 200
+MAX_POLYGON_POINTS = 500
+# Caps the cell rows one subscription writes; a 200 km circle needs ~1,400 at the equator
+MAX_CELLS = 4000
+
+
+def cell_key(lat_index, lon_index):
+    return f"{lat_index}:{lon_index}"
+
+
+def point_cell(lat, lon):
+    return cell_key(math.floor(lat / CELL_SIZE), math.floor(lon / CELL_SIZE))
+
+
+def bbox_cell_ranges(min_lat, max_lat, min_lon, max_lon):
+    return (
+        range(math.floor(min_lat / CELL_SIZE), math.floor(max_lat / CELL_SIZE) + 1),
+        range(math.floor(min_lon / CELL_SIZE), math.floor(max_lon / CELL_SIZE) + 1),
+    )
+
+
+def bbox_cells(min_lat, max_lat, min_lon, max_lon):
+    lat_range, lon_range = bbox_cell_ranges(min_lat, max_lat, min_lon, max_lon)
+    return [cell_key(lat_index, lon_index) for lat_index in lat_range for lon_index in lon_range]
+
+
+def circle_bbox(lat, lon, radius_km):
+    d_lat = radius_km / KM_PER_DEGREE
+    # Longitude degrees shrink towards the poles; clamp to avoid dividing by ~0
+    d_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon
+
+
+def point_in_polygon(lat, lon, points):
+    """Ray casting test; ``points`` is a list of [lat, lon] vertices."""
+    inside = False
+    j = len(points) - 1
+    for i in range(len(points)):
+        lat_i, lon_i = points[i]
+        lat_j, lon_j = points[j]
+        if (lon_i > lon) != (lon_j > lon):
+            crossing = (lat_j - lat_i) * (lon - lon_i) / (lon_j - lon_i) + lat_i
+            if lat < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def build_subscription(user_id, data):
+    """
+    Validate a subscription payload and build the (unsaved) model with its cells.
+
+    Returns:
+        tuple: (subscription, error message); subscription is None on error
+    """
+    name = (data.get("name") or "").strip()
+    if not name:
+        return None, "name is required"
+
+    try:
+        if data.get("polygon") is not None:
+            points = [[float(lat), float(lon)] for lat, lon in data["polygon"]]
+            if not 3 <= len(points) <= MAX_POLYGON_POINTS:
+                return None, f"polygon must have between 3 and {MAX_POLYGON_POINTS} points"
+            lats = [lat for lat, _ in points]
+            lons = [lon for _, lon in points]
+            subscription = AreaSubscription(
+                user_id=user_id, name=name, kind="polygon", polygon=json.dumps(points),
+                min_lat=min(lats), max_lat=max(lats), min_lon=min(lons), max_lon=max(lons),
+            )
+        else:
+            lat, lon, radius_km = float(data["latitude"]), float(data["longitude"]), float(data["radius_km"])
+            if not 0 < radius_km <= MAX_RADIUS_KM:
+                return None, f"radius_km must be greater than 0 and at most {MAX_RADIUS_KM}"
+            min_lat, max_lat, min_lon, max_lon = circle_bbox(lat, lon, radius_km)
+            subscription = AreaSubscription(
+                user_id=user_id, name=name, kind="circle",
+                latitude=lat, longitude=lon, radius_km=radius_km,
+                min_lat=min_lat, max_lat=max_lat, min_lon=min_lon, max_lon=max_lon,
+            )
+    except (KeyError, TypeError, ValueError):
+        return None, "Provide either latitude, longitude and radius_km, or a polygon of [latitude, longitude] points"
+
+    bbox = (subscription.min_lat, subscription.max_lat, subscription.min_lon, subscription.max_lon)
+    if not all(math.isfinite(value) for value in bbox):
+        return None, "Coordinates must be finite numbers"
+    if not (-90 <= subscription.min_lat and subscription.max_lat <= 90):
+        return None, "latitude must be between -90 and 90"
+    # Polygon vertices are joined the short way, so a span over 180 degrees wraps the other way round
+    if subscription.min_lon < -180 or subscription.max_lon > 180 or subscription.max_lon - subscription.min_lon > 180:
+        return None, "Areas crossing the antimeridian or wider than 180 degrees of longitude are not supported"
+
+    lat_range, lon_range = bbox_cell_ranges(*bbox)
+    if len(lat_range) * len(lon_range) > MAX_CELLS:
+        return None, "Area is too large; choose a smaller radius or polygon"
+
+    subscription.cells = [SubscriptionCell(cell=cell) for cell in bbox_cells(*bbox)]
+    return subscription, "Subscription is valid"
+
+
+def contains(subscription, lat, lon):
+    if subscription.kind == "circle":
+        return haversine_km(lat, lon, subscription.latitude, subscription.longitude) <= subscription.radius_km
+    return point_in_polygon(lat, lon, json.loads(subscription.polygon))
+
+
+def match_report(report_id):
+    """Background task: queue an alert for every subscription containing the report."""
+    report = Report.query.get(report_id)
+    if report is None or (report.latitude == 0 and report.longitude == 0):
+        return
+
+    candidates = (
+        AreaSubscription.query
+        .join(SubscriptionCell, SubscriptionCell.subscription_id == AreaSubscription.id)
+        .filter(
+            SubscriptionCell.cell == point_cell(report.latitude, report.longitude),
+            AreaSubscription.user_id != report.user_id,
+        )
+        .all()
+    )
+    now = datetime.utcnow()
+    deliveries = [
+        {
+            "subscription_id": subscription.id,
+            "user_id": subscription.user_id,
+            "report_id": report.id,
+            "status": "pending",
+            "created_at": now,
+        }
+        for subscription in candidates
+        if contains(subscription, report.latitude, report.longitude)
+    ]
+    if deliveries:
+        db.session.execute(AlertDelivery.__table__.insert(), deliveries)
+        db.session.commit()
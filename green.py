@@ -0,0 +1,37 @@
+"""
+Cooperative (gevent) support for running the API under green workers.
+
+psycopg2 is a C extension, so gevent's monkey patching cannot make its
+socket I/O yield. Installing a wait callback switches psycopg2 to its
+asynchronous protocol and parks the current greenlet while the database
+is busy, letting the worker serve other requests in the meantime.
+"""
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that yields to the gevent hub."""
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import extensions, OperationalError
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state!r}")
+
+
+def make_psycopg_green():
+    """Install the gevent wait callback for every psycopg2 connection."""
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        # SQLite deployments have nothing to patch
+        return False
+
+    extensions.set_wait_callback(gevent_wait_callback)
+    return True
@@ -0,0 +1,49 @@
+import gc
+import os
+
+# "sync" (default) or "gevent" for cooperative green workers
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+
+if worker_class == "gevent":
+    # Patch before the app (and its database driver) is preloaded below
+    from gevent import monkey
+    monkey.patch_all()
+
+    from green import make_psycopg_green
+    make_psycopg_green()
+
+    # Concurrent requests per worker; database access is still bounded by
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW connections per worker
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "100"))
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:" + os.environ.get("PORT", "8000"))
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+
+# Build the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+
+def when_ready(server):
+    app = server.app.wsgi()
+    if app.config.get("THROTTLE_BACKEND") == "memory" and server.cfg.workers > 1:
+        # Each worker refills its own buckets, so callers get workers x the configured limits
+        server.log.warning(
+            f"THROTTLE_BACKEND=memory keeps separate buckets in each of the {server.cfg.workers} workers; "
+            "set THROTTLE_BACKEND=redis to enforce THROTTLE_BUCKETS across them"
+        )
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far into the permanent generation so the
+    # garbage collector does not touch (and copy) those pages in the children
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Database connections must never be shared across processes
+    from models import db
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, request
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+from replicas import client_key
+
+# Fraction of claims that also purge expired keys, keeping the table bounded
+PURGE_PROBABILITY = 0.01
+POLL_INTERVAL = 0.1
+
+keys = IdempotencyKey.__table__
+
+
+def request_fingerprint():
+    """Hash the method, path and body, so a key reused for another request is caught."""
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n".encode())
+    if request.mimetype == "multipart/form-data":
+        # Multipart boundaries change between retries, so hash the parts instead of the raw body
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{name}={value}\n".encode())
+        for field, file in sorted(request.files.items(multi=True), key=lambda item: (item[0], item[1].filename or "")):
+            digest.update(f"{field}={file.filename}\n".encode())
+            for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
+                digest.update(chunk)
+            file.stream.seek(0)
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def claim(key, scope, fingerprint):
+    """Insert an in-progress row for ``key``; False if it already exists."""
+    now = datetime.utcnow()
+    if random.random() < PURGE_PROBABILITY:
+        purge_expired(now)
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(keys.insert().values(
+                key=key,
+                scope=scope,
+                fingerprint=fingerprint,
+                status="in_progress",
+                created_at=now,
+                expires_at=now + current_app.config["IDEMPOTENCY_TTL"],
+            ))
+        return True
+    except IntegrityError:
+        return False
+
+
+def release(key, scope):
+    with db.engine.begin() as conn:
+        conn.execute(delete(keys).where(keys.c.key == key, keys.c.scope == scope))
+
+
+def store(key, scope, status, body):
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(keys)
+            .where(keys.c.key == key, keys.c.scope == scope)
+            .values(status="completed", response_status=status, response_body=json.dumps(body))
+        )
+
+
+def purge_expired(now=None):
+    with db.engine.begin() as conn:
+        conn.execute(delete(keys).where(keys.c.expires_at < (now or datetime.utcnow())))
+
+
+def split_response(result):
+    """Return (body, status) for a Flask-RESTful view result."""
+    if not isinstance(result, tuple):
+        return result, 200
+    return result[0], result[1] if len(result) > 1 else 200
+
+
+def idempotent(view):
+    """
+    Make a Flask-RESTful method replay its first response for retried requests.
+
+    When the request carries an ``Idempotency-Key`` header, the first request
+    from that caller (JWT identity, or IP address without a token) runs normally and its response is stored. Retries with the same key get
+    the stored response back without re-running the handler, and retries that
+    arrive while the first request is still running wait for it to finish.
+    Server errors (5xx) are not stored so the client can retry them.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return {"Success": False, "message": "Idempotency-Key must be at most 255 characters"}, 400
+
+        # Keys are only unique per caller; another client's key must never replay to us
+        scope = f"{request.method} {request.path} {client_key()}"
+        fingerprint = request_fingerprint()
+        deadline = time.monotonic() + current_app.config["IDEMPOTENCY_WAIT_TIMEOUT"]
+        lock_timeout = timedelta(seconds=current_app.config["IDEMPOTENCY_LOCK_TIMEOUT"])
+
+        while not claim(key, scope, fingerprint):
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(keys).where(keys.c.key == key, keys.c.scope == scope)
+                ).first()
+            now = datetime.utcnow()
+
+            if row is None:
+                continue  # released or purged meanwhile, try to claim again
+            if row.fingerprint != fingerprint:
+                return {"Success": False, "message": "Idempotency-Key was already used for a different request"}, 422
+            if row.status == "completed" and row.expires_at >= now:
+                return json.loads(row.response_body), row.response_status, {"Idempotent-Replayed": "true"}
+            if row.expires_at < now or row.created_at + lock_timeout < now:
+                # Expired response or an abandoned request; free the key and retry
+                release(key, scope)
+                continue
+            if time.monotonic() >= deadline:
+                return {"Success": False, "message": "A request with this Idempotency-Key is still in progress"}, 409
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            result = view(*args, **kwargs)
+        except Exception:
+            release(key, scope)
+            raise
+
+        body, status = split_response(result)
+        if isinstance(body, (dict, list)) and status < 500:
+            store(key, scope, status, body)
+        else:
+            release(key, scope)
+        return result
+
+    return wrapper
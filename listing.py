@@ -0,0 +1,164 @@
+"""
+Core fast path for read-only list endpoints.
+
+List handlers that only serialize their rows skip the ORM: they run plain
+Core SELECTs of the needed columns and turn each row tuple straight into a
+dict, so no entities are built, put in the identity map or tracked by the
+unit of work. Statements are built once per shape (model, fields and
+filters) with bound parameters and kept in a small cache, so later requests
+reuse both the statement object and its compiled SQL.
+
+Rows are serialized exactly as ``to_dict`` would serialize them. Requests
+with ``?include=`` still go through the ORM, which batch loads the
+relationships.
+
+Statements run on ``db.session.connection()`` rather than through the
+session, so replica routing still applies but the ORM soft-delete criteria
+do not: every statement filters on ``deleted_at`` itself.
+"""
+from datetime import datetime
+from sqlalchemy import and_, bindparam, select
+from models import db, Report, Location, StatusUpdate
+from utils import MODEL_FIELDS
+
+# What SerializerMixin.to_dict produces for datetimes
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+STATEMENT_CACHE_SIZE = 256
+
+_statements = {}
+
+
+def cached_statement(key, build):
+    """Return the statement for ``key``, building it on first use."""
+    statement = _statements.get(key)
+    if statement is None:
+        statement = build()
+        # ?fields= makes the number of shapes unbounded; past the cap, build per request
+        if len(_statements) < STATEMENT_CACHE_SIZE:
+            _statements[key] = statement
+    return statement
+
+
+def column_names(model, fields):
+    return tuple(name for name in fields if name in MODEL_FIELDS[model]) if fields else MODEL_FIELDS[model]
+
+
+def format_value(value, datetime_format):
+    if isinstance(value, datetime):
+        return value.isoformat() if datetime_format is None else value.strftime(datetime_format)
+    return value
+
+
+def row_serializer(names, datetime_format=DATETIME_FORMAT):
+    """Build a function turning a row with ``names`` columns into a dict."""
+    def serialize(row):
+        return {name: format_value(value, datetime_format) for name, value in zip(names, row)}
+    return serialize
+
+
+def execute(statement, params, stream=False):
+    connection = db.session.connection()
+    if stream:
+        # Server-side cursor where the driver has one, so rows arrive in batches
+        connection = connection.execution_options(stream_results=True)
+    return connection.execute(statement, params)
+
+
+def report_rows(fields=None, user_id=None, stream=False):
+    """
+    Rows of visible reports, optionally of one user.
+
+    Returns:
+        tuple: (result rows, serializer producing ``to_dict`` output)
+    """
+    names = column_names(Report, fields)
+
+    def build():
+        statement = select(*(getattr(Report, name) for name in names)).where(Report.deleted_at.is_(None))
+        if user_id is not None:
+            statement = statement.where(Report.user_id == bindparam("user_id"))
+        return statement
+
+    statement = cached_statement(("reports", names, user_id is not None), build)
+    params = {"user_id": user_id} if user_id is not None else {}
+    return execute(statement, params, stream), row_serializer(names)
+
+
+def admin_report_rows(fields, filters, offset, limit):
+    """
+    One page of visible reports with each one's latest status, in a single query.
+
+    Args:
+        fields (tuple): Output keys in order; columns plus the computed ``status``
+        filters (dict): Column equality filters
+        offset (int): Rows to skip
+        limit (int): Rows to return
+
+    Returns:
+        tuple: (result rows, serializer producing AdminResource output)
+    """
+    names = column_names(Report, fields)
+    with_status = "status" in fields
+    filter_names = tuple(sorted(filters))
+
+    def build():
+        columns = [getattr(Report, name) for name in names]
+        if with_status:
+            latest = (
+                select(StatusUpdate.status)
+                .where(StatusUpdate.report_id == Report.id)
+                .order_by(StatusUpdate.timestamp.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+            columns.append(latest.label("status"))
+        statement = select(*columns).where(
+            Report.deleted_at.is_(None),
+            *(getattr(Report, name) == bindparam(name) for name in filter_names),
+        )
+        return statement.order_by(Report.id).offset(bindparam("offset")).limit(bindparam("limit"))
+
+    statement = cached_statement(("admin_reports", names, with_status, filter_names), build)
+    rows = execute(statement, {**filters, "offset": offset, "limit": limit})
+
+    serialize_columns = row_serializer(names + (("status",) if with_status else ()), datetime_format=None)
+
+    def serialize(row):
+        data = serialize_columns(row)
+        if with_status and data["status"] is None:
+            data["status"] = "pending"
+        return {name: data[name] for name in fields}
+    return rows, serialize
+
+
+def location_rows(fields=None, stream=False):
+    """
+    Rows of the locations of visible reports, with the report ``to_dict`` embeds when no fields are chosen.
+
+    Returns:
+        tuple: (result rows, serializer producing ``to_dict`` output)
+    """
+    names = column_names(Location, fields)
+    embed_report = fields is None
+    report_names = MODEL_FIELDS[Report]
+
+    def build():
+        columns = [getattr(Location, name) for name in names]
+        if embed_report:
+            columns += [getattr(Report, name).label(f"report_{name}") for name in report_names]
+        return select(*columns).join(Report, and_(Report.id == Location.report_id, Report.deleted_at.is_(None)))
+
+    statement = cached_statement(("locations", names, embed_report), build)
+    serialize_location = row_serializer(names)
+    if not embed_report:
+        return execute(statement, {}, stream), serialize_location
+
+    serialize_report = row_serializer(report_names)
+    split = len(names)
+
+    def serialize(row):
+        data = serialize_location(row[:split])
+        report = row[split:]
+        data["report"] = serialize_report(report)
+        return data
+    return execute(statement, {}, stream), serialize
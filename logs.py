@@ -0,0 +1,199 @@
+"""
+Non-blocking structured logging.
+
+Every record is rendered as one JSON line in the thread that logged it, then
+handed to a bounded in-memory queue. A single listener thread per process
+writes the queue out to stdout (and LOG_FILE if set), so a slow disk or
+pipe never holds up a request. When the queue is full, records are dropped
+and counted rather than waited on; once there is room again a WARNING says
+how many were lost, at most every DROP_REPORT_INTERVAL seconds.
+
+Records logged during a request carry its ``request_id`` (taken from the
+X-Request-ID header, or generated) and its route. A ``payload`` passed via
+``extra`` is serialized and cut to LOG_PAYLOAD_MAX_BYTES. DEBUG records, and
+the SQL statements logged when LOG_SQL is on, are sampled at
+LOG_DEBUG_SAMPLE_RATE.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+REQUEST_ID_HEADER = "X-Request-ID"
+SQL_LOGGER = "sqlalchemy.engine"
+DROP_REPORT_INTERVAL = 60  # seconds between warnings about dropped records
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def cap_payload(payload, limit):
+    """Serialize ``payload`` for a log record, cut to ``limit`` bytes."""
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    encoded = text.encode()
+    if len(encoded) <= limit:
+        return text
+    return encoded[:limit].decode(errors="ignore") + f"...[{len(encoded) - limit} bytes truncated]"
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the current request's id, method and route."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get("request_id")
+            record.method = request.method
+            record.route = request.url_rule.rule if request.url_rule else request.path
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a ``rate`` fraction of DEBUG and SQL statement records."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG and not record.name.startswith(SQL_LOGGER):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, payload_limit):
+        super().__init__()
+        self.payload_limit = payload_limit
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key in RESERVED_ATTRS or key.startswith("_"):
+                continue
+            entry[key] = cap_payload(value, self.payload_limit) if key == "payload" else value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Format in the caller's thread, write in the listener's.
+
+    The listener thread does not survive fork, so each (preforked) worker
+    starts its own queue and listener on the first record it logs.
+    """
+
+    def __init__(self, handlers, maxsize):
+        super().__init__(queue.Queue(maxsize))
+        self.handlers = handlers
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.reported = 0
+        self.reported_at = float("-inf")
+        self.listener = None
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            # A queue inherited across fork may have been locked mid-put by another thread
+            self.queue = queue.Queue(self.maxsize)
+            self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def stop(self):
+        """Flush what is queued and stop the listener."""
+        with self.start_lock:
+            if self.listener is not None and self.pid == os.getpid():
+                self.listener.stop()
+            self.listener = None
+            self.pid = None
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self.reported and time.monotonic() - self.reported_at >= DROP_REPORT_INTERVAL:
+            self.report_dropped()
+
+    def report_dropped(self):
+        lost = self.dropped - self.reported
+        self.reported, self.reported_at = self.dropped, time.monotonic()
+        warning = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Log queue full: dropped %d record(s), %d since startup", (lost, self.dropped), None,
+        )
+        try:
+            self.queue.put_nowait(self.prepare(warning))
+        except queue.Full:
+            pass
+
+    def prepare(self, record):
+        # The JSON line is the message; the listener's handlers write it verbatim
+        message = self.format(record)
+        return logging.makeLogRecord({
+            "name": record.name, "levelno": record.levelno, "levelname": record.levelname, "msg": message,
+        })
+
+
+def output_handlers(app):
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if app.config.get("LOG_FILE"):
+        # Reopens the file when logrotate moves it away
+        handlers.append(WatchedFileHandler(app.config["LOG_FILE"]))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+    return handlers
+
+
+def configure_logging(app):
+    """Route the root logger through the async JSON pipeline and tag records with request ids."""
+    root = logging.getLogger()
+    handler = next((h for h in root.handlers if isinstance(h, AsyncQueueHandler)), None)
+    if handler is None:
+        handler = AsyncQueueHandler(output_handlers(app), app.config.get("LOG_QUEUE_SIZE", 10_000))
+        handler.setFormatter(JsonFormatter(app.config.get("LOG_PAYLOAD_MAX_BYTES", 2048)))
+        handler.addFilter(RequestContextFilter())
+        handler.addFilter(SamplingFilter(app.config.get("LOG_DEBUG_SAMPLE_RATE", 0.01)))
+        root.addHandler(handler)
+        atexit.register(handler.stop)
+    root.setLevel(app.config.get("LOG_LEVEL", "INFO"))
+    app.extensions["log_handler"] = handler
+
+    # Flask's own handler would write synchronously to the WSGI error stream
+    app.logger.removeHandler(default_handler)
+    if app.config.get("LOG_SQL"):
+        logging.getLogger(SQL_LOGGER).setLevel(logging.INFO)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        if g.get("request_id"):
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
@@ -0,0 +1,161 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import update
+from models import db, MediaAttachment, MediaUpload
+from storage import get_storage, new_media_key
+from triage import mark_has_media
+
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "mp4", "avi", "mov", "webm"}
+MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+
+
+def file_extension(filename):
+    return filename.rsplit(".", 1)[1].lower() if filename and "." in filename else None
+
+
+def allowed_file(filename):
+    return file_extension(filename) in ALLOWED_EXTENSIONS
+
+
+def _token_serializer():
+    return URLSafeTimedSerializer(current_app.config["JWT_SECRET_KEY"], salt="report-media-upload")
+
+
+def create_upload_token(report_id):
+    """Short-lived token authorizing media uploads for one report."""
+    return _token_serializer().dumps({"report_id": report_id})
+
+
+def verify_upload_token(token, report_id):
+    """
+    Check that ``token`` is a valid, unexpired upload token for ``report_id``.
+
+    Returns:
+        tuple: (is_valid, message)
+    """
+    try:
+        data = _token_serializer().loads(token, max_age=current_app.config["UPLOAD_TOKEN_TTL"])
+    except SignatureExpired:
+        return False, "Upload token has expired"
+    except BadSignature:
+        return False, "Invalid upload token"
+    if data.get("report_id") != report_id:
+        return False, "Upload token is not valid for this report"
+    return True, "Upload token is valid"
+
+
+def stage_upload(report_id, file):
+    """
+    Write an incoming file to the staging area and record it as pending.
+
+    Only the cheap extension check happens here; size validation and storage
+    are left to ``finalize_upload`` so the request can return immediately.
+    """
+    if not allowed_file(file.filename):
+        return None, "File type not allowed"
+
+    staging_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], "_staging")
+    os.makedirs(staging_dir, exist_ok=True)
+    staging_path = os.path.join(staging_dir, f"{uuid.uuid4()}.{file_extension(file.filename)}")
+    file.save(staging_path)
+
+    upload = MediaUpload(
+        report_id=report_id,
+        filename=file.filename,
+        media_type=file.content_type,
+        staging_path=staging_path,
+        status="pending",
+    )
+    db.session.add(upload)
+    return upload, "File staged successfully"
+
+
+def stale_processing():
+    """Filter for uploads whose worker has held them too long to still be alive."""
+    timeout = timedelta(seconds=current_app.config["MEDIA_PROCESSING_TIMEOUT"])
+    return (MediaUpload.status == "processing") & (MediaUpload.updated_at < datetime.utcnow() - timeout)
+
+
+def claim_upload(upload_id):
+    """Atomically mark an upload processing; False when another worker holds it or it is done."""
+    result = db.session.execute(
+        update(MediaUpload)
+        .where(MediaUpload.id == upload_id, (MediaUpload.status == "pending") | stale_processing())
+        .values(status="processing", updated_at=datetime.utcnow()),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def finalize_upload(upload_id):
+    """Validate a staged upload, move it into place and create its MediaAttachment."""
+    if not claim_upload(upload_id):
+        return
+    upload = MediaUpload.query.get(upload_id)
+
+    try:
+        if not os.path.exists(upload.staging_path):
+            raise ValueError("Staged file is missing")
+        if os.path.getsize(upload.staging_path) > MAX_FILE_SIZE:
+            raise ValueError("File size exceeds 5MB limit")
+
+        key = new_media_key(file_extension(upload.staging_path))
+        get_storage().save_file(key, upload.staging_path)
+
+        media = MediaAttachment(
+            report_id=upload.report_id,
+            media_type=upload.media_type,
+            file_url=key,
+            uploaded_at=datetime.now(),
+        )
+        db.session.add(media)
+        db.session.flush()
+        upload.media_attachment_id = media.id
+        upload.status = "ready"
+        mark_has_media(upload.report_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        upload.status = "failed"
+        upload.error = str(e)
+        db.session.commit()
+        if os.path.exists(upload.staging_path):
+            os.remove(upload.staging_path)
+        current_app.logger.error(f"Failed to finalize media upload #{upload.id}: {str(e)}")
+
+
+def media_status(uploads):
+    """Summarize a report's uploads into a single status."""
+    statuses = {upload.status for upload in uploads}
+    if not statuses:
+        return "none"
+    if statuses & {"pending", "processing"}:
+        return "processing"
+    if "failed" in statuses:
+        return "failed"
+    return "ready"
+
+
+def delete_media_files(keys):
+    """Remove stored media files; run through ``tasks.enqueue`` after the rows are gone."""
+    storage = get_storage()
+    for key in keys:
+        try:
+            storage.delete(key)
+        except Exception as e:
+            current_app.logger.error(f"Error deleting media file {key}: {str(e)}")
+
+
+def delete_staged_files(paths):
+    """Remove staged upload files whose MediaUpload rows are gone; missing files are ignored."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current_app.logger.error(f"Error deleting staged upload {path}: {str(e)}")
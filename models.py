@@ -1,9 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, with_loader_criteria
 from datetime import datetime
 
 # from sqlalchemy.orm import relationship
 from sqlalchemy_serializer import SerializerMixin
+from replicas import RoutingSession
 
 
 naming_convention = {
@@ -15,7 +20,7 @@ naming_convention = {
 }
 
 metadata = MetaData(naming_convention=naming_convention)
-db = SQLAlchemy(metadata=metadata)
+db = SQLAlchemy(metadata=metadata, session_options={"class_": RoutingSession})
 
 
 
@@ -32,9 +37,11 @@ class User(db.Model, SerializerMixin):
         phone_number (str): User's phone number (unique)
         created_at (datetime): Timestamp when user was created
         role (str): User's role (user or admin)
+        deleted_at (datetime): When the user was deleted; set until the
+            background deletion job removes the row
     """
     __tablename__ = "users"
-    serialize_rules = ("-reports", "-emergency_contacts", "-password")
+    serialize_rules = ("-reports", "-emergency_contacts", "-password", "-area_subscriptions", "-deleted_at")
 
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String, nullable=False)
@@ -46,6 +53,7 @@ class User(db.Model, SerializerMixin):
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     role = db.Column(db.String, default="user")
+    deleted_at = db.Column(db.TIMESTAMP, index=True)
     
     @property
     def is_admin(self):
@@ -54,6 +62,7 @@ class User(db.Model, SerializerMixin):
 
     reports = db.relationship("Report", back_populates="user", cascade="all, delete")
     emergency_contacts = db.relationship( "EmergencyContact", back_populates="user", cascade="all, delete" )
+    area_subscriptions = db.relationship("AreaSubscription", back_populates="user", cascade="all, delete")
     # status_updates = db.relationship('StatusUpdates', back_populates='admin', cascade='all, delete')
 
 
@@ -69,23 +78,30 @@ class Report(db.Model, SerializerMixin):
         latitude (float): Latitude coordinate of the incident
         longitude (float): Longitude coordinate of the incident
         created_at (datetime): Timestamp when report was created
+        deleted_at (datetime): When the report was deleted; set until the
+            background deletion job removes the row
     """
     __tablename__ = "reports"
-    serialize_rules = ("-user", "-status_updates", "-media_attachments", "-location")
+    serialize_rules = (
+        "-user", "-status_updates", "-media_attachments", "-location", "-media_uploads", "-triage_entry", "-deleted_at",
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     incident = db.Column(db.String, nullable=False)
     details = db.Column(db.Text, nullable=False)
     latitude = db.Column(db.Float, nullable=False, server_default="0")
     longitude = db.Column(db.Float, nullable=False, server_default="0")
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = db.Column(db.TIMESTAMP, index=True)
 
     user = db.relationship("User", back_populates="reports")
     location = db.relationship( "Location", back_populates="report", uselist=False, cascade="all, delete" )
     media_attachments = db.relationship(  "MediaAttachment", back_populates="report", cascade="all, delete" )
     status_updates = db.relationship('StatusUpdate', back_populates='report', cascade='all, delete')
+    media_uploads = db.relationship("MediaUpload", back_populates="report", cascade="all, delete")
+    triage_entry = db.relationship("TriageEntry", back_populates="report", uselist=False, cascade="all, delete")
 
 class EmergencyContact(db.Model, SerializerMixin):
     """
@@ -112,10 +128,29 @@ class EmergencyContact(db.Model, SerializerMixin):
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     user = db.relationship("User", back_populates="emergency_contacts")
 
 
+class EmergencyBundle(db.Model):
+    """
+    EmergencyBundle model holding a user's pre-serialized panic response.
+    
+    Rebuilt in the same transaction as any change to the user or their
+    emergency contacts, so the panic endpoint only has to return ``body``.
+    
+    Attributes:
+        user_id (int): The user the bundle belongs to
+        body (str): The serialized JSON response
+        updated_at (datetime): When the bundle was last rebuilt
+    """
+    __tablename__ = "emergency_bundles"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    body = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class MediaAttachment(db.Model, SerializerMixin):
     """
     MediaAttachment model representing media files attached to reports.
@@ -135,10 +170,45 @@ class MediaAttachment(db.Model, SerializerMixin):
     uploaded_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False)
+    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False, index=True)
     report = db.relationship("Report", back_populates="media_attachments")
 
 
+class MediaUpload(db.Model, SerializerMixin):
+    """
+    MediaUpload model tracking a file uploaded for a report until it is finalized.
+    
+    Uploads are staged to disk and acknowledged immediately; a background task
+    validates and stores the file and then creates the MediaAttachment.
+    
+    Attributes:
+        id (int): Unique identifier for the upload
+        report_id (int): Foreign key to the report the file belongs to
+        filename (str): Original client file name
+        media_type (str): MIME type sent by the client
+        staging_path (str): Where the raw upload waits to be processed
+        status (str): "pending", "processing", "ready" or "failed"
+        error (str): Why processing failed, if it did
+        media_attachment_id (int): The resulting attachment once ready
+        created_at (datetime): When the upload was received
+    """
+    __tablename__ = "media_uploads"
+    serialize_rules = ("-report", "-staging_path")
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String, nullable=False)
+    media_type = db.Column(db.String, nullable=False)
+    staging_path = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default="pending", index=True)
+    error = db.Column(db.String)
+    media_attachment_id = db.Column(db.Integer)
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False, index=True)
+    report = db.relationship("Report", back_populates="media_uploads")
+
+
 # class StatusReport(db.Model, SerializerMixin):
 #     __tablename__ = "status_reports"
 
@@ -154,6 +224,128 @@ class MediaAttachment(db.Model, SerializerMixin):
 #     # admin = db.relationship('User', back_populates='status_reports_changed')
 
 
+class AreaSubscription(db.Model, SerializerMixin):
+    """
+    AreaSubscription model representing a user's interest in incidents in an area.
+    
+    An area is either a circle (center + radius_km) or a polygon of
+    [latitude, longitude] points stored as JSON. The bounding box is kept so
+    the grid cells in SubscriptionCell can be derived without parsing shapes.
+    
+    Attributes:
+        id (int): Unique identifier for the subscription
+        user_id (int): Foreign key to the subscribing user
+        name (str): Label chosen by the user
+        kind (str): "circle" or "polygon"
+        latitude (float): Circle center latitude
+        longitude (float): Circle center longitude
+        radius_km (float): Circle radius in kilometres
+        polygon (str): JSON list of [latitude, longitude] vertices
+        min_lat, max_lat, min_lon, max_lon (float): Bounding box of the area
+    """
+    __tablename__ = "area_subscriptions"
+    serialize_rules = ("-user", "-cells")
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    kind = db.Column(db.String, nullable=False)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    radius_km = db.Column(db.Float)
+    polygon = db.Column(db.Text)
+    min_lat = db.Column(db.Float, nullable=False)
+    max_lat = db.Column(db.Float, nullable=False)
+    min_lon = db.Column(db.Float, nullable=False)
+    max_lon = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    user = db.relationship("User", back_populates="area_subscriptions")
+    cells = db.relationship("SubscriptionCell", back_populates="subscription", cascade="all, delete")
+
+
+class SubscriptionCell(db.Model):
+    """
+    SubscriptionCell model indexing subscriptions by the grid cells they overlap.
+    
+    Matching a report is then an indexed lookup on the report's own cell
+    followed by an exact shape test on the few candidates.
+    
+    Attributes:
+        id (int): Unique identifier
+        cell (str): Grid cell key, "<lat index>:<lon index>"
+        subscription_id (int): Foreign key to the subscription
+    """
+    __tablename__ = "subscription_cells"
+
+    id = db.Column(db.Integer, primary_key=True)
+    cell = db.Column(db.String, nullable=False, index=True)
+
+    subscription_id = db.Column(db.Integer, db.ForeignKey("area_subscriptions.id"), nullable=False, index=True)
+    subscription = db.relationship("AreaSubscription", back_populates="cells")
+
+
+class AlertDelivery(db.Model):
+    """
+    AlertDelivery model queueing an incident alert for a matched subscription.
+    
+    Attributes:
+        id (int): Unique identifier
+        subscription_id (int): The matched subscription
+        user_id (int): The user to alert
+        report_id (int): The report that triggered the alert
+        status (str): "pending", "sent" or "failed"
+        created_at (datetime): When the alert was queued
+        sent_at (datetime): When the alert was delivered
+    """
+    __tablename__ = "alert_deliveries"
+    __table_args__ = (db.Index("ix_alert_deliveries_status_id", "status", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey("area_subscriptions.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    report_id = db.Column(db.Integer, db.ForeignKey("reports.id", ondelete="CASCADE"), nullable=False)
+    status = db.Column(db.String, nullable=False, default="pending")
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    sent_at = db.Column(db.TIMESTAMP)
+
+
+class TriageEntry(db.Model):
+    """
+    TriageEntry model holding a pending report's place in the admin triage queue.
+    
+    ``priority`` is the base score minus the age weight times the creation
+    time in hours. Ordering by it is the same as ordering by the live score
+    (base + age weight x hours waited), so it never needs rewriting as
+    reports age and the top of the queue is a plain index scan.
+    
+    Attributes:
+        id (int): Unique identifier
+        report_id (int): Foreign key to the queued report (unique)
+        latitude (float): Copy of the report latitude for cluster lookups
+        longitude (float): Copy of the report longitude for cluster lookups
+        severity (float): Weight of the incident type
+        cluster_size (int): Other pending reports nearby when last updated
+        has_media (bool): Whether the report has media attached
+        created_at (datetime): When the report was created
+        priority (float): Time-independent sort key, highest first
+    """
+    __tablename__ = "triage_entries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    latitude = db.Column(db.Float, nullable=False, index=True)
+    longitude = db.Column(db.Float, nullable=False)
+    severity = db.Column(db.Float, nullable=False)
+    cluster_size = db.Column(db.Integer, nullable=False, default=0)
+    has_media = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.TIMESTAMP, nullable=False)
+    priority = db.Column(db.Float, nullable=False, index=True)
+
+    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False, unique=True)
+    report = db.relationship("Report", back_populates="triage_entry")
+
+
 class Location(db.Model, SerializerMixin):
     """
     Location model representing the location of a report.
@@ -164,7 +356,7 @@ class Location(db.Model, SerializerMixin):
         longitude (float): Longitude coordinate
         address (str): Human-readable address (optional)
         created_at (datetime): Timestamp when location was created
-        report_id (int): Foreign key to the report this location belongs to
+        report_id (int): Foreign key to the report this location belongs to (unique)
     """
     __tablename__ = "locations"
 
@@ -175,9 +367,24 @@ class Location(db.Model, SerializerMixin):
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False)
+    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False, unique=True)
     report = db.relationship("Report", back_populates="location")
 
+    @classmethod
+    def for_report(cls, report_id, latitude, longitude):
+        """Return the report's location, creating it at the given coordinates if it has none."""
+        location = cls.query.filter_by(report_id=report_id).first()
+        if location is not None:
+            return location
+        try:
+            with db.session.begin_nested():
+                location = cls(report_id=report_id, latitude=latitude, longitude=longitude)
+                db.session.add(location)
+            return location
+        except IntegrityError:
+            # Another request created it since the lookup; report_id is unique
+            return cls.query.filter_by(report_id=report_id).one()
+
 
 class StatusUpdate(db.Model):
     """
@@ -199,7 +406,7 @@ class StatusUpdate(db.Model):
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False)
+    report_id = db.Column(db.Integer, db.ForeignKey("reports.id"), nullable=False, index=True)
     report = db.relationship('Report', back_populates='status_updates')
 
 class TokenBlocklist(db.Model):
@@ -216,3 +423,289 @@ class TokenBlocklist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, index=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SyncChange(db.Model):
+    """
+    SyncChange model recording every change to a user's synced data.
+    
+    ``seq`` is the sync token handed to offline clients. It is numbered per
+    user under the lock on their SyncCursor row, so a user's changes commit
+    in ``seq`` order and "changes since token N" never skips a change that
+    committed late. Autoincrement ids are allocated at insert time, not at
+    commit, so they cannot serve as the token.
+    
+    Attributes:
+        id (int): Unique change identifier
+        user_id (int): Owner of the changed report (kept after user deletion)
+        seq (int): Position in the user's change log
+        entity (str): One of "report", "status_update" or "media"
+        entity_id (int): Primary key of the changed row
+        operation (str): "upsert" or "delete"
+        created_at (datetime): When the change was recorded
+    """
+    __tablename__ = "sync_changes"
+    __table_args__ = (db.UniqueConstraint("user_id", "seq", name="uq_sync_changes_user_id_seq"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String, nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SyncCursor(db.Model):
+    """
+    SyncCursor model holding the last ``SyncChange.seq`` handed out per user.
+    
+    Writers bump it with an UPDATE, which locks the row until they commit.
+    
+    Attributes:
+        user_id (int): The user whose change log this numbers
+        seq (int): Last sequence number taken
+    """
+    __tablename__ = "sync_cursors"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(db.Model):
+    """
+    IdempotencyKey model storing the first response to a keyed request.
+    
+    Rows start "in_progress" while the original request runs, so concurrent
+    retries can wait for it, and become "completed" once the response is
+    stored. Rows expire after IDEMPOTENCY_TTL and are purged lazily.
+    
+    Attributes:
+        id (int): Unique identifier
+        key (str): Client supplied Idempotency-Key header value
+        scope (str): Method and path the key was used on
+        fingerprint (str): Cheap request fingerprint used to detect key reuse
+        status (str): "in_progress" or "completed"
+        response_status (int): Stored HTTP status code
+        response_body (str): Stored JSON response body
+        created_at (datetime): When the key was first seen
+        expires_at (datetime): When the stored response may be discarded
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (db.UniqueConstraint("key", "scope", name="uq_idempotency_keys_key_scope"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    scope = db.Column(db.String, nullable=False)
+    fingerprint = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default="in_progress")
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ReportArchive(db.Model):
+    """
+    ReportArchive model describing one archive file of closed reports.
+    
+    Attributes:
+        id (int): Unique identifier
+        path (str): File path relative to ARCHIVE_FOLDER
+        month (str): Creation month of the archived reports, as YYYY-MM
+        report_count (int): Number of reports in the file
+        min_report_id (int): Lowest archived report id
+        max_report_id (int): Highest archived report id
+        min_created_at (datetime): Earliest report creation time
+        max_created_at (datetime): Latest report creation time
+        created_at (datetime): When the file was written
+    """
+    __tablename__ = "report_archives"
+
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String, unique=True, nullable=False)
+    month = db.Column(db.String(7), nullable=False, index=True)
+    report_count = db.Column(db.Integer, nullable=False)
+    min_report_id = db.Column(db.Integer, nullable=False)
+    max_report_id = db.Column(db.Integer, nullable=False)
+    min_created_at = db.Column(db.TIMESTAMP, nullable=False)
+    max_created_at = db.Column(db.TIMESTAMP, nullable=False)
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+
+
+class JobCheckpoint(db.Model):
+    """
+    JobCheckpoint model remembering how far an incremental maintenance job got.
+    
+    Attributes:
+        id (int): Unique identifier
+        name (str): Job name (unique)
+        value (str): Opaque resume position, e.g. the last processed key
+        updated_at (datetime): When the checkpoint last moved
+    """
+    __tablename__ = "job_checkpoints"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, unique=True, nullable=False)
+    value = db.Column(db.String)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def get_value(cls, name):
+        checkpoint = cls.query.filter_by(name=name).first()
+        return checkpoint.value if checkpoint else None
+
+    @classmethod
+    def set_value(cls, name, value):
+        checkpoint = cls.query.filter_by(name=name).first()
+        if checkpoint is None:
+            checkpoint = cls(name=name)
+            db.session.add(checkpoint)
+        checkpoint.value = value
+        db.session.commit()
+
+
+class DeletionJob(db.Model, SerializerMixin):
+    """
+    DeletionJob model tracking the background removal of a soft-deleted user or report.
+    
+    Attributes:
+        id (int): Unique identifier
+        entity (str): "user" or "report"
+        entity_id (int): Primary key of the deleted user or report
+        status (str): "pending", "running", "completed" or "failed"
+        requested_by (int): User who asked for the deletion
+        total_reports (int): Reports to remove, counted when the job was created
+        deleted_reports (int): Reports removed so far
+        deleted_rows (int): Rows removed so far across all tables
+        deleted_files (int): Media and staged upload files removed so far
+        pending_files (str): JSON of the files whose rows are already deleted
+            but which are not yet removed; a resumed job removes them first
+        error (str): Why the last run failed
+        created_at (datetime): When the deletion was requested
+        finished_at (datetime): When the job completed
+    """
+    __tablename__ = "deletion_jobs"
+    serialize_rules = ("-pending_files",)
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String, nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String, nullable=False, default="pending", index=True)
+    requested_by = db.Column(db.Integer)
+    total_reports = db.Column(db.Integer, nullable=False, default=0)
+    deleted_reports = db.Column(db.Integer, nullable=False, default=0)
+    deleted_rows = db.Column(db.Integer, nullable=False, default=0)
+    deleted_files = db.Column(db.Integer, nullable=False, default=0)
+    pending_files = db.Column(db.Text)
+    error = db.Column(db.String)
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.TIMESTAMP)
+
+
+SOFT_DELETE_MODELS = (User, Report)
+# Rows owned by a report, hidden along with it until the deletion job removes them
+REPORT_CHILD_MODELS = (Location, MediaAttachment, StatusUpdate)
+
+
+def has_live_report(cls):
+    return select(Report.id).where(Report.id == cls.report_id, Report.deleted_at.is_(None)).exists()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def hide_soft_deleted(execute_state):
+    """
+    Leave soft-deleted users and reports out of ORM queries unless ``include_deleted`` is set.
+
+    Locations, media and status updates of a soft-deleted report are left out too.
+    """
+    if execute_state.is_relationship_load:
+        # With a do_orm_execute hook registered, eager loads inherit the parent
+        # query's yield_per, which selectinload's de-duplication cannot run under
+        if execute_state.execution_options.get("yield_per"):
+            execute_state.update_execution_options(yield_per=None)
+        return
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        # Relationship loads from the results inherit the criteria
+        execute_state.statement = execute_state.statement.options(*(
+            with_loader_criteria(model, model.deleted_at.is_(None), include_aliases=True)
+            for model in SOFT_DELETE_MODELS
+        ), *(
+            with_loader_criteria(model, has_live_report, include_aliases=True)
+            for model in REPORT_CHILD_MODELS
+        ))
+
+
+SYNC_ENTITIES = {Report: "report", StatusUpdate: "status_update", MediaAttachment: "media"}
+
+
+@event.listens_for(Session, "after_flush")
+def record_sync_changes(session, flush_context):
+    """Append a SyncChange row for every synced entity touched by this flush."""
+    # Reports deleted in this flush are already gone from the table, so
+    # resolve their owners from the instances before looking anything up
+    owners = {obj.id: obj.user_id for obj in session.deleted if isinstance(obj, Report)}
+
+    def owner(obj):
+        if isinstance(obj, Report):
+            return obj.user_id
+        if obj.report_id not in owners:
+            owners[obj.report_id] = session.connection().scalar(
+                select(Report.user_id).where(Report.id == obj.report_id)
+            )
+        return owners[obj.report_id]
+
+    changes = []
+    for objects, operation in (
+        (session.new, "upsert"),
+        ([obj for obj in session.dirty if session.is_modified(obj)], "upsert"),
+        (session.deleted, "delete"),
+    ):
+        for obj in objects:
+            entity = SYNC_ENTITIES.get(type(obj))
+            if entity is None:
+                continue
+            user_id = owner(obj)
+            if user_id is None:
+                continue
+            changes.append({
+                "user_id": user_id,
+                "entity": entity,
+                "entity_id": obj.id,
+                # A soft-deleted report is gone as far as clients are concerned
+                "operation": "delete" if getattr(obj, "deleted_at", None) else operation,
+                "created_at": datetime.utcnow(),
+            })
+
+    if changes:
+        connection = session.connection()
+        by_user = {}
+        for change in changes:
+            by_user.setdefault(change["user_id"], []).append(change)
+        # Sorted, so two transactions touching the same users lock them in the same order
+        for user_id in sorted(by_user):
+            first = reserve_sync_seq(connection, user_id, len(by_user[user_id]))
+            for offset, change in enumerate(by_user[user_id]):
+                change["seq"] = first + offset
+        connection.execute(SyncChange.__table__.insert(), changes)
+
+
+def reserve_sync_seq(connection, user_id, count):
+    """Take the next ``count`` sequence numbers of a user's change log; returns the first."""
+    insert = postgresql_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    connection.execute(
+        insert(SyncCursor.__table__).values(user_id=user_id, seq=0).on_conflict_do_nothing(index_elements=["user_id"])
+    )
+    # The row stays locked until this transaction ends, so concurrent writers for the user queue up here
+    last = connection.execute(
+        update(SyncCursor.__table__)
+        .where(SyncCursor.user_id == user_id)
+        .values(seq=SyncCursor.seq + count)
+        .returning(SyncCursor.seq)
+    ).scalar()
+    return last - count + 1
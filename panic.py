@@ -0,0 +1,154 @@
+"""
+Precomputed emergency contact bundles for the panic endpoint.
+
+A user's bundle (their own name and phone number plus every emergency
+contact) is serialized once, whenever the user or one of their contacts
+changes, and stored in ``emergency_bundles``. Serving it is a single primary
+key lookup, or no query at all when the response cache already holds it.
+
+The cached copy is keyed by user alone and replaced once the transaction
+that rebuilt the bundle commits, so writes to other users never evict it.
+Bundles of users created before they existed are written by
+``flask panic rebuild``; until then the panic path builds one without
+storing it.
+"""
+import json
+from datetime import datetime
+from flask import has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db, User, EmergencyContact, EmergencyBundle
+from cache import get_cache
+
+CONTACT_FIELDS = ("id", "name", "relationship", "phone_number", "email", "address")
+
+
+def cache_key(user_id):
+    return f"panic:{user_id}"
+
+
+def build_bundle(connection, user_id):
+    """Serialize the bundle from the current (flushed) rows; None if the user is gone."""
+    user = connection.execute(
+        select(User.id, User.first_name, User.last_name, User.phone_number)
+        .where(User.id == user_id, User.deleted_at.is_(None))
+    ).first()
+    if user is None:
+        return None
+    contacts = connection.execute(
+        select(*(getattr(EmergencyContact, field) for field in CONTACT_FIELDS))
+        .where(EmergencyContact.user_id == user_id)
+        .order_by(EmergencyContact.id)
+    )
+    return json.dumps({
+        "Success": True,
+        "data": {
+            "user": {
+                "id": user.id,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "phone_number": user.phone_number,
+            },
+            "contacts": [dict(zip(CONTACT_FIELDS, row)) for row in contacts],
+            "generated_at": datetime.utcnow().isoformat(),
+        },
+    })
+
+
+def store_bundle(connection, user_id):
+    body = build_bundle(connection, user_id)
+    table = EmergencyBundle.__table__
+    if body is None:
+        connection.execute(table.delete().where(table.c.user_id == user_id))
+        return None
+    values = {"body": body, "updated_at": datetime.utcnow()}
+    updated = connection.execute(table.update().where(table.c.user_id == user_id).values(**values))
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(user_id=user_id, **values))
+    return body
+
+
+def get_bundle(user_id):
+    """Return the serialized bundle as bytes, or None if the user is gone."""
+    cache = get_cache()
+    if cache is not None:
+        body = cache.backend.get(cache_key(user_id))
+        if body is not None:
+            cache.stats["hits"] += 1
+            return body
+        cache.stats["misses"] += 1
+
+    body = db.session.execute(
+        select(EmergencyBundle.body).where(EmergencyBundle.user_id == user_id)
+    ).scalar()
+    if body is None:
+        # Not backfilled yet; built read-only so the panic path never writes
+        body = build_bundle(db.session.connection(), user_id)
+        if body is None:
+            return None
+    body = body.encode()
+    if cache is not None:
+        cache.backend.set(cache_key(user_id), body, cache.ttl)
+        cache.stats["stores"] += 1
+    return body
+
+
+def rebuild_bundles(batch_size=1000):
+    """Store the bundle of every user, e.g. after importing users; returns how many were written."""
+    count = 0
+    last_id = 0
+    while True:
+        connection = db.session.connection(bind_arguments={"bind": db.engine})
+        user_ids = connection.execute(
+            select(User.id).where(User.id > last_id, User.deleted_at.is_(None)).order_by(User.id).limit(batch_size)
+        ).scalars().all()
+        if not user_ids:
+            break
+        bundles = session_bundles(db.session)
+        for user_id in user_ids:
+            bundles[user_id] = store_bundle(connection, user_id)
+        db.session.commit()
+        count += len(user_ids)
+        last_id = user_ids[-1]
+    return count
+
+
+def session_bundles(session):
+    return session.info.setdefault("panic_bundles", {})
+
+
+@event.listens_for(Session, "after_flush")
+def refresh_bundles(session, flush_context):
+    user_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, EmergencyContact):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, User):
+            # A deleted user's bundle is removed rather than rebuilt
+            user_ids.add(obj.id)
+    if user_ids:
+        connection = session.connection()
+        bundles = session_bundles(session)
+        for user_id in user_ids:
+            if user_id is not None:
+                bundles[user_id] = store_bundle(connection, user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def cache_bundles(session):
+    # Only once committed, so a concurrent read cannot see the new body before it is durable
+    bundles = session.info.pop("panic_bundles", None)
+    if bundles and has_app_context():
+        cache = get_cache()
+        if cache is None:
+            return
+        for user_id, body in bundles.items():
+            if body is None:
+                cache.backend.delete(cache_key(user_id))
+            else:
+                cache.backend.set(cache_key(user_id), body.encode(), cache.ttl)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_bundles(session):
+    session.info.pop("panic_bundles", None)
@@ -0,0 +1,111 @@
+"""
+Monthly range partitioning of append-only tables on PostgreSQL.
+
+Converting a table renames it to ``<table>_legacy``, creates a partitioned
+replacement with the same columns, and attaches the legacy table as the
+partition for everything before next month. From then on rows land in
+monthly ``<table>_pYYYY_MM`` partitions, so each index stays a month deep and
+old months can be detached or dropped without a bulk DELETE.
+
+``reports`` itself is not partitioned: PostgreSQL requires the partition key
+in every primary key and unique constraint, and every table referencing
+``reports.id`` would have to carry ``created_at`` as well. Its size is kept in
+check by archiving closed reports instead (see archive.py).
+"""
+import re
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import AddConstraint, CreateIndex
+from models import db
+
+# Table name -> partition key column
+PARTITIONED_TABLES = {
+    "status_updates": "timestamp",
+    "token_blocklist": "created_at",
+}
+
+
+def month_start(moment, offset=0):
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def is_partitioned(conn, table):
+    return conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table},
+    ).first() is not None
+
+
+def convert_table(conn, table, column, boundary):
+    """Turn ``table`` into a partitioned table, keeping its rows in a legacy partition."""
+    legacy = f"{table}_legacy"
+    inspector = inspect(conn)
+    pk_name = inspector.get_pk_constraint(table)["name"]
+    index_names = [index["name"] for index in inspector.get_indexes(table)]
+
+    conn.execute(text(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE'))
+    conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+    # Index names are schema wide, so move the legacy ones out of the way, and
+    # give the legacy table the composite key the partitioned table requires
+    conn.execute(text(f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{pk_name}"'))
+    conn.execute(text(f'ALTER TABLE "{legacy}" ADD CONSTRAINT "{pk_name}_legacy" PRIMARY KEY (id, "{column}")'))
+    for name in index_names:
+        conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name}_legacy"'))
+
+    conn.execute(text(
+        f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE ("{column}")'
+    ))
+    # The partition key has to be part of the primary key
+    conn.execute(text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{pk_name}" PRIMARY KEY (id, "{column}")'))
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": legacy}).scalar()
+    if sequence:
+        conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id'))
+
+    model_table = db.metadata.tables[table]
+    for index in model_table.indexes:
+        conn.execute(CreateIndex(index))
+    for constraint in model_table.foreign_key_constraints:
+        conn.execute(AddConstraint(constraint))
+
+    conn.execute(text(
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" FOR VALUES FROM (MINVALUE) TO (:boundary)'
+    ), {"boundary": boundary})
+
+
+def ensure_partitions(conn, table, months_ahead=3, now=None):
+    """Create the missing monthly partitions up to ``months_ahead`` months out."""
+    now = now or datetime.utcnow()
+    covered = max((upper for _, upper in partitions(conn, table) if upper), default=None)
+    created = []
+    for offset in range(months_ahead + 1):
+        start, end = month_start(now, offset), month_start(now, offset + 1)
+        name = f"{table}_p{start:%Y_%m}"
+        # Skip months the legacy partition (or an earlier run) already covers
+        if covered is None or start >= covered:
+            conn.execute(text(
+                f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (:start) TO (:end)'
+            ), {"start": start, "end": end})
+            created.append(name)
+    return created
+
+
+def partitions(conn, table):
+    """Yield (name, upper bound) for every partition of ``table``."""
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table})
+    for name, bound in rows:
+        match = re.search(r"TO \('([^']+)'\)", bound or "")
+        yield name, datetime.fromisoformat(match.group(1)) if match else None
+
+
+def drop_partitions_before(conn, table, cutoff):
+    """Drop partitions whose rows are all older than ``cutoff``."""
+    dropped = []
+    for name, upper in partitions(conn, table):
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+    return dropped
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from models import db, MediaAttachment, JobCheckpoint
+from storage import get_storage, LocalStorage
+
+CHECKPOINT = "media_reconcile"
+
+
+def sort_column():
+    # Keys are compared as plain byte strings in Python, so make the database
+    # compare them the same way instead of using a locale-aware collation
+    if db.engine.dialect.name == "postgresql":
+        return MediaAttachment.file_url.collate("C")
+    return MediaAttachment.file_url
+
+
+def reconcile_media(batch_size=1000, max_batches=None, delete=False, min_age=timedelta(hours=1), echo=print):
+    """
+    Find (and optionally delete) media files without rows and rows without files.
+
+    Stored keys are streamed in sorted batches and merge-joined against the
+    ``media_attachments`` rows in the same key range, so neither side is ever
+    loaded in full. The last processed key is saved as a checkpoint after each
+    batch; a run limited by ``max_batches`` resumes from there next time, and a
+    run that reaches the end resets the checkpoint for a fresh pass.
+
+    Args:
+        batch_size (int): Keys examined per batch
+        max_batches (int): Stop after this many batches (None for a full pass)
+        delete (bool): Delete orphans instead of only reporting them
+        min_age (timedelta): Orphan files younger than this are left alone, as
+            their row may still be about to commit
+        echo (callable): Receives one line per finding
+
+    Returns:
+        dict: Counters describing the run
+    """
+    storage = get_storage()
+    column = sort_column()
+    stats = {"files": 0, "orphan_files": 0, "missing_files": 0, "deleted_files": 0, "deleted_rows": 0, "complete": False}
+
+    lower = JobCheckpoint.get_value(CHECKPOINT) or None
+    keys = storage.list_keys(start_after=lower)
+    batches = 0
+
+    while True:
+        batch = list(islice(keys, batch_size))
+        upper = batch[-1] if batch else None  # None: storage exhausted, close the range
+
+        # Files of soft-deleted reports are still referenced until their deletion job runs
+        query = db.session.query(MediaAttachment.id, MediaAttachment.file_url).filter(
+            ~MediaAttachment.file_url.startswith("/")
+        ).execution_options(include_deleted=True)
+        if lower is not None:
+            query = query.filter(column > lower)
+        if upper is not None:
+            query = query.filter(column <= upper)
+        rows = query.order_by(column).all()
+
+        row_keys = {file_url for _, file_url in rows}
+        batch_keys = set(batch)
+        orphan_files = [key for key in batch if key not in row_keys]
+        if orphan_files and isinstance(storage, LocalStorage):
+            # Rows created before keys were relative still point at absolute paths
+            legacy = {
+                storage.key_for_path(file_url) for (file_url,) in
+                db.session.query(MediaAttachment.file_url)
+                .filter(MediaAttachment.file_url.in_([storage.path(key) for key in orphan_files]))
+                .execution_options(include_deleted=True)
+            }
+            orphan_files = [key for key in orphan_files if key not in legacy]
+        missing = [(media_id, file_url) for media_id, file_url in rows if file_url not in batch_keys]
+
+        stats["files"] += len(batch)
+        handle_orphan_files(storage, orphan_files, delete, min_age, stats, echo)
+        handle_missing_files(missing, delete, stats, echo)
+
+        if not batch:
+            break
+        lower = upper
+        JobCheckpoint.set_value(CHECKPOINT, lower)
+        batches += 1
+        if max_batches and batches >= max_batches:
+            return stats
+
+    check_legacy_rows(storage, batch_size, delete, stats, echo)
+    JobCheckpoint.set_value(CHECKPOINT, None)
+    stats["complete"] = True
+    return stats
+
+
+def handle_orphan_files(storage, keys, delete, min_age, stats, echo):
+    cutoff = datetime.now(timezone.utc) - min_age
+    for key in keys:
+        stats["orphan_files"] += 1
+        echo(f"orphan file: {key}")
+        if not delete:
+            continue
+        try:
+            if storage.modified_at(key) > cutoff:
+                continue
+            storage.delete(key)
+            stats["deleted_files"] += 1
+        except Exception as e:
+            echo(f"could not delete {key}: {e}")
+
+
+def handle_missing_files(rows, delete, stats, echo):
+    for media_id, file_url in rows:
+        stats["missing_files"] += 1
+        echo(f"missing file for media #{media_id}: {file_url}")
+    if delete and rows:
+        # ORM deletes (rather than a bulk DELETE) so sync clients get tombstones
+        ids = [media_id for media_id, _ in rows]
+        for media in MediaAttachment.query.filter(MediaAttachment.id.in_(ids)).execution_options(include_deleted=True):
+            db.session.delete(media)
+        db.session.commit()
+        stats["deleted_rows"] += len(ids)
+
+
+def check_legacy_rows(storage, batch_size, delete, stats, echo):
+    """Check rows still holding absolute paths, which the key merge cannot see."""
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(MediaAttachment.id, MediaAttachment.file_url)
+            .filter(MediaAttachment.file_url.startswith("/"), MediaAttachment.id > last_id)
+            .execution_options(include_deleted=True)
+            .order_by(MediaAttachment.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        handle_missing_files([row for row in rows if not storage.exists(row[1])], delete, stats, echo)
@@ -0,0 +1,175 @@
+"""
+Read replica routing.
+
+When SQLALCHEMY_REPLICA_URIS is set, each replica becomes a ``replica_<n>``
+bind and GET/HEAD requests are served from a healthy replica, picked at
+random. Everything else stays on the primary:
+
+- writes, including any flush made during a GET
+- background tasks and CLI commands, which run outside a request
+- reads by a client that wrote within READ_YOUR_WRITES_WINDOW seconds, so
+  a user always sees their own changes. Recent writers are remembered per
+  worker by JWT identity (or IP address) and across workers through a
+  short-lived cookie.
+
+Replicas are health checked at most every REPLICA_CHECK_INTERVAL seconds and
+skipped while unreachable or more than REPLICA_MAX_LAG seconds behind. A
+connection error on a replica marks it unhealthy straight away.
+"""
+import random
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import decode_token
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+REPLICA_PREFIX = "replica_"
+STICKY_COOKIE = "read_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Seconds a caught-up replica reports as lag; 0 when it has replayed all it received
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica chosen for the current request."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            replica = g.get("db_replica")
+            if replica:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def configure_replica_binds(app):
+    """Register one bind per replica URI; must run before ``db.init_app``."""
+    uris = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+    if uris:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds.update({f"{REPLICA_PREFIX}{i}": uri for i, uri in enumerate(uris)})
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+
+class ReplicaHealth:
+    def __init__(self, engines, max_lag, interval):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.interval = interval
+        self.healthy = {name: True for name in engines}
+        self.checked_at = {}
+        self.lock = threading.Lock()
+
+    def available(self):
+        """Names of the replicas currently fit to serve reads."""
+        now = time.monotonic()
+        stale = [name for name in self.engines if now - self.checked_at.get(name, float("-inf")) >= self.interval]
+        # One thread re-checks; the others keep using the last known state
+        if stale and self.lock.acquire(blocking=False):
+            try:
+                for name in stale:
+                    self.healthy[name] = self.check(self.engines[name])
+                    self.checked_at[name] = time.monotonic()
+            finally:
+                self.lock.release()
+        return [name for name, healthy in self.healthy.items() if healthy]
+
+    def check(self, engine):
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    lag = conn.execute(POSTGRES_LAG_QUERY).scalar() or 0
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0
+            return float(lag) <= self.max_lag
+        except Exception as e:
+            current_app.logger.warning(f"Read replica {engine.url!r} failed its health check: {str(e)}")
+            return False
+
+    def mark_unhealthy(self, name):
+        self.healthy[name] = False
+        self.checked_at[name] = time.monotonic()
+
+
+class RecentWriters:
+    """Per-worker map of client key to the time their reads may leave the primary."""
+
+    MAX_ENTRIES = 10_000
+
+    def __init__(self):
+        self.until = {}
+
+    def add(self, key, until):
+        if len(self.until) >= self.MAX_ENTRIES:
+            now = time.time()
+            self.until = {k: v for k, v in self.until.items() if v > now}
+        self.until[key] = until
+
+    def is_recent(self, key):
+        return self.until.get(key, 0) > time.time()
+
+
+def client_key():
+    """Who is asking: the JWT identity when a token is present, otherwise the IP address."""
+    token = None
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        token = header[len("Bearer "):]
+    else:
+        token = request.cookies.get(current_app.config.get("JWT_ACCESS_COOKIE_NAME", "access_token_cookie"))
+    if token:
+        try:
+            # Only used to pick a database, so an expired token still identifies the user
+            return f"user:{decode_token(token, allow_expired=True)['sub']}"
+        except Exception:
+            pass
+    return f"ip:{request.remote_addr}"
+
+
+def init_replica_routing(app):
+    """Install the request hooks that route reads; a no-op without replicas."""
+    from models import db
+
+    with app.app_context():
+        engines = {name: engine for name, engine in db.engines.items() if name and name.startswith(REPLICA_PREFIX)}
+    if not engines:
+        return
+
+    health = ReplicaHealth(engines, app.config["REPLICA_MAX_LAG"], app.config["REPLICA_CHECK_INTERVAL"])
+    writers = RecentWriters()
+    app.extensions["replica_health"] = health
+
+    for name, engine in engines.items():
+        def on_error(context, name=name):
+            if context.is_disconnect:
+                health.mark_unhealthy(name)
+        event.listen(engine, "handle_error", on_error)
+
+    @app.before_request
+    def route_reads():
+        g.db_replica = None
+        if request.method not in SAFE_METHODS:
+            return
+        try:
+            sticky = float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        if sticky or writers.is_recent(client_key()):
+            return
+        replicas = health.available()
+        if replicas:
+            g.db_replica = random.choice(replicas)
+
+    @app.after_request
+    def remember_writes(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            window = app.config["READ_YOUR_WRITES_WINDOW"]
+            until = time.time() + window
+            writers.add(client_key(), until)
+            response.set_cookie(STICKY_COOKIE, str(int(until) + 1), max_age=window, httponly=True, samesite="Lax")
+        return response
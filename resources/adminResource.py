@@ -1,10 +1,25 @@
-from flask_restful import Resource, reqparse
-from flask import current_app, request
+from flask_restful import Resource
+from flask import current_app, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, select
 from models import db
 from models import User
-from models import Report
+from models import Report, Location, MediaAttachment, StatusUpdate, TriageEntry, DeletionJob
+from utils import parse_includes, include_options, serialize_includes
+from utils import parse_fields, fields_options, parse_date
+from triage import top_entries, live_score, sync_queue
+from archive import read_archived
+from schemas import Schema, Field, ValidationError
+from cache import cached_response, get_cache
+from counts import COUNT_MODES, count_rows
+from deletion import soft_delete_report
+from throttle import throttle
+from listing import admin_report_rows
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timezone
+import csv
+import io
+import json
 #from utils import send_email_notification
 # from utils import send_sms_notification  # Uncomment if implemented
 
@@ -14,32 +29,91 @@ def is_admin(user_id):
     return user and user.role == "admin"
 
 
+def require_admin():
+    """A 403 unless the caller is still an admin in the database, whatever their token says."""
+    if not is_admin(get_jwt_identity()):
+        return {"Success": False, "message": "Admin access required"}, 403
+    return None
+
+
 class AdminResource(Resource):
+    REPORT_FIELDS = (
+        "id", "incident", "details", "latitude", "longitude", "status",
+        "created_at", "updated_at", "user_id",
+    )
+    patch_schema = Schema(
+        status=Field(
+            str, required=True, message="Status is required",
+            choices=("pending", "under investigation", "rejected", "resolved"),
+        ),
+    )
+
     @jwt_required()
+    @cached_response("reports", "status_updates", "media", "locations", authorize=require_admin)
     def get(self, report_id=None):
         try:
-            current_user = get_jwt_identity()
+            denied = require_admin()
+            if denied:
+                return denied
 
-            if not is_admin(current_user):
-                return {"Success": False, "message": "Admin access required"}, 403
+            try:
+                includes = parse_includes(request.args.get("include"))
+                fields = parse_fields(request.args.get("fields"), Report, extra=("status",))
+            except ValueError as e:
+                return {"Success": False, "message": str(e)}, 400
+            query = Report.query.options(*include_options(includes), *fields_options(Report, fields))
 
             if report_id:
-                report = Report.query.get(report_id)
+                report = query.get(report_id)
                 if not report:
                     return {"Success": False, "message": "Report not found"}, 404
-                return {"Success": True, "data": self.serialize_report(report)}, 200
-
-            page = request.args.get("page", default=1, type=int)
-            per_page = min(request.args.get("per_page", default=10, type=int), 100)
-
-            reports = Report.query.paginate(
-                page=page, per_page=per_page, error_out=False
-            ).items
-            return {"Success": True, "data": {"reports": [self.serialize_report(r) for r in reports]}}, 200
+                return {"Success": True, "data": self.serialize_report(report, includes, fields)}, 200
+
+            page = max(request.args.get("page", default=1, type=int), 1)
+            per_page = min(max(request.args.get("per_page", default=10, type=int), 1), 100)
+            count_mode = request.args.get("count", default="cached")
+            if count_mode not in COUNT_MODES:
+                return {"Success": False, "message": f"count must be one of {list(COUNT_MODES)}"}, 400
+
+            filters = {}
+            if request.args.get("incident"):
+                filters["incident"] = request.args["incident"]
+            if request.args.get("user_id"):
+                user_id = request.args.get("user_id", type=int)
+                if user_id is None:
+                    return {"Success": False, "message": "user_id must be an integer"}, 400
+                filters["user_id"] = user_id
+
+            # One extra row tells whether there is a next page without counting
+            offset = (page - 1) * per_page
+            if includes:
+                rows = query.filter_by(**filters).order_by(Report.id).offset(offset).limit(per_page + 1).all()
+                reports = [self.serialize_report(r, includes, fields) for r in rows]
+            else:
+                # Latest statuses come from the same query; no entities are built
+                rows, serialize = admin_report_rows(fields or self.REPORT_FIELDS, filters, offset, per_page + 1)
+                reports = [serialize(row) for row in rows]
+            has_next = len(reports) > per_page
+            total, count_mode = count_rows(Report, filters, count_mode)
+            return {
+                "Success": True,
+                "data": {
+                    "reports": reports[:per_page],
+                    "pagination": {
+                        "page": page,
+                        "per_page": per_page,
+                        "has_next": has_next,
+                        "total": total,
+                        "pages": -(-total // per_page) if total is not None else None,
+                        "count_mode": count_mode,
+                    },
+                },
+            }, 200
         except Exception as e:
             current_app.logger.error(f"Error fetching reports: {str(e)}")
             return {"Success": False, "message": "An error occurred while fetching reports"}, 500
 
+    @throttle("status_changes")
     @jwt_required()
     def patch(self, report_id):
         try:
@@ -52,22 +126,25 @@ class AdminResource(Resource):
             if not report:
                 return {"Success": False, "message": "Report not found"}, 404
 
-            parser = reqparse.RequestParser()
-            parser.add_argument("status", required=True, help="Status is required")
-            args = parser.parse_args()
-
-            valid_statuses = ["pending", "under investigation", "rejected", "resolved"]
-            if args["status"] not in valid_statuses:
-                return {"Success": False, "message": "Invalid status"}, 400
+            try:
+                args = self.patch_schema.load(request.get_json(silent=True))
+            except ValidationError as e:
+                return e.to_dict(), 400
 
-            # Note: Report model doesn't have a status field, status is tracked via StatusUpdate
-            # For now, we'll just update the updated_at timestamp
+            # Report model doesn't have a status field, status is tracked via StatusUpdate
+            old_status = self.latest_status(report)
+            new_status = args["status"]
+            db.session.add(StatusUpdate(
+                report_id=report.id,
+                updated_by=current_user,
+                status=new_status,
+                timestamp=datetime.now(),
+            ))
             report.updated_at = datetime.now(timezone.utc)
+            # Setting a report back to pending returns it to the triage queue
+            sync_queue(report, new_status)
             db.session.commit()
 
-            old_status = "unknown"  # Since we don't have old status in Report model
-            new_status = args["status"]
-
             # self.notify_user(report, old_status, new_status)
 
             current_app.logger.info(
@@ -80,7 +157,7 @@ class AdminResource(Resource):
                 "data": {
                     "report": {
                         "id": report.id,
-                        "status": report.status,
+                        "status": new_status,
                         "user_id": report.user_id,
                     }
                 }
@@ -105,35 +182,41 @@ class AdminResource(Resource):
             if not report:
                 return {"Success": False, "message": "Report not found"}, 404
 
-            db.session.delete(report)
-            db.session.commit()
-            current_app.logger.info(f"Admin {current_user} deleted report #{report.id}")
+            job = soft_delete_report(report, requested_by=int(current_user))
+            current_app.logger.info(f"Admin {current_user} deleted report #{report_id}")
 
-            return {"Success": True, "message": f"Report #{report_id} deleted successfully"}, 200
+            return {
+                "Success": True,
+                "message": f"Report #{report_id} deleted successfully",
+                "deletion_job": job.to_dict(),
+            }, 200
 
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(
-                f"Admin {current_user} failed to delete report #{report.id}: {str(e)}"
+                f"Admin {current_user} failed to delete report #{report_id}: {str(e)}"
             )
             return {"Success": False, "message": "An error occurred while deleting the report"}, 500
 
-    def serialize_report(self, report):
-        # Get latest status from StatusUpdate
-        from models import StatusUpdate
-        latest_status = StatusUpdate.query.filter_by(report_id=report.id).order_by(StatusUpdate.timestamp.desc()).first()
-
-        return {
-            "id": report.id,
-            "incident": report.incident,
-            "details": report.details,
-            "latitude": report.latitude,
-            "longitude": report.longitude,
-            "status": latest_status.status if latest_status else "pending",
-            "created_at": report.created_at.isoformat() if report.created_at else None,
-            "updated_at": report.updated_at.isoformat() if report.updated_at else None,
-            "user_id": report.user_id,
-        }
+    def serialize_report(self, report, includes=(), fields=None):
+        data = {}
+        # Only touch requested attributes so unloaded columns are never lazy loaded
+        for field in fields or self.REPORT_FIELDS:
+            if field == "status":
+                data["status"] = self.latest_status(report, includes)
+            else:
+                value = getattr(report, field)
+                data[field] = value.isoformat() if isinstance(value, datetime) else value
+        data.update(serialize_includes(report, includes))
+        return data
+
+    def latest_status(self, report, includes=()):
+        # Get latest status from StatusUpdate, reusing the batch loaded history when present
+        if "status_history" in includes:
+            latest = max(report.status_updates, key=lambda s: s.timestamp, default=None)
+        else:
+            latest = StatusUpdate.query.filter_by(report_id=report.id).order_by(StatusUpdate.timestamp.desc()).first()
+        return latest.status if latest else "pending"
 
     # def notify_user(self, report, old_status, new_status):
     #     if old_status == new_status:
@@ -161,3 +244,255 @@ class AdminResource(Resource):
             
         # except Exception as e:
         #     current_app.logger.error(f"Failed to notify user #{user.id}: {str(e)}")
+
+
+class ReportExportResource(Resource):
+    """Streams every matching report as CSV or NDJSON for admin exports"""
+
+    EXPORT_FIELDS = [
+        "id", "user_id", "incident", "details", "latitude", "longitude",
+        "status", "address", "media_count", "created_at", "updated_at",
+    ]
+    BATCH_SIZE = 1000
+
+    @jwt_required()
+    def get(self):
+        current_user = get_jwt_identity()
+        if not is_admin(current_user):
+            return {"Success": False, "message": "Admin access required"}, 403
+
+        export_format = request.args.get("format", default="csv").lower()
+        if export_format not in ("csv", "ndjson"):
+            return {"Success": False, "message": "format must be one of csv, ndjson"}, 400
+
+        try:
+            start = parse_date(request.args.get("start"))
+            end = parse_date(request.args.get("end"))
+        except ValueError:
+            return {"Success": False, "message": "start and end must be ISO 8601 dates"}, 400
+
+        query = self.build_query(start, end, request.args.get("incident"))
+
+        if export_format == "csv":
+            rows, mimetype = self.stream_csv(query), "text/csv"
+        else:
+            rows, mimetype = self.stream_ndjson(query), "application/x-ndjson"
+
+        filename = f"reports-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.{export_format}"
+        current_app.logger.info(f"Admin {current_user} started {export_format} report export")
+        return Response(
+            stream_with_context(rows),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
+
+    def build_query(self, start=None, end=None, incident=None):
+        # Correlated subqueries keep this to a single statement per export
+        latest_status = (
+            select(StatusUpdate.status)
+            .where(StatusUpdate.report_id == Report.id)
+            .order_by(StatusUpdate.timestamp.desc())
+            .limit(1)
+            .correlate(Report)
+            .scalar_subquery()
+        )
+        media_count = (
+            select(func.count(MediaAttachment.id))
+            .where(MediaAttachment.report_id == Report.id)
+            .correlate(Report)
+            .scalar_subquery()
+        )
+
+        query = (
+            db.session.query(
+                Report.id,
+                Report.user_id,
+                Report.incident,
+                Report.details,
+                Report.latitude,
+                Report.longitude,
+                func.coalesce(latest_status, "pending").label("status"),
+                Location.address,
+                media_count.label("media_count"),
+                Report.created_at,
+                Report.updated_at,
+            )
+            .outerjoin(Location, Location.report_id == Report.id)
+        )
+
+        if start:
+            query = query.filter(Report.created_at >= start)
+        if end:
+            query = query.filter(Report.created_at < end)
+        if incident:
+            query = query.filter(Report.incident == incident)
+
+        # yield_per streams rows from a server-side cursor instead of buffering the result
+        return query.order_by(Report.id).yield_per(self.BATCH_SIZE)
+
+    def serialize_row(self, row):
+        data = dict(zip(self.EXPORT_FIELDS, row))
+        for field in ("created_at", "updated_at"):
+            if data[field]:
+                data[field] = data[field].isoformat()
+        return data
+
+    def stream_csv(self, query):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.EXPORT_FIELDS)
+        writer.writeheader()
+        for row in query:
+            writer.writerow(self.serialize_row(row))
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def stream_ndjson(self, query):
+        chunk = []
+        for row in query:
+            chunk.append(json.dumps(self.serialize_row(row)))
+            if len(chunk) >= self.BATCH_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+
+class ArchivedReportsResource(Resource):
+    """Read-only access to reports moved to the cold archive"""
+
+    @jwt_required()
+    def get(self, report_id=None):
+        current_user = get_jwt_identity()
+        if not is_admin(current_user):
+            return {"Success": False, "message": "Admin access required"}, 403
+
+        if report_id is not None:
+            try:
+                record = next(read_archived(report_id=report_id), None)
+            except (OSError, ValueError) as e:
+                current_app.logger.error(f"Failed to read archived report #{report_id}: {str(e)}")
+                return {"Success": False, "message": "An error occurred while reading the archive"}, 500
+            if record is None:
+                return {"Success": False, "message": "Archived report not found"}, 404
+            return {"Success": True, "data": record}, 200
+
+        try:
+            start = parse_date(request.args.get("start"))
+            end = parse_date(request.args.get("end"))
+        except ValueError:
+            return {"Success": False, "message": "start and end must be ISO 8601 dates"}, 400
+
+        try:
+            # Opens every matching file now, so a missing or corrupt one fails before the 200 is sent
+            records = read_archived(
+                start=start,
+                end=end,
+                user_id=request.args.get("user_id", type=int),
+                incident=request.args.get("incident"),
+            )
+        except (OSError, ValueError) as e:
+            current_app.logger.error(f"Admin {current_user} failed to read the report archive: {str(e)}")
+            return {"Success": False, "message": "An error occurred while reading the archive"}, 500
+
+        def rows():
+            chunk = []
+            try:
+                for record in records:
+                    chunk.append(json.dumps(record))
+                    if len(chunk) >= ReportExportResource.BATCH_SIZE:
+                        yield "\n".join(chunk) + "\n"
+                        chunk = []
+            except (OSError, ValueError) as e:
+                # Damage past the start of a file only shows once streaming; the client sees a cut-off body
+                current_app.logger.error(f"Archive read failed mid-stream for admin {current_user}: {str(e)}")
+                raise
+            if chunk:
+                yield "\n".join(chunk) + "\n"
+
+        return Response(stream_with_context(rows()), mimetype="application/x-ndjson")
+
+
+class TriageQueueResource(Resource):
+    """Pending reports, highest priority first, read straight off the priority index"""
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    @jwt_required()
+    def get(self):
+        current_user = get_jwt_identity()
+        if not is_admin(current_user):
+            return {"Success": False, "message": "Admin access required"}, 403
+
+        limit = min(max(request.args.get("limit", default=self.DEFAULT_LIMIT, type=int), 1), self.MAX_LIMIT)
+        now = datetime.utcnow()
+        entries = top_entries(limit, options=[joinedload(TriageEntry.report)])
+        return {
+            "Success": True,
+            "data": {
+                "queue": [
+                    {
+                        "id": entry.report.id,
+                        "incident": entry.report.incident,
+                        "details": entry.report.details,
+                        "latitude": entry.report.latitude,
+                        "longitude": entry.report.longitude,
+                        "user_id": entry.report.user_id,
+                        "created_at": entry.created_at.isoformat(),
+                        "priority": round(live_score(entry, now), 2),
+                        "severity": entry.severity,
+                        "cluster_size": entry.cluster_size,
+                        "has_media": entry.has_media,
+                        "waiting_hours": round((now - entry.created_at).total_seconds() / 3600, 2),
+                    }
+                    for entry in entries
+                ]
+            },
+        }, 200
+
+
+class CacheStatsResource(Resource):
+    """Hit/miss counters of this worker's response cache, and the log records it dropped"""
+
+    @jwt_required()
+    def get(self):
+        if not is_admin(get_jwt_identity()):
+            return {"Success": False, "message": "Admin access required"}, 403
+
+        log_handler = current_app.extensions.get("log_handler")
+        dropped = {"log_records_dropped": log_handler.dropped if log_handler else 0}
+        cache = get_cache()
+        if cache is None:
+            return {"Success": True, "data": {"enabled": False, **dropped}}, 200
+        stats = dict(cache.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        backend = cache.backend
+        if hasattr(backend, "entries"):
+            stats.update(entries=len(backend.entries), bytes=backend.size, evictions=backend.evictions)
+        return {"Success": True, "data": {"enabled": True, "backend": type(backend).__name__, **stats, **dropped}}, 200
+
+
+class DeletionJobResource(Resource):
+    """Progress of background user and report deletions"""
+
+    @jwt_required()
+    def get(self, job_id=None):
+        if not is_admin(get_jwt_identity()):
+            return {"Success": False, "message": "Admin access required"}, 403
+
+        if job_id is not None:
+            job = db.session.get(DeletionJob, job_id)
+            if job is None:
+                return {"Success": False, "message": "Deletion job not found"}, 404
+            return {"Success": True, "data": job.to_dict()}, 200
+
+        query = DeletionJob.query.order_by(DeletionJob.id.desc())
+        status = request.args.get("status")
+        if status:
+            query = query.filter(DeletionJob.status == status)
+        limit = min(request.args.get("limit", 50, type=int), 200)
+        return {"Success": True, "data": [job.to_dict() for job in query.limit(limit)]}, 200
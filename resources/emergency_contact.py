@@ -1,31 +1,47 @@
-from flask_restful import Resource, reqparse
-from models import db, EmergencyContact
+from flask_restful import Resource
+from flask import request, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from models import db, User, EmergencyContact
+from utils import parse_fields, fields_options, to_dict_fields
+from streaming import json_list_response
+from schemas import Schema, Field, ValidationError
+from panic import get_bundle
 
 class EmergencyContactResource(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument('name', type=str, required=True, help='Name is required')
-    parser.add_argument('relationship', type=str, required=True, help='Relationship is required')
-    parser.add_argument('phone_number', type=str, required=True, help='Phone number is required')
-    parser.add_argument('email', type=str, required=False)
-    parser.add_argument('address', type=str, required=False)
-    parser.add_argument('user_id', type=int, required=True, help='User ID is required')
+    schema = Schema(
+        name=Field(str, required=True, strip=True, message='Name is required'),
+        relationship=Field(str, required=True, strip=True, message='Relationship is required'),
+        phone_number=Field(str, required=True, strip=True, message='Phone number is required'),
+        email=Field(str, strip=True),
+        address=Field(str, strip=True),
+        user_id=Field(int, required=True, message='User ID is required'),
+    )
     
     def get(self, id=None):
         try:
+            fields = parse_fields(request.args.get("fields"), EmergencyContact)
+        except ValueError as e:
+            return {"Success": False, "message": str(e)}, 400
+
+        try:
+            query = EmergencyContact.query.options(*fields_options(EmergencyContact, fields))
             if id is None:
-                contacts = EmergencyContact.query.all()
-                return {"Success": True, "data": [c.to_dict() for c in contacts]}, 200
+                return json_list_response(query, lambda c: to_dict_fields(c, fields))
             else:
-                contact = EmergencyContact.query.get(id)
+                contact = query.get(id)
                 if not contact:
                     return {"Success": False, "message": "Emergency contact not found"}, 404
-                return {"Success": True, "data": contact.to_dict()}, 200
+                return {"Success": True, "data": to_dict_fields(contact, fields)}, 200
         except Exception as e:
             return {"Success": False, "message": f"Error fetching emergency contact: {str(e)}"}, 500
 
     def post(self):
         try:
-            data = EmergencyContactResource.parser.parse_args()
+            data = self.schema.load(request.get_json(silent=True))
+        except ValidationError as e:
+            return e.to_dict(), 400
+
+        try:
             contact = EmergencyContact(
                 name=data['name'],
                 relationship=data['relationship'],
@@ -47,10 +63,15 @@ class EmergencyContactResource(Resource):
             if not contact:
                 return {"Success": False, "message": "Emergency contact not found"}, 404
             
-            data = EmergencyContactResource.parser.parse_args()
-            for field in ['name', 'relationship', 'phone_number', 'email', 'address']:
-                if field in data and data[field] is not None:
-                    setattr(contact, field, data[field])
+            try:
+                data = self.schema.load(request.get_json(silent=True), partial=True)
+            except ValidationError as e:
+                return e.to_dict(), 400
+
+            # Contacts are not moved between users
+            data.pop('user_id', None)
+            for field, value in data.items():
+                setattr(contact, field, value)
             
             db.session.commit()
             return {"Success": True, "data": contact.to_dict()}, 200
@@ -69,4 +90,41 @@ class EmergencyContactResource(Resource):
             return {"Success": True, "message": "Emergency contact deleted successfully"}, 200
         except Exception as e:
             db.session.rollback()
-            return {"Success": False, "message": f"Error deleting emergency contact: {str(e)}"}, 500
\ No newline at end of file
+            return {"Success": False, "message": f"Error deleting emergency contact: {str(e)}"}, 500
+
+
+class UserEmergencyContactsResource(Resource):
+    """Resource for getting the emergency contacts of a specific user"""
+
+    @jwt_required()
+    def get(self, user_id):
+        claims = get_jwt()
+        if claims.get("role") != "admin" and str(get_jwt_identity()) != str(user_id):
+            return {"Success": False, "message": "Access denied"}, 403
+
+        try:
+            fields = parse_fields(request.args.get("fields"), EmergencyContact)
+        except ValueError as e:
+            return {"Success": False, "message": str(e)}, 400
+
+        if not db.session.query(User.query.filter_by(id=user_id).exists()).scalar():
+            return {"Success": False, "message": "User not found"}, 404
+
+        # Served by the index on emergency_contacts.user_id
+        query = (
+            EmergencyContact.query.filter_by(user_id=user_id)
+            .options(*fields_options(EmergencyContact, fields))
+            .order_by(EmergencyContact.id)
+        )
+        return json_list_response(query, lambda c: to_dict_fields(c, fields))
+
+
+class PanicResource(Resource):
+    """The caller's own details and emergency contacts, precomputed for the panic button"""
+
+    @jwt_required()
+    def get(self):
+        body = get_bundle(int(get_jwt_identity()))
+        if body is None:
+            return {"Success": False, "message": "User not found"}, 404
+        return Response(body, mimetype="application/json")
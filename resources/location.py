@@ -1,32 +1,56 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
+from flask import request
 from models import db, Location
+from utils import parse_fields, fields_options, to_dict_fields
+from streaming import json_list_response
+from listing import location_rows
+from geocoding import fill_location_address
+from tasks import enqueue
+from schemas import Schema, Field, ValidationError
 
 class LocationResource(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument('latitude', type=float, required=True, help='Latitude is required')
-    parser.add_argument('longitude', type=float, required=True, help='Longitude is required')
-    parser.add_argument('address', type=str, help='Address is optional')
-    parser.add_argument('report_id', type=int, required=True, help='Report ID is required')
+    schema = Schema(
+        latitude=Field(float, required=True, message='Latitude is required'),
+        longitude=Field(float, required=True, message='Longitude is required'),
+        address=Field(str, strip=True),
+        report_id=Field(int, required=True, message='Report ID is required'),
+    )
 
     def get(self, location_id=None):
         try:
+            fields = parse_fields(request.args.get("fields"), Location)
+        except ValueError as e:
+            return {"Success": False, "message": str(e)}, 400
+
+        try:
+            query = Location.query.options(*fields_options(Location, fields))
             if location_id:
-                location = Location.query.get(location_id)
+                location = query.get(location_id)
                 if location:
-                    return {"Success": True, "data": location.to_dict()}, 200
+                    return {"Success": True, "data": to_dict_fields(location, fields)}, 200
                 return {"Success": False, "message": "Location not found"}, 404
 
-            locations = Location.query.all()
-            return {"Success": True, "data": [loc.to_dict() for loc in locations]}, 200
+            return json_list_response(*location_rows(fields, stream=True))
         except Exception as e:
             return {"Success": False, "message": f"An error occurred while fetching locations: {str(e)}"}, 500
 
     def post(self):
         try:
-            data = LocationResource.parser.parse_args()
-            location = Location(**data)
-            db.session.add(location)
+            data = self.schema.load(request.get_json(silent=True))
+        except ValidationError as e:
+            return e.to_dict(), 400
+
+        try:
+            # A report has one location, which may already have been created from its coordinates
+            location = Location.for_report(data["report_id"], data["latitude"], data["longitude"])
+            # Without an explicit address, the old one no longer matches the new coordinates
+            location.address = None
+            for key, value in data.items():
+                if value is not None:
+                    setattr(location, key, value)
             db.session.commit()
+            if not location.address:
+                enqueue(fill_location_address, location.id)
             return {"Success": True, "data": location.to_dict()}, 201
         except Exception as e:
             db.session.rollback()
@@ -38,7 +62,11 @@ class LocationResource(Resource):
             if not location:
                 return {"Success": False, "message": "Location not found"}, 404
 
-            data = LocationResource.parser.parse_args()
+            try:
+                data = self.schema.load(request.get_json(silent=True), partial=True)
+            except ValidationError as e:
+                return e.to_dict(), 400
+
             for key, value in data.items():
                 setattr(location, key, value)
 
@@ -1,28 +1,41 @@
-from flask_restful import Resource, reqparse
-from models import db, Report, MediaAttachment
+from flask_restful import Resource
+from models import db, Report, MediaAttachment, MediaUpload
 from flask import request, current_app
-from flask_jwt_extended import jwt_required, get_jwt
-import uuid
-import os
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from utils import parse_includes, include_options, serialize_includes
+from utils import parse_fields, fields_options, to_dict_fields
+from streaming import json_list_response
+from idempotency import idempotent
+from media import allowed_file, MAX_FILE_SIZE, create_upload_token, verify_upload_token
+from media import stage_upload, finalize_upload, media_status, delete_media_files
+from storage import get_storage, new_media_key
+from tasks import enqueue
+from geocoding import fill_report_location
+from geofence import match_report
+from triage import add_to_queue, mark_has_media
+from schemas import Schema, Field, ValidationError
+from cache import cached_response
+from deletion import soft_delete_report
+from throttle import throttle, upload_size
+from listing import report_rows
 from datetime import datetime
 
 
 class ReportResource(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument(
-        "incident", type=str, required=True, help="incident type is required"
+    schema = Schema(
+        user_id=Field(int, required=True),
+        incident=Field(str, required=True, strip=True, message="incident is required"),
+        details=Field(str, required=True, strip=True, message="details are required and cannot be empty"),
+        latitude=Field(float, default=0.0),
+        longitude=Field(float, default=0.0),
     )
-    parser.add_argument("details", type=str, help="Please provide a detailed message")
-    parser.add_argument("latitude", type=str, help="Select a location")
-    parser.add_argument("longitude", type=str, help="Select a location")
 
     def allowed_file(self, filename):
-        ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "mp4", "avi", "mov", "webm"}
-        return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+        return allowed_file(filename)
     
     def validate_file(self, file):
         # Check file size (limit to 5MB)
-        if len(file.read()) > 5 * 1024 * 1024:
+        if len(file.read()) > MAX_FILE_SIZE:
             return False, "File size exceeds 5MB limit"
         file.seek(0)  # Reset file pointer
         
@@ -40,21 +53,16 @@ class ReportResource(Resource):
             
         if file and self.allowed_file(file.filename):
             ext = file.filename.rsplit('.', 1)[1].lower()
-            filename = f"{uuid.uuid4()}.{ext}"
+            key = new_media_key(ext)
 
-            #create a media directory
-            media_dir = os.path.join(current_app.config['UPLOAD_FOLDER'],str(report_id))
-            os.makedirs(media_dir,exist_ok=True)
-
-            # save the file
-            filepath =os.path.join(media_dir, filename)
-            file.save(filepath)
+            # save the file through the configured storage backend
+            get_storage().save(key, file.stream)
 
             #create media record in the db
             media = MediaAttachment(
                 report_id=report_id,
                 media_type=file.content_type,
-                file_url=filepath,
+                file_url=key,
                 uploaded_at=datetime.now()
             )
             db.session.add(media)
@@ -63,67 +71,43 @@ class ReportResource(Resource):
 
 
    # @jwt_required()
+    @throttle("reports")
+    @idempotent
     def post(self):
-        data = request.get_json()
-        args = self.parser.parse_args()
-        
-        # Validate required fields
-        if not data or "user_id" not in data:
-            return {"message": "user_id is required"}, 400
-
-        if not args["incident"]:
-            return {"message": "incident is required"}, 400
-
-        # Validate details field
-        details = args.get("details", "").strip()
-        if not details:
-            return {"message": "details are required and cannot be empty"}, 400
-
-        # Validate and convert user_id to integer
+        # The body is decoded and validated once
         try:
-            user_id = int(data["user_id"])
-        except (ValueError, TypeError):
-            return {"message": "user_id must be a valid integer"}, 400
+            data = self.schema.load(request.get_json(silent=True))
+        except ValidationError as e:
+            return e.to_dict(), 400
 
         # Validate that user exists
         from models import User
-        user = User.query.get(user_id)
+        user = User.query.get(data["user_id"])
         if not user:
             return {"message": "User not found"}, 404
 
         try:
-            report = Report(
-                user_id=user_id,
-                incident=args["incident"],
-                details=details,  # Use validated details
-                latitude=float(data.get("latitude", 0.0)) or 0.0,
-                longitude=float(data.get("longitude", 0.0)) or 0.0,
-            )
+            report = Report(**data)
+            add_to_queue(report)
             db.session.add(report)
             db.session.commit()
+            enqueue(fill_report_location, report.id)
+            enqueue(match_report, report.id)
 
-            # file uploads will be handled here
-            if 'media' in request.files:
-                files = request.files.getlist('media')
-                for file in files:
-                    if file.filename =='':
-                        continue
-                    media, message = self.save_media(report.id, file)
-                    if media is None:
-                        db.session.rollback()
-                        return {"message": "Failed to save media", "error": message}, 400
-                    db.session.commit()
-
-            return report.to_dict(), 201
+            # Media is uploaded separately with this token so the report is acknowledged at once
+            return {
+                **report.to_dict(),
+                "upload_token": create_upload_token(report.id),
+                "media_status": "none",
+            }, 201
         
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error creating report: {str(e)}")
-            current_app.logger.error(f"Request data: {data}")
-            current_app.logger.error(f"Parsed args: {args}")
+            current_app.logger.error(f"Error creating report: {str(e)}", extra={"payload": data})
             return {"message": "Failed to create report", "error": str(e)}, 400
         
     @jwt_required()
+    @cached_response("reports", "status_updates", "media", "locations")
     def get(self, report_id=None):
         try:
             claims = get_jwt()
@@ -131,14 +115,25 @@ class ReportResource(Resource):
             if role != "admin":
                 return {"Success": False, "message": "Admin access required"}, 403
 
+            try:
+                includes = parse_includes(request.args.get("include"))
+                fields = parse_fields(request.args.get("fields"), Report)
+            except ValueError as e:
+                return {"Success": False, "message": str(e)}, 400
+            query = Report.query.options(*include_options(includes), *fields_options(Report, fields))
+
             if report_id:
-                report = Report.query.get(report_id)
+                report = query.get(report_id)
                 if report:
-                    return {"Success": True, "data": report.to_dict()}, 200
+                    return {"Success": True, "data": {**to_dict_fields(report, fields), **serialize_includes(report, includes)}}, 200
                 return {"Success": False, "message": "Report not found"}, 404
 
-            reports = Report.query.all()
-            return {"Success": True, "data": [r.to_dict() for r in reports]}, 200
+            if not includes:
+                # Nothing to batch load, so skip building entities altogether
+                return json_list_response(*report_rows(fields, stream=True))
+            return json_list_response(
+                query, lambda r: {**to_dict_fields(r, fields), **serialize_includes(r, includes)}
+            )
         except Exception as e:
             return {"Success": False, "message": f"An error occurred while fetching reports: {str(e)}"}, 500
 
@@ -149,10 +144,13 @@ class ReportResource(Resource):
             if not report:
                 return {"Success": False, "message": "Report not found"}, 404
 
-            data = request.get_json()
-            for field in ["user_id", "details", "incident", "latitude", "longitude"]:
-                if field in data:
-                    setattr(report, field, data[field])
+            try:
+                data = ReportResource.schema.load(request.get_json(silent=True), partial=True)
+            except ValidationError as e:
+                return e.to_dict(), 400
+
+            for field, value in data.items():
+                setattr(report, field, value)
 
             db.session.commit()
             return {"Success": True, "data": report.to_dict()}, 200
@@ -167,18 +165,9 @@ class ReportResource(Resource):
             if not report:
                 return {"Success": False, "message": "Report not found"}, 404
 
-            #we must add delete for associated media files
-            for media in report.media_attachments:
-                try:
-                    if os.path.exists(media.file_url):
-                        os.remove(media.file_url)
-                except OSError as e:
-                    current_app.logger.error(f"Error deleting media file:{str(e)}")
-                db.session.delete(media)
-
-            db.session.delete(report)
-            db.session.commit()
-            return {"Success": True, "message": "Report deleted successfully"}, 200
+            # Hidden at once; its rows and media files are removed in the background
+            job = soft_delete_report(report, requested_by=int(get_jwt_identity()))
+            return {"Success": True, "message": "Report deleted successfully", "deletion_job": job.to_dict()}, 200
         except Exception as e:
             db.session.rollback()
             return {"Success": False, "message": f"An error occurred while deleting report: {str(e)}"}, 500
@@ -186,15 +175,22 @@ class ReportResource(Resource):
 
 class MediaResource(Resource):
     def get(self, report_id):
+        try:
+            fields = parse_fields(request.args.get("fields"), MediaAttachment)
+        except ValueError as e:
+            return {"Success": False, "message": str(e)}, 400
+
         try:
             report = Report.query.get(report_id)
             if report:
-                media = report.media_attachments
-                return {"Success": True, "data": [m.to_dict() for m in media]}, 200
+                media = MediaAttachment.query.filter_by(report_id=report_id).options(*fields_options(MediaAttachment, fields)).all()
+                return {"Success": True, "data": [to_dict_fields(m, fields) for m in media]}, 200
             return {"Success": False, "message": "Report not found"}, 404
         except Exception as e:
             return {"Success": False, "message": f"An error occurred while fetching media: {str(e)}"}, 500
 
+    @throttle("media_bytes", cost=upload_size)
+    @idempotent
     def post(self, report_id):
         try:
             report = Report.query.get(report_id)
@@ -221,6 +217,8 @@ class MediaResource(Resource):
                     db.session.rollback()
                     return {"Success": False, "message": "Failed to save media", "error": message}, 400
 
+            if saved_files:
+                mark_has_media(report_id)
             db.session.commit()
             return {"Success": True, "data": saved_files}, 201
         
@@ -234,10 +232,72 @@ class MediaResource(Resource):
             if not report:
                 return {"Success": False, "message": "Report not found"}, 404
 
+            keys = [media.file_url for media in report.media_attachments]
             for media in report.media_attachments:
                 db.session.delete(media)
             db.session.commit()
+            if keys:
+                enqueue(delete_media_files, keys)
             return {"Success": True, "message": "Media deleted successfully"}, 200
         except Exception as e:
             db.session.rollback()
             return {"Success": False, "message": f"An error occurred while deleting media: {str(e)}"}, 500
+
+
+class MediaUploadResource(Resource):
+    """Accepts media for a report with an upload token and finalizes it in the background"""
+
+    @throttle("media_bytes", cost=upload_size)
+    def post(self, report_id):
+        token = request.headers.get("X-Upload-Token") or request.args.get("token")
+        if not token:
+            return {"Success": False, "message": "Upload token is required"}, 401
+        is_valid, message = verify_upload_token(token, report_id)
+        if not is_valid:
+            return {"Success": False, "message": message}, 403
+
+        files = [f for f in request.files.getlist('media') if f.filename != '']
+        if not files:
+            return {"Success": False, "message": "No media files provided"}, 400
+
+        try:
+            if not Report.query.get(report_id):
+                return {"Success": False, "message": "Report not found"}, 404
+
+            uploads = []
+            for file in files:
+                upload, message = stage_upload(report_id, file)
+                if upload is None:
+                    db.session.rollback()
+                    return {"Success": False, "message": "Failed to save media", "error": message}, 400
+                uploads.append(upload)
+            db.session.commit()
+
+            for upload in uploads:
+                enqueue(finalize_upload, upload.id)
+
+            return {"Success": True, "data": [u.to_dict() for u in uploads]}, 202
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error staging media for report #{report_id}: {str(e)}")
+            return {"Success": False, "message": "Failed to upload media"}, 500
+
+
+class MediaStatusResource(Resource):
+    """Reports the processing status of a report's uploaded media"""
+
+    def get(self, report_id):
+        try:
+            if not Report.query.get(report_id):
+                return {"Success": False, "message": "Report not found"}, 404
+
+            uploads = MediaUpload.query.filter_by(report_id=report_id).order_by(MediaUpload.id).all()
+            return {
+                "Success": True,
+                "data": {
+                    "status": media_status(uploads),
+                    "uploads": [u.to_dict() for u in uploads],
+                },
+            }, 200
+        except Exception as e:
+            return {"Success": False, "message": f"An error occurred while fetching media status: {str(e)}"}, 500
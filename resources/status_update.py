@@ -3,9 +3,16 @@ from flask import request
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt
 from models import db, Report, StatusUpdate
+from triage import remove_from_queue
+from schemas import Schema, Field, ValidationError
+from throttle import throttle
 #from sqlalchemy.exc import SQLAlchemyError
 
 class ReportStatusUpdateResource(Resource):
+    schema = Schema(
+        status=Field(str, required=True, choices=('under investigation', 'rejected', 'resolved')),
+    )
+
     @jwt_required(optional=True)
     def get(self, report_id):
         try:
@@ -40,6 +47,7 @@ class ReportStatusUpdateResource(Resource):
         except Exception as e:
             return {"Success": False, "message": f"An error occurred while fetching report status: {str(e)}"}, 500
 
+    @throttle("status_changes")
     @jwt_required()
     def post(self, report_id):
         try:
@@ -50,11 +58,10 @@ class ReportStatusUpdateResource(Resource):
             if role != "admin":
                 return {"Success": False, "message": "Admin access required"}, 403
 
-            data = request.get_json()
-            new_status = data.get('status')
-            valid_statuses = ['under investigation', 'rejected', 'resolved']
-            if new_status not in valid_statuses:
-                return {"Success": False, "message": f"Invalid status. Must be one of {valid_statuses}"}, 400
+            try:
+                new_status = self.schema.load(request.get_json(silent=True))['status']
+            except ValidationError as e:
+                return e.to_dict(), 400
 
             report = Report.query.get(report_id)
             if not report:
@@ -69,6 +76,8 @@ class ReportStatusUpdateResource(Resource):
             # Note: Report model doesn't have a status field, status is tracked via StatusUpdate
 
             db.session.add(status_update)
+            # Every valid status means an admin has picked the report up
+            remove_from_queue(report_id)
             db.session.commit()
 
             return {"Success": True, "message": f"Report status updated to '{new_status}'"}, 200
@@ -0,0 +1,60 @@
+import json
+from flask_restful import Resource
+from flask import request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, AreaSubscription
+from geofence import build_subscription
+
+
+class AreaSubscriptionResource(Resource):
+    """Areas the current user wants to be alerted about"""
+
+    @jwt_required()
+    def get(self, id=None):
+        try:
+            user_id = int(get_jwt_identity())
+            if id is None:
+                subscriptions = AreaSubscription.query.filter_by(user_id=user_id).all()
+                return {"Success": True, "data": [self.serialize(s) for s in subscriptions]}, 200
+
+            subscription = AreaSubscription.query.filter_by(id=id, user_id=user_id).first()
+            if not subscription:
+                return {"Success": False, "message": "Subscription not found"}, 404
+            return {"Success": True, "data": self.serialize(subscription)}, 200
+        except Exception as e:
+            return {"Success": False, "message": f"Error fetching subscriptions: {str(e)}"}, 500
+
+    @jwt_required()
+    def post(self):
+        data = request.get_json(silent=True) or {}
+        subscription, message = build_subscription(int(get_jwt_identity()), data)
+        if subscription is None:
+            return {"Success": False, "message": message}, 400
+
+        try:
+            db.session.add(subscription)
+            db.session.commit()
+            return {"Success": True, "data": self.serialize(subscription)}, 201
+        except Exception as e:
+            db.session.rollback()
+            return {"Success": False, "message": f"Error creating subscription: {str(e)}"}, 500
+
+    @jwt_required()
+    def delete(self, id):
+        try:
+            subscription = AreaSubscription.query.filter_by(id=id, user_id=int(get_jwt_identity())).first()
+            if not subscription:
+                return {"Success": False, "message": "Subscription not found"}, 404
+
+            db.session.delete(subscription)
+            db.session.commit()
+            return {"Success": True, "message": "Subscription deleted successfully"}, 200
+        except Exception as e:
+            db.session.rollback()
+            return {"Success": False, "message": f"Error deleting subscription: {str(e)}"}, 500
+
+    def serialize(self, subscription):
+        data = subscription.to_dict(rules=("-polygon", "-min_lat", "-max_lat", "-min_lon", "-max_lon"))
+        if subscription.polygon:
+            data["polygon"] = json.loads(subscription.polygon)
+        return data
@@ -0,0 +1,111 @@
+from flask_restful import Resource
+from flask import current_app, request
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import func
+from models import db, User, Report, StatusUpdate, MediaAttachment, SyncChange
+from utils import serialize_status_update
+
+
+class UserReportChangesResource(Resource):
+    """Resource returning the changes to a user's reports since a sync token"""
+
+    # Change rows consumed per call; clients keep calling while has_more is true
+    PAGE_SIZE = 1000
+
+    ENTITY_MODELS = {
+        "report": Report,
+        "status_update": StatusUpdate,
+        "media": MediaAttachment,
+    }
+
+    @jwt_required()
+    def get(self, user_id):
+        current_user_id = get_jwt_identity()
+        claims = get_jwt()
+        if claims.get("role") != "admin" and str(current_user_id) != str(user_id):
+            return {"Success": False, "message": "Access denied"}, 403
+
+        since = request.args.get("since")
+        if since is not None and (not since.isdigit()):
+            return {"Success": False, "message": "since must be a sync token returned by this endpoint"}, 400
+
+        try:
+            if not User.query.get(user_id):
+                return {"Success": False, "message": "User not found"}, 404
+
+            if since is None:
+                return {"Success": True, "data": self.snapshot(user_id)}, 200
+            return {"Success": True, "data": self.changes(user_id, int(since))}, 200
+        except Exception as e:
+            current_app.logger.error(f"Error syncing reports for user {user_id}: {str(e)}")
+            return {"Success": False, "message": "An error occurred while syncing reports"}, 500
+
+    def snapshot(self, user_id):
+        """Full state for a first sync, with the token to continue from."""
+        # Read the token first so nothing committed meanwhile can be skipped
+        token = db.session.query(func.max(SyncChange.seq)).filter_by(user_id=user_id).scalar() or 0
+        report_ids = db.session.query(Report.id).filter_by(user_id=user_id)
+
+        return self.payload(
+            reports=Report.query.filter_by(user_id=user_id).all(),
+            status_updates=StatusUpdate.query.filter(StatusUpdate.report_id.in_(report_ids)).all(),
+            media=MediaAttachment.query.filter(MediaAttachment.report_id.in_(report_ids)).all(),
+            deleted={entity: [] for entity in self.ENTITY_MODELS},
+            token=token,
+            has_more=False,
+        )
+
+    def changes(self, user_id, since):
+        rows = (
+            SyncChange.query
+            .filter(SyncChange.user_id == user_id, SyncChange.seq > since)
+            .order_by(SyncChange.seq)
+            .limit(self.PAGE_SIZE + 1)
+            .all()
+        )
+        has_more = len(rows) > self.PAGE_SIZE
+        rows = rows[:self.PAGE_SIZE]
+
+        # Only the last operation on each row within the window matters
+        latest = {}
+        for change in rows:
+            latest[(change.entity, change.entity_id)] = change.operation
+
+        upserts = {entity: [] for entity in self.ENTITY_MODELS}
+        deleted = {entity: [] for entity in self.ENTITY_MODELS}
+        for (entity, entity_id), operation in latest.items():
+            (deleted if operation == "delete" else upserts)[entity].append(entity_id)
+
+        loaded = {}
+        for entity, model in self.ENTITY_MODELS.items():
+            ids = upserts[entity]
+            found = model.query.filter(model.id.in_(ids)).all() if ids else []
+            # A row can disappear after its upsert was logged; report it as deleted
+            missing = set(ids) - {obj.id for obj in found}
+            deleted[entity].extend(sorted(missing))
+            loaded[entity] = found
+
+        return self.payload(
+            reports=loaded["report"],
+            status_updates=loaded["status_update"],
+            media=loaded["media"],
+            deleted=deleted,
+            token=rows[-1].seq if rows else since,
+            has_more=has_more,
+        )
+
+    def payload(self, reports, status_updates, media, deleted, token, has_more):
+        return {
+            "reports": [r.to_dict() for r in reports],
+            "status_updates": [
+                {**serialize_status_update(s), "report_id": s.report_id} for s in status_updates
+            ],
+            "media": [m.to_dict(rules=("-report",)) for m in media],
+            "deleted": {
+                "reports": deleted["report"],
+                "status_updates": deleted["status_update"],
+                "media": deleted["media"],
+            },
+            "sync_token": str(token),
+            "has_more": has_more,
+        }
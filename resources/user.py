@@ -1,10 +1,16 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 import re
 from datetime import datetime
-from models import db, User, TokenBlocklist
+from models import db, User, Report, TokenBlocklist
 from flask_bcrypt import generate_password_hash, check_password_hash
 from flask_jwt_extended import (create_access_token, jwt_required, create_refresh_token, get_jwt_identity, get_jwt)
-from flask import current_app
+from flask import current_app, request
+from utils import parse_includes, include_options, serialize_includes
+from utils import parse_fields, fields_options, to_dict_fields
+from schemas import Schema, Field, ValidationError
+from cache import cached_response
+from deletion import soft_delete_user
+from listing import report_rows
 
 # class BaseResource(Resource):
 #     def success_response(self, data, status=200):
@@ -19,67 +25,74 @@ from flask import current_app
 #             "message": message
 #         }), status)
 
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PHONE_PATTERN = re.compile(r'^\d{10}$')
+
+
+def email_error(email):
+    """Basic email format validation"""
+    if not EMAIL_PATTERN.match(email):
+        return "Invalid email format"
+
+
+def password_error(password):
+    """Password strength validation"""
+    if len(password) < 8:
+        return "Password must be at least 8 characters long"
+    if not any(char.isdigit() for char in password):
+        return "Password must contain at least one digit"
+    if not any(char.isupper() for char in password):
+        return "Password must contain at least one uppercase letter"
+
+
+def phone_number_error(phone_number):
+    if not PHONE_PATTERN.match(phone_number):
+        return "Phone number must be exactly 10 digits"
+
+
 class UserResources(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument("first_name", type=str, required=True, help="first_name is required")
-    parser.add_argument("last_name", type=str, required=True, help="last_name is required")
-    parser.add_argument("email", type=str, required=True, help="Email is required")
-    parser.add_argument("password", type=str, required=True)
-    parser.add_argument("role", type=str, required=False, default='user')
-    parser.add_argument("phone_number", type=str, required=True, help="phone_number is required")
-
-    def validate_email(self, email):
-        """Basic email format validation"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
-
-    def validate_password(self, password):
-        """Password strength validation"""
-        if len(password) < 8:
-            return False, "Password must be at least 8 characters long"
-        if not any(char.isdigit() for char in password):
-            return False, "Password must contain at least one digit"
-        if not any(char.isupper() for char in password):
-            return False, "Password must contain at least one uppercase letter"
-        return True, "Password is valid"
+    schema = Schema(
+        first_name=Field(str, required=True, strip=True),
+        last_name=Field(str, required=True, strip=True),
+        email=Field(str, required=True, strip=True, validate=email_error, message="Email is required"),
+        password=Field(str, required=True, validate=password_error),
+        role=Field(str, default="user"),
+        phone_number=Field(str, required=True, strip=True, validate=phone_number_error),
+    )
 
     @jwt_required()
     def get(self, id=None):
         try:
+            fields = parse_fields(request.args.get("fields"), User)
+        except ValueError as e:
+            return ({"Success": False, "message": str(e)}), 400
+
+        try:
+            query = User.query.options(*fields_options(User, fields))
             if id is None:
-                users = User.query.all()
-                return ({"Success": True, "data": [user.to_dict() for user in users]}), 200
+                users = query.all()
+                return ({"Success": True, "data": [to_dict_fields(user, fields) for user in users]}), 200
             else:
-                user = User.query.get(id)
+                user = query.get(id)
                 if not user:
                     return ({"Success": False, "message": "User not found"}), 404
-                return ({"Success": True, "data": user.to_dict()}), 200
+                return ({"Success": True, "data": to_dict_fields(user, fields)}), 200
         except Exception as e:
             # Log the actual error for debugging but don't expose it to the client
-            import logging
-            logging.error(f"Error fetching user(s): {str(e)}")
+            current_app.logger.error(f"Error fetching user(s): {str(e)}")
             return ({"Success": False, "message": "An error occurred while fetching user data"}), 500
 
     def post(self):
-        data = self.parser.parse_args()
+        # Formats and password strength are checked by the schema
+        try:
+            data = self.schema.load(request.get_json(silent=True))
+        except ValidationError as e:
+            return e.to_dict(), 400
 
-        # Validate email format
-        if not self.validate_email(data["email"]):
-            return ({"Success": False, "message": "Invalid email format"}), 400
-            
-        # Validate password strength
-        is_valid, message = self.validate_password(data["password"])
-        if not is_valid:
-            return ({"Success": False, "message": message}), 400
-            
         # Check for existing email
         if User.query.filter_by(email=data["email"]).first():
             return ({"Success": False, "message": "Email address already taken"}), 409
 
-        # Validate phone number format (exactly 10 digits)
-        if not re.match(r'^\d{10}$', data["phone_number"]):
-            return ({"Success": False, "message": "Phone number must be exactly 10 digits"}), 400
-
         # Check for existing phone number
         if User.query.filter_by(phone_number=data["phone_number"]).first():
             return ({"Success": False, "message": "Phone number already taken"}), 409
@@ -124,18 +137,17 @@ class UserResources(Resource):
             if not user:
                 return ({"Success": False, "message": "User not found"}), 404
 
-            data = self.parser.parse_args()
+            try:
+                data = self.schema.load(request.get_json(silent=True), partial=True)
+            except ValidationError as e:
+                return e.to_dict(), 400
 
-            if data['first_name'] is not None:
-                user.first_name = data['first_name']
-            if data['last_name'] is not None:
-                user.last_name = data['last_name']
-            if data['email'] is not None:
-                user.email = data['email']
-            if data['password'] is not None:
-                user.password = generate_password_hash(data['password']).decode('utf-8')
-            if data['phone_number'] is not None:
-                user.phone_number = data['phone_number']
+            # Roles are not changed through this endpoint
+            data.pop("role", None)
+            if "password" in data:
+                data["password"] = generate_password_hash(data["password"]).decode('utf-8')
+            for key, value in data.items():
+                setattr(user, key, value)
 
             db.session.commit()
             return (
@@ -152,9 +164,9 @@ class UserResources(Resource):
             if user is None:
                 return ({"Success": False, "message": "User not found"}), 404
 
-            db.session.delete(user)
-            db.session.commit()
-            return ({"Success": True, "message": "User successfully deleted"}), 200
+            # Hidden at once; reports, media and contacts are removed in the background
+            job = soft_delete_user(user, requested_by=int(get_jwt_identity()))
+            return ({"Success": True, "message": "User successfully deleted", "deletion_job": job.to_dict()}), 200
         except Exception as e:
             db.session.rollback()
             return ({"Success": False, "message": str(e)}), 500
@@ -164,6 +176,7 @@ class UserReportsResource(Resource):
     """Resource for getting reports by a specific user"""
 
     @jwt_required()
+    @cached_response("users", "reports", "status_updates", "media", "locations")
     def get(self, user_id):
         try:
             # Verify the requesting user can only access their own reports (unless admin)
@@ -175,24 +188,37 @@ class UserReportsResource(Resource):
             if user_role != "admin" and str(current_user_id) != str(user_id):
                 return ({"Success": False, "message": "Access denied"}), 403
 
+            try:
+                includes = parse_includes(request.args.get("include"))
+                fields = parse_fields(request.args.get("fields"), Report)
+            except ValueError as e:
+                return ({"Success": False, "message": str(e)}), 400
+
             # Get the user to make sure they exist
             user = User.query.get(user_id)
             if not user:
                 return ({"Success": False, "message": "User not found"}), 404
 
-            # Get all reports for this user
-            reports = user.reports
+            if not includes:
+                rows, serialize = report_rows(fields, user_id=user_id)
+                return ({"Success": True, "data": [serialize(row) for row in rows]}), 200
+
+            # Get all reports for this user, batch loading any requested relationships
+            reports = (
+                Report.query.filter_by(user_id=user_id)
+                .options(*include_options(includes), *fields_options(Report, fields))
+                .all()
+            )
 
             # Convert reports to dict format
             reports_data = []
             for report in reports:
                 try:
-                    report_dict = report.to_dict()
+                    report_dict = {**to_dict_fields(report, fields), **serialize_includes(report, includes)}
                     reports_data.append(report_dict)
                 except Exception as e:
                     # Log individual report serialization errors
-                    import logging
-                    logging.error(f"Error serializing report {report.id}: {str(e)}")
+                    current_app.logger.error(f"Error serializing report {report.id}: {str(e)}")
                     continue
 
             return ({
@@ -201,8 +227,7 @@ class UserReportsResource(Resource):
             }), 200
 
         except Exception as e:
-            import logging
-            logging.error(f"Error fetching reports for user {user_id}: {str(e)}")
+            current_app.logger.error(f"Error fetching reports for user {user_id}: {str(e)}")
             # Return more detailed error for debugging
             return ({
                 "Success": False,
@@ -298,9 +323,10 @@ class UserReportsResource(Resource):
 #             }), 500
 
 class LoginResource(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument("email", type=str, required=True, help="Email is required")
-    parser.add_argument("password", type=str, required=True, help="Password is required")
+    schema = Schema(
+        email=Field(str, required=True, strip=True, message="Email is required"),
+        password=Field(str, required=True, message="Password is required"),
+    )
 
     # Apply rate limiting to this method
     def post(self):
@@ -309,7 +335,11 @@ class LoginResource(Resource):
         # For now, we'll just add a comment about where this would be implemented
         
         try:
-            data = self.parser.parse_args()
+            data = self.schema.load(request.get_json(silent=True))
+        except ValidationError as e:
+            return e.to_dict(), 400
+
+        try:
             user = User.query.filter_by(email=data["email"]).first()
 
             if not user or not check_password_hash(user.password, data['password']):
@@ -336,8 +366,7 @@ class LoginResource(Resource):
             }), 200
         except Exception as e:
             # Log the actual error for debugging but don't expose it to the client
-            import logging
-            logging.error(f"Error during login: {str(e)}")
+            current_app.logger.error(f"Error during login: {str(e)}")
             return ({"Success": False, "message": "An error occurred during login"}), 500
 
 class TokenRefreshResource(Resource):
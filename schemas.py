@@ -0,0 +1,168 @@
+"""
+Declarative request body schemas.
+
+A Schema is declared once per resource, like the reqparse parsers it replaces,
+but each field is compiled up front into a single converter closure, so
+loading a body is one pass over a tuple with no per-request dispatch on
+argument options:
+
+    schema = Schema(
+        name=Field(str, required=True, strip=True),
+        user_id=Field(int, required=True),
+    )
+    data = schema.load(request.get_json(silent=True))               # POST
+    changes = schema.load(request.get_json(silent=True), partial=True)  # PATCH
+
+``load`` raises ValidationError, listing every invalid field, instead of
+stopping at the first one.
+"""
+import math
+
+
+class ValidationError(ValueError):
+    """Raised by Schema.load; ``errors`` maps field names to messages."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(next(iter(errors.values())))
+
+    def to_dict(self):
+        return {"Success": False, "message": str(self), "errors": self.errors}
+
+
+def _to_str(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError("must be a string")
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError("must be an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    raise ValueError("must be an integer")
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise ValueError("must be a number")
+    try:
+        number = float(value) if isinstance(value, (int, float, str)) else None
+    except ValueError:
+        number = None
+    if number is None or not math.isfinite(number):
+        raise ValueError("must be a number")
+    return number
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "false", "1", "0"):
+        return value.lower() in ("true", "1")
+    raise ValueError("must be true or false")
+
+
+COERCERS = {str: _to_str, int: _to_int, float: _to_float, bool: _to_bool}
+
+
+class Field:
+    """
+    One body field.
+
+    Args:
+        type: str, int, float or bool; values are coerced where unambiguous
+        required (bool): Must be present (and, with ``strip``, not blank) unless loading partially
+        default: Value used when the field is absent from a full load
+        strip (bool): Strip surrounding whitespace from strings
+        choices: Allowed values after coercion
+        validate (callable): Returns an error message for an invalid value, or None
+        message (str): Error reported when a required field is missing
+    """
+
+    def __init__(self, type=str, required=False, default=None, strip=False, choices=None, validate=None, message=None):
+        self.type = type
+        self.required = required
+        self.default = default
+        self.strip = strip
+        self.choices = tuple(choices) if choices is not None else None
+        self.validate = validate
+        self.message = message
+
+    def compile(self, name):
+        """Build the converter for this field, raising ValueError with the error message."""
+        coerce = COERCERS[self.type]
+        strip, choices, validate = self.strip and self.type is str, self.choices, self.validate
+        required, required_message = self.required, self.message or f"{name} is required"
+
+        def convert(value):
+            try:
+                value = coerce(value)
+            except ValueError as e:
+                raise ValueError(f"{name} {e}")
+            if strip:
+                value = value.strip()
+                if not value and required:
+                    raise ValueError(required_message)
+            if choices is not None and value not in choices:
+                raise ValueError(f"{name} must be one of {list(choices)}")
+            if validate is not None:
+                error = validate(value)
+                if error:
+                    raise ValueError(error)
+            return value
+
+        return convert
+
+
+class Schema:
+    def __init__(self, **fields):
+        self.fields = fields
+        self._compiled = tuple(
+            (name, field.compile(name), field.required, field.message or f"{name} is required", field.default)
+            for name, field in fields.items()
+        )
+
+    def load(self, data, partial=False):
+        """
+        Validate and coerce a request body.
+
+        Args:
+            data (dict): The decoded JSON body
+            partial (bool): Skip required checks and defaults, returning only the fields sent
+
+        Returns:
+            dict: The coerced values
+
+        Raises:
+            ValidationError: If the body is not an object or any field is invalid
+        """
+        if not isinstance(data, dict):
+            raise ValidationError({"body": "Request body must be a JSON object"})
+
+        values, errors = {}, {}
+        for name, convert, required, required_message, default in self._compiled:
+            value = data.get(name)
+            if value is None:
+                if partial:
+                    continue
+                if required:
+                    errors[name] = required_message
+                else:
+                    values[name] = default
+                continue
+            try:
+                values[name] = convert(value)
+            except ValueError as e:
+                errors[name] = str(e)
+
+        if errors:
+            raise ValidationError(errors)
+        return values
@@ -0,0 +1,270 @@
+"""
+Bulk synthetic data for benchmarks and capacity tests.
+
+Generates users (one in ADMIN_EVERY an admin) with emergency contacts, and
+reports clustered around hotspots in Kenyan towns, each with a location, a
+status history and sometimes media attachments. Media rows are stubs: their
+``file_url`` points at no stored file.
+
+Rows are written straight to the tables, bypassing the ORM: ``COPY`` on
+PostgreSQL and ``executemany`` elsewhere, one transaction per batch of
+users. Ids continue after the current maximum, so seeding again adds to
+what is there. The same seed, end date and existing ids always produce the
+same rows (bar the salt of the shared password hash), whatever the batch
+size.
+"""
+import csv
+import io
+import random
+from datetime import datetime, timedelta
+from flask_bcrypt import generate_password_hash
+from sqlalchemy import func, select, text
+from models import db, User, Report, Location, StatusUpdate, MediaAttachment, EmergencyContact
+from cache import get_cache
+from counts import get_count_cache
+
+# Every seeded account logs in with this password
+SEED_PASSWORD = "seed-password"
+ADMIN_EVERY = 1000
+
+# Town, latitude, longitude, share of reports, hotspots, spread in degrees
+TOWNS = (
+    ("Nairobi", -1.2864, 36.8172, 45, 40, 0.08),
+    ("Mombasa", -4.0435, 39.6682, 15, 15, 0.05),
+    ("Kisumu", -0.0917, 34.7680, 10, 10, 0.04),
+    ("Nakuru", -0.3031, 36.0800, 10, 10, 0.04),
+    ("Eldoret", 0.5143, 35.2698, 8, 8, 0.04),
+    ("Thika", -1.0333, 37.0693, 6, 6, 0.03),
+    ("Malindi", -3.2175, 40.1191, 3, 4, 0.03),
+    ("Garissa", -0.4532, 39.6461, 3, 4, 0.03),
+)
+HOTSPOT_SPREAD = 0.004  # about 450 m around a hotspot
+
+INCIDENTS = (
+    ("Traffic Accident", 30), ("Medical", 20), ("Fire", 12), ("Crime", 15),
+    ("Infrastructure", 10), ("Flood", 8), ("Workplace", 5),
+)
+FIRST_NAMES = ("Amina", "Brian", "Cynthia", "David", "Esther", "Felix", "Grace", "Hassan", "Irene", "James",
+               "Kevin", "Lucy", "Mercy", "Njeri", "Otieno", "Purity", "Wanjiru", "Yusuf", "Zawadi", "Kamau")
+LAST_NAMES = ("Mwangi", "Otieno", "Kamau", "Wanjiku", "Ochieng", "Njoroge", "Mohamed", "Kiprop", "Achieng",
+              "Mutua", "Kariuki", "Omondi", "Chebet", "Wafula", "Ali", "Nyambura")
+RELATIONSHIPS = ("Parent", "Sibling", "Spouse", "Friend", "Colleague", "Neighbour")
+
+USER_COLUMNS = ("id", "first_name", "last_name", "email", "password", "phone_number", "created_at",
+                "updated_at", "role")
+CONTACT_COLUMNS = ("id", "name", "relationship", "phone_number", "email", "address", "created_at",
+                   "updated_at", "user_id")
+REPORT_COLUMNS = ("id", "user_id", "incident", "details", "latitude", "longitude", "created_at", "updated_at")
+LOCATION_COLUMNS = ("id", "latitude", "longitude", "address", "created_at", "updated_at", "report_id")
+STATUS_COLUMNS = ("id", "updated_by", "status", "timestamp", "created_at", "updated_at", "report_id")
+MEDIA_COLUMNS = ("id", "file_url", "media_type", "uploaded_at", "updated_at", "report_id")
+
+# Insert order follows the foreign keys
+SEEDED = (
+    (User, USER_COLUMNS), (EmergencyContact, CONTACT_COLUMNS), (Report, REPORT_COLUMNS),
+    (Location, LOCATION_COLUMNS), (StatusUpdate, STATUS_COLUMNS), (MediaAttachment, MEDIA_COLUMNS),
+)
+
+
+def cumulative(pairs):
+    """Split (value, weight) pairs into values and cumulative weights for ``random.choices``."""
+    values, total, weights = [], 0, []
+    for value, weight in pairs:
+        total += weight
+        values.append(value)
+        weights.append(total)
+    return values, weights
+
+
+def stamp(value):
+    # SQLAlchemy's SQLite storage format, which PostgreSQL's COPY reads too
+    return value.isoformat(" ", "microseconds")
+
+
+def make_hotspots(rng):
+    """Return (hotspots, cumulative weights); a hotspot is (town, latitude, longitude)."""
+    hotspots = []
+    for town, latitude, longitude, share, count, spread in TOWNS:
+        for _ in range(count):
+            hotspot = (town, latitude + rng.gauss(0, spread), longitude + rng.gauss(0, spread))
+            # A few busy junctions and markets get most of a town's reports
+            hotspots.append((hotspot, share * rng.paretovariate(1.5) / count))
+    return cumulative(hotspots)
+
+
+def bulk_insert(connection, table, columns, rows):
+    """Append ``rows`` (tuples in ``columns`` order) to ``table`` in one round trip."""
+    if not rows:
+        return
+    if connection.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        # In CSV format an unquoted empty field is NULL
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+    elif connection.dialect.name == "sqlite":
+        # Straight to sqlite3's executemany; Core's per-value type processing costs more than the insert
+        placeholders = ", ".join("?" * len(columns))
+        connection.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def next_ids(connection):
+    return {
+        model: (connection.execute(select(func.max(model.__table__.c.id))).scalar() or 0) + 1
+        for model, _ in SEEDED
+    }
+
+
+def reset_sequences(connection):
+    """Move PostgreSQL id sequences past the ids written explicitly."""
+    if connection.dialect.name != "postgresql":
+        return
+    for model, _ in SEEDED:
+        table = model.__tablename__
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence(:table, 'id'), max(id)) FROM {table} "
+            "WHERE pg_get_serial_sequence(:table, 'id') IS NOT NULL HAVING max(id) IS NOT NULL"
+        ), {"table": table})
+
+
+class Generator:
+    def __init__(self, seed, reports_per_user, end, days, ids):
+        self.rng = random.Random(seed)
+        self.reports_per_user = reports_per_user
+        self.end = end
+        self.start = end - timedelta(days=days)
+        self.window = (end - self.start).total_seconds()
+        self.ids = ids
+        self.hotspots, self.hotspot_weights = make_hotspots(self.rng)
+        self.incidents, self.incident_weights = cumulative(INCIDENTS)
+        self.password = generate_password_hash(SEED_PASSWORD).decode("utf-8")
+        self.admins = []
+        self.seeded_users = 0
+
+    def take_id(self, model):
+        value = self.ids[model]
+        self.ids[model] += 1
+        return value
+
+    def batch(self, count):
+        """Generate ``count`` users and everything they own; returns rows per model."""
+        rows = {model: [] for model, _ in SEEDED}
+        for _ in range(count):
+            self.user(rows)
+        return rows
+
+    def user(self, rows):
+        rng = self.rng
+        user_id = self.take_id(User)
+        role = "admin" if self.seeded_users % ADMIN_EVERY == 0 else "user"
+        self.seeded_users += 1
+        if role == "admin":
+            self.admins.append(str(user_id))
+        joined = stamp(self.start - timedelta(seconds=rng.random() * 30 * 86400))
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows[User].append((
+            user_id, first_name, last_name, f"seed{user_id}@example.com", self.password,
+            f"+2547{user_id:08d}", joined, joined, role,
+        ))
+
+        for _ in range(rng.randint(0, 3)):
+            contact_id = self.take_id(EmergencyContact)
+            rows[EmergencyContact].append((
+                contact_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", rng.choice(RELATIONSHIPS),
+                f"+2541{contact_id:08d}", None, None, joined, joined, user_id,
+            ))
+
+        # Most people report rarely, a few report a lot
+        for _ in range(int(rng.expovariate(1 / self.reports_per_user)) if self.reports_per_user else 0):
+            self.report(rows, user_id)
+
+    def report(self, rows, user_id):
+        rng = self.rng
+        report_id = self.take_id(Report)
+        town, hotspot_lat, hotspot_lon = rng.choices(self.hotspots, cum_weights=self.hotspot_weights)[0]
+        incident = rng.choices(self.incidents, cum_weights=self.incident_weights)[0]
+        latitude = round(hotspot_lat + rng.gauss(0, HOTSPOT_SPREAD), 6)
+        longitude = round(hotspot_lon + rng.gauss(0, HOTSPOT_SPREAD), 6)
+        created = self.start + timedelta(seconds=rng.random() * self.window)
+        created_at = stamp(created)
+        rows[Report].append((
+            report_id, user_id, incident, f"{incident} reported near {town}", latitude, longitude, created_at, created_at,
+        ))
+        rows[Location].append((
+            self.take_id(Location), latitude, longitude, f"{town}, Kenya", created_at, created_at, report_id,
+        ))
+
+        # pending -> under investigation -> resolved or rejected; stops early for some
+        moment = created
+        if self.admins and rng.random() < 0.75:
+            statuses = ["under investigation"]
+            if rng.random() < 0.7:
+                statuses.append("resolved" if rng.random() < 0.85 else "rejected")
+            for status in statuses:
+                moment = min(self.end, moment + timedelta(seconds=rng.expovariate(1 / 7200)))
+                changed_at = stamp(moment)
+                rows[StatusUpdate].append((
+                    self.take_id(StatusUpdate), rng.choice(self.admins), status, changed_at, changed_at, changed_at,
+                    report_id,
+                ))
+
+        if rng.random() < 0.3:
+            for _ in range(rng.randint(1, 3)):
+                media_id = self.take_id(MediaAttachment)
+                image = rng.random() < 0.8
+                rows[MediaAttachment].append((
+                    media_id, f"seed/{report_id}/{media_id}.{'jpg' if image else 'mp4'}",
+                    "image/jpeg" if image else "video/mp4", created_at, created_at, report_id,
+                ))
+
+
+def seed_data(users, reports_per_user=5, seed=0, batch_size=5000, days=365, end=None, echo=None):
+    """
+    Insert ``users`` synthetic users and their data.
+
+    Args:
+        users (int): Users to create
+        reports_per_user (float): Mean reports per user
+        seed (int): Random seed; the same seed gives the same data
+        batch_size (int): Users written per transaction
+        days (int): Reports are spread over this many days before ``end``
+        end (datetime): Latest timestamp; defaults to today's midnight
+        echo (callable): Receives a progress line after each batch
+
+    Returns:
+        dict: Rows inserted per table name
+    """
+    end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Seeding writes, so it must not be routed to a replica
+    connection = db.session.connection(bind_arguments={"bind": db.engine})
+    generator = Generator(seed, reports_per_user, end, days, next_ids(connection))
+    inserted = {model.__tablename__: 0 for model, _ in SEEDED}
+
+    remaining = users
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        rows = generator.batch(count)
+        connection = db.session.connection(bind_arguments={"bind": db.engine})
+        for model, columns in SEEDED:
+            bulk_insert(connection, model.__table__, columns, rows[model])
+            inserted[model.__tablename__] += len(rows[model])
+        db.session.commit()
+        remaining -= count
+        if echo:
+            echo(f"{users - remaining}/{users} users, {inserted['reports']} reports")
+
+    reset_sequences(db.session.connection(bind_arguments={"bind": db.engine}))
+    db.session.commit()
+
+    # No ORM flush saw these rows, so the session hooks did not invalidate anything
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(set(inserted))
+    get_count_cache().clear()
+    return inserted
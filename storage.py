@@ -0,0 +1,177 @@
+"""
+Media storage backends.
+
+Media is addressed by a relative key such as ``3f/a2/3fa2...c1.jpg``; the
+two leading shard directories come from the random file name, so no single
+directory grows without bound. ``MediaAttachment.file_url`` stores the key,
+which lets every node resolve the same file through the configured backend.
+"""
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from flask import current_app
+
+try:
+    import boto3
+except ImportError:  # only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+
+def new_media_key(extension):
+    name = uuid.uuid4().hex
+    return f"{name[:2]}/{name[2:4]}/{name}.{extension}"
+
+
+class Storage(ABC):
+    """Interface every media storage backend implements."""
+
+    @abstractmethod
+    def save(self, key, fileobj):
+        """Store the contents of a readable file object under ``key``."""
+
+    @abstractmethod
+    def save_file(self, key, path):
+        """Store a local file under ``key``, consuming the local copy."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Delete ``key``; missing keys are ignored."""
+
+    @abstractmethod
+    def exists(self, key):
+        """Return whether ``key`` is stored."""
+
+    @abstractmethod
+    def modified_at(self, key):
+        """Return when ``key`` was last written, as an aware UTC datetime."""
+
+    @abstractmethod
+    def list_keys(self, start_after=None):
+        """Yield stored keys in ascending order, optionally after ``start_after``."""
+
+
+class LocalStorage(Storage):
+    """Sharded directory tree on the local filesystem."""
+
+    # Internal directories that never hold finalized media
+    RESERVED = ("_staging",)
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        # Records created before keys were relative store absolute paths
+        return key if os.path.isabs(key) else os.path.join(self.root, key)
+
+    def save(self, key, fileobj):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+
+    def save_file(self, key, path):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def modified_at(self, key):
+        return datetime.fromtimestamp(os.path.getmtime(self.path(key)), tz=timezone.utc)
+
+    def key_for_path(self, path):
+        """Relative key for a legacy absolute path inside the root, else None."""
+        relative = os.path.relpath(path, self.root)
+        return None if relative.startswith("..") else relative.replace(os.sep, "/")
+
+    def list_keys(self, start_after=None):
+        yield from self._walk("", start_after)
+
+    def _walk(self, prefix, start_after):
+        directory = os.path.join(self.root, prefix)
+        try:
+            # Directories sort as "name/" so the walk matches plain key order
+            entries = sorted(
+                os.scandir(directory),
+                key=lambda entry: entry.name + "/" if entry.is_dir() else entry.name,
+            )
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            key = f"{prefix}{entry.name}"
+            if entry.is_dir():
+                if not prefix and entry.name in self.RESERVED:
+                    continue
+                # Skip whole subtrees that sort entirely before the checkpoint
+                if start_after and not start_after.startswith(key + "/") and key + "/" <= start_after:
+                    continue
+                yield from self._walk(key + "/", start_after)
+            elif start_after is None or key > start_after:
+                yield key
+
+
+class S3Storage(Storage):
+    """S3-compatible object storage (AWS S3, MinIO, ...)."""
+
+    def __init__(self, bucket, endpoint_url=None, region=None, prefix=""):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 to be installed")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    def object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def save(self, key, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self.object_key(key))
+
+    def save_file(self, key, path):
+        self.client.upload_file(path, self.bucket, self.object_key(key))
+        os.remove(path)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def exists(self, key):
+        response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=self.object_key(key), MaxKeys=1)
+        return any(obj["Key"] == self.object_key(key) for obj in response.get("Contents", []))
+
+    def modified_at(self, key):
+        return self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))["LastModified"]
+
+    def list_keys(self, start_after=None):
+        # S3 lists keys in ascending UTF-8 order, 1000 per page
+        params = {"Bucket": self.bucket, "Prefix": self.prefix}
+        if start_after:
+            params["StartAfter"] = self.object_key(start_after)
+        for page in self.client.get_paginator("list_objects_v2").paginate(**params):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.prefix):]
+
+
+def get_storage(app=None):
+    """Return the app's configured storage backend, creating it on first use."""
+    app = app or current_app
+    storage = app.extensions.get("media_storage")
+    if storage is None:
+        if app.config.get("STORAGE_BACKEND", "local") == "s3":
+            storage = S3Storage(
+                bucket=app.config["S3_BUCKET"],
+                endpoint_url=app.config.get("S3_ENDPOINT_URL"),
+                region=app.config.get("S3_REGION"),
+                prefix=app.config.get("S3_PREFIX", ""),
+            )
+        else:
+            storage = LocalStorage(app.config["UPLOAD_FOLDER"])
+        app.extensions["media_storage"] = storage
+    return storage
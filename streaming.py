@@ -0,0 +1,103 @@
+import itertools
+import json
+import zlib
+from flask import Response, current_app, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+STREAM_BATCH_SIZE = 500
+# Responses smaller than this are sent uncompressed with a Content-Length
+COMPRESS_MIN_SIZE = 1024
+# Encoded JSON is buffered up to this size before being handed to the server
+FLUSH_SIZE = 16 * 1024
+
+
+def json_list_chunks(rows, serialize):
+    """Encode ``{"Success": true, "data": [...]}`` incrementally from ``rows``."""
+    buffer = [b'{"Success": true, "data": [']
+    size = 0
+    first = True
+    for row in rows:
+        item = json.dumps(serialize(row)).encode()
+        buffer.append(item if first else b"," + item)
+        first = False
+        size += len(item) + 1
+        if size >= FLUSH_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    buffer.append(b"]}")
+    yield b"".join(buffer)
+
+
+def negotiate_encoding():
+    """Pick the best supported Content-Encoding from Accept-Encoding."""
+    accepted = request.accept_encodings
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    scored = [(accepted.quality(name), name) for name in candidates]
+    quality, name = max(scored, key=lambda pair: pair[0])
+    return name if quality > 0 else None
+
+
+def compress_chunks(chunks, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor()
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        # wbits=31 produces a gzip container rather than raw zlib
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def json_list_response(query, serialize, status=200):
+    """
+    Stream a JSON list response from a query without materializing it.
+
+    Rows are fetched in batches with ``yield_per`` and encoded as they arrive,
+    so memory use does not grow with the result size. Bodies larger than
+    COMPRESS_MIN_SIZE are compressed on the fly with the encoding negotiated
+    from Accept-Encoding.
+
+    Args:
+        query: A SQLAlchemy query or Core result returning the rows to serialize
+        serialize (callable): Converts one row to a JSON-compatible dict
+        status (int): The HTTP status code
+
+    Returns:
+        Response: A streaming Flask response
+    """
+    chunks = json_list_chunks(query.yield_per(STREAM_BATCH_SIZE), serialize)
+    threshold = current_app.config.get("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)
+
+    # Read ahead until we know whether the body is worth compressing
+    head, size = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= threshold:
+            break
+    else:
+        return Response(b"".join(head), status=status, mimetype="application/json")
+
+    body = itertools.chain(head, chunks)
+    encoding = negotiate_encoding()
+    response = Response(
+        stream_with_context(compress_chunks(body, encoding) if encoding else body),
+        status=status,
+        mimetype="application/json",
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
@@ -0,0 +1,43 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from models import db
+
+_executor = None
+_executor_pid = None
+
+
+def get_executor(app):
+    global _executor, _executor_pid
+    # Threads do not survive fork, so each (preforked) worker builds its own pool
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(
+            max_workers=app.config.get("TASK_WORKERS", 4), thread_name_prefix="ajali-task"
+        )
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def enqueue(fn, *args, **kwargs):
+    """
+    Run ``fn(*args, **kwargs)`` off the request path in an app context.
+
+    Jobs run on an in-process thread pool, so they are lost if the worker
+    dies; callers persist enough state to retry them (see ``flask media``).
+    With TASKS_EAGER set (as in testing) the job runs inline instead.
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception(f"Background task {fn.__name__} failed")
+            finally:
+                db.session.remove()
+
+    if app.config.get("TASKS_EAGER"):
+        return run()
+    return get_executor(app).submit(run)
@@ -0,0 +1,25 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from config import TestingConfig
+from models import db, User
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin_headers(app):
+    admin = User(first_name="Ada", last_name="Admin", email="admin@example.com", password="x",
+                 phone_number="0700000001", role="admin")
+    db.session.add(admin)
+    db.session.commit()
+    token = create_access_token(identity=str(admin.id), additional_claims={"role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,137 @@
+import io
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+import deletion
+from models import db, User, Report, Location, MediaAttachment, MediaUpload, StatusUpdate, DeletionJob
+from storage import get_storage, new_media_key
+
+
+def add_report(user, n, staging=None):
+    report = Report(user_id=user.id, incident="Fire", details=f"Report {n}", latitude=-1.28, longitude=36.82)
+    db.session.add(report)
+    db.session.flush()
+    db.session.add(Location(report_id=report.id, latitude=-1.28, longitude=36.82, address=f"Street {n}"))
+    key = new_media_key("jpg")
+    if staging is not None:
+        get_storage().save(key, io.BytesIO(b"jpeg"))
+        staged = staging / f"{report.id}.jpg"
+        staged.write_bytes(b"raw")
+        db.session.add(MediaUpload(report_id=report.id, filename="a.jpg", media_type="image/jpeg",
+                                   staging_path=str(staged), status="ready"))
+    db.session.add(MediaAttachment(report_id=report.id, file_url=key, media_type="image/jpeg"))
+    db.session.add(StatusUpdate(report_id=report.id, status="under investigation", updated_by=str(user.id),
+                                timestamp=datetime.utcnow()))
+    return report
+
+
+@pytest.fixture
+def staging(app, tmp_path):
+    app.config["UPLOAD_FOLDER"] = str(tmp_path / "uploads")
+    path = tmp_path / "staging"
+    path.mkdir()
+    return path
+
+
+def stored_files(tmp_path):
+    return [name for _, _, names in os.walk(tmp_path) for name in names]
+
+
+@pytest.fixture
+def user(app):
+    user = User(first_name="Uma", last_name="User", email="user@example.com", password="x",
+                phone_number="0700000002")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_soft_deleted_report_rows_are_hidden_before_the_job_runs(app, admin_headers, user):
+    deleted, kept = add_report(user, 1), add_report(user, 2)
+    db.session.commit()
+    deleted_id, kept_id = deleted.id, kept.id
+    deleted_location_id, kept_location_id = deleted.location.id, kept.location.id
+    # The state a DeletionJob leaves until it runs, or if it fails
+    deleted.deleted_at = datetime.utcnow()
+    db.session.commit()
+    db.session.expunge_all()
+    client = app.test_client()
+
+    assert client.get(f"/reports/{deleted_id}", headers=admin_headers).status_code == 404
+    assert client.get(f"/locations/{deleted_location_id}").status_code == 404
+    assert client.get(f"/reports/{deleted_id}/media", headers=admin_headers).status_code == 404
+    assert client.get(f"/locations/{kept_location_id}").status_code == 200
+    for model in (Location, MediaAttachment, StatusUpdate):
+        assert [row.report_id for row in model.query] == [kept_id]
+        assert model.query.execution_options(include_deleted=True).count() == 2
+
+
+def test_user_deletion_runs_in_batches(app, admin_headers, user, staging, tmp_path):
+    app.config["DELETION_BATCH_SIZE"] = 2
+    for n in range(5):
+        add_report(user, n, staging)
+    db.session.commit()
+    user_id = user.id
+    assert len(stored_files(tmp_path)) == 10
+
+    batches = []
+
+    def count_report_deletes(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM reports"):
+            batches.append(statement)
+    event.listen(db.engine, "before_cursor_execute", count_report_deletes)
+    try:
+        response = app.test_client().delete(f"/users/{user_id}", headers=admin_headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_report_deletes)
+
+    assert response.status_code == 200
+    job_id = response.get_json()["deletion_job"]["id"]
+    assert len(batches) == 3
+    assert stored_files(tmp_path) == []
+    assert db.session.get(User, user_id, execution_options={"include_deleted": True}) is None
+    for model in (Report, Location, MediaAttachment, MediaUpload, StatusUpdate):
+        assert model.query.execution_options(include_deleted=True).count() == 0
+
+    response = app.test_client().get("/admin/deletions?status=completed", headers=admin_headers)
+    assert response.status_code == 200
+    [job] = response.get_json()["data"]
+    assert job["id"] == job_id
+    assert job["entity"] == "user"
+    assert (job["total_reports"], job["deleted_reports"], job["deleted_files"]) == (5, 5, 10)
+    # Five reports with four dependent rows each, then the user; its panic bundle went with the soft delete
+    assert job["deleted_rows"] == 5 * 5 + 1
+    assert job["finished_at"] is not None
+
+
+def test_resume_finishes_files_of_a_failed_job(app, admin_headers, user, staging, tmp_path, monkeypatch):
+    report = add_report(user, 1, staging)
+    db.session.commit()
+    report_id = report.id
+
+    def storage_down(keys):
+        raise OSError("storage unavailable")
+    monkeypatch.setattr(deletion, "delete_media_files", storage_down)
+    response = app.test_client().delete(f"/reports/{report_id}", headers=admin_headers)
+    assert response.status_code == 200
+    job_id = response.get_json()["deletion_job"]["id"]
+
+    # The batch committed with its files recorded, then the job died deleting them
+    db.session.expire_all()
+    job = db.session.get(DeletionJob, job_id)
+    assert job.status == "failed"
+    assert job.deleted_reports == 1
+    assert job.pending_files is not None
+    assert Report.query.execution_options(include_deleted=True).count() == 0
+    assert len(stored_files(tmp_path)) == 2
+
+    monkeypatch.undo()
+    result = app.test_cli_runner().invoke(args=["deletions", "resume"])
+    assert "Ran 1 unfinished deletion job(s)" in result.output
+
+    db.session.expire_all()
+    job = db.session.get(DeletionJob, job_id)
+    assert (job.status, job.error, job.pending_files) == ("completed", None, None)
+    assert (job.deleted_reports, job.deleted_files) == (1, 2)
+    assert stored_files(tmp_path) == []
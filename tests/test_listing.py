@@ -0,0 +1,29 @@
+import pytest
+from datetime import datetime
+from models import db, User, Report, Location
+
+
+@pytest.fixture
+def locations(app):
+    user = User(first_name="Uma", last_name="User", email="user@example.com", password="x",
+                phone_number="0700000002")
+    db.session.add(user)
+    db.session.flush()
+    for n in range(3):
+        report = Report(user_id=user.id, incident="Fire", details=f"Report {n}", latitude=-1.28, longitude=36.82,
+                        deleted_at=datetime.utcnow() if n == 0 else None)
+        db.session.add(report)
+        db.session.flush()
+        db.session.add(Location(report_id=report.id, latitude=-1.28, longitude=36.82, address=f"Street {n}"))
+    db.session.commit()
+
+
+@pytest.mark.parametrize("query", ["", "?fields=id,report_id,address"])
+def test_location_list_leaves_out_soft_deleted_reports(app, locations, query):
+    response = app.test_client().get(f"/locations{query}")
+
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert [location["address"] for location in data] == ["Street 1", "Street 2"]
+    if not query:
+        assert all(location["report"]["details"].startswith("Report") for location in data)
@@ -0,0 +1,108 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from config import TestingConfig
+from models import db, User, Report
+from replicas import REPLICA_PREFIX, STICKY_COOKIE
+
+
+def make_app(tmp_path, **overrides):
+    config = type("ReplicaConfig", (TestingConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+        "SQLALCHEMY_REPLICA_URIS": [f"sqlite:///{tmp_path / 'replica.db'}"],
+        "RESPONSE_CACHE_BACKEND": "none",
+        **overrides,
+    })
+    app = create_app(config)
+    with app.app_context():
+        # The two files stand in for a primary and a replica that has not caught up
+        for name, engine in db.engines.items():
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(User.__table__.insert(), {
+                    "id": 1, "first_name": "Ada", "last_name": "Admin", "email": "admin@example.com",
+                    "password": "x", "phone_number": "0700000001", "role": "admin",
+                })
+                connection.execute(Report.__table__.insert(), {
+                    "user_id": 1, "incident": "Fire", "details": name or "primary",
+                })
+    return app
+
+
+def close(app):
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # Flask-SQLAlchemy registers a metadata per bind on the shared db, which later apps' create_all would look for
+    for name in [name for name in db.metadatas if name and name.startswith(REPLICA_PREFIX)]:
+        del db.metadatas[name]
+
+
+def headers(user_id=1):
+    token = create_access_token(identity=str(user_id), additional_claims={"role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def report_details(client, app, user_id=1):
+    with app.app_context():
+        response = client.get("/reports", headers=headers(user_id))
+    assert response.status_code == 200
+    return [report["details"] for report in response.get_json()["data"]]
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    close(app)
+
+
+def test_reads_go_to_the_replica(app):
+    assert report_details(app.test_client(), app) == ["replica_0"]
+
+
+def test_writes_go_to_the_primary_and_later_reads_follow(app):
+    client = app.test_client()
+    with app.app_context():
+        response = client.post("/reports", headers=headers(), json={
+            "user_id": 1, "incident": "Flood", "details": "written", "latitude": 0, "longitude": 0,
+        })
+    assert response.status_code == 201
+    assert response.headers["Set-Cookie"].startswith(f"{STICKY_COOKIE}=")
+
+    with app.app_context():
+        primary = db.session.execute(db.select(Report.details).order_by(Report.id)).scalars().all()
+        with db.engines["replica_0"].connect() as connection:
+            replica = connection.execute(db.select(Report.details)).scalars().all()
+    assert primary == ["primary", "written"]
+    assert replica == ["replica_0"]
+
+    # The same client reads its own write from the primary
+    assert report_details(client, app) == ["primary", "written"]
+
+
+def test_sticky_cookie_keeps_other_workers_on_the_primary(app):
+    client = app.test_client()
+    with app.app_context():
+        response = client.post("/reports", headers=headers(), json={
+            "user_id": 1, "incident": "Flood", "details": "written", "latitude": 0, "longitude": 0,
+        })
+    cookie = response.headers["Set-Cookie"].split(";")[0].split("=", 1)[1]
+
+    # Another identity is not a recent writer in this worker, so only the cookie can route it
+    other = app.test_client()
+    assert report_details(other, app, user_id=2) == ["replica_0"]
+    other.set_cookie(STICKY_COOKIE, cookie)
+    assert report_details(other, app, user_id=2) == ["primary", "written"]
+
+
+def test_lagging_replica_falls_back_to_the_primary(tmp_path):
+    # SQLite replicas always report no lag, so a negative limit makes every replica too far behind
+    app = make_app(tmp_path, REPLICA_MAX_LAG=-1)
+    try:
+        assert report_details(app.test_client(), app) == ["primary"]
+        with app.app_context():
+            assert app.extensions["replica_health"].available() == []
+    finally:
+        close(app)
@@ -0,0 +1,43 @@
+import pytest
+from models import db, User, Report, Location, MediaAttachment, StatusUpdate
+from datetime import datetime
+
+
+@pytest.fixture
+def reports(app, admin_headers):
+    user = User.query.filter_by(email="admin@example.com").one()
+    for i in range(50):
+        report = Report(user_id=user.id, incident="Fire", details=f"Report {i}", latitude=-1.28, longitude=36.82)
+        db.session.add(report)
+        db.session.flush()
+        db.session.add(Location(report_id=report.id, latitude=-1.28, longitude=36.82, address="Nairobi"))
+        db.session.add(MediaAttachment(report_id=report.id, file_url=f"{i}.jpg", media_type="image/jpeg"))
+        db.session.add(StatusUpdate(report_id=report.id, status="resolved", updated_by=str(user.id),
+                                    timestamp=datetime.utcnow()))
+    db.session.commit()
+
+
+@pytest.mark.parametrize("include", ["location", "media", "status_history", "location,media,status_history"])
+def test_list_reports_with_includes(app, admin_headers, reports, include):
+    response = app.test_client().get(f"/reports?include={include}", headers=admin_headers)
+
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert len(data) == 50
+    if "location" in include:
+        assert all(report["location"]["address"] == "Nairobi" for report in data)
+    if "media" in include:
+        assert all(len(report["media"]) == 1 for report in data)
+    if "status_history" in include:
+        assert all(len(report["status_history"]) == 1 for report in data)
+
+
+def test_list_reports_with_includes_hides_soft_deleted(app, admin_headers, reports):
+    report = Report.query.order_by(Report.id).first()
+    report.deleted_at = datetime.utcnow()
+    db.session.commit()
+
+    response = app.test_client().get("/reports?include=location", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()["data"]) == 49
@@ -0,0 +1,151 @@
+"""
+Per-user token-bucket throttling for write endpoints.
+
+Each client (its JWT identity, or its IP address without a token) has one
+bucket per name in THROTTLE_BUCKETS, e.g. ``reports``, ``media_bytes`` and
+``status_changes``. A bucket holds up to ``capacity`` tokens and refills at
+``rate`` tokens per second. A request takes its cost (1, or the upload size
+for byte buckets) and is refused with a 429 when the bucket runs short.
+
+``throttle`` runs before the handler, its JWT check and any idempotency
+lookup, so a refused request never reaches the database. Buckets live in
+THROTTLE_BACKEND: ``memory`` is per worker, ``redis`` (at REDIS_URL) is
+shared by every worker, and ``none`` turns throttling off.
+"""
+import math
+import threading
+import time
+from functools import wraps
+from flask import current_app, request
+from replicas import client_key
+
+try:
+    import redis
+except ImportError:  # only needed for THROTTLE_BACKEND=redis
+    redis = None
+
+# Atomic refill-and-take; uses the server clock so every worker agrees
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class MemoryBuckets:
+    MAX_ENTRIES = 100_000
+
+    def __init__(self):
+        self.buckets = {}  # key -> [tokens, updated, full_at]
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost):
+        """Return (allowed, tokens left) after trying to take ``cost`` tokens."""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.MAX_ENTRIES:
+                    self.prune(now)
+                bucket = self.buckets[key] = [capacity, now, now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            bucket[:] = tokens, now, now + (capacity - tokens) / rate
+            return allowed, tokens
+
+    def prune(self, now):
+        # A bucket that has refilled completely is the same as no bucket
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[2] > now}
+
+
+class RedisBuckets:
+    def __init__(self, url, prefix="throttle:"):
+        if redis is None:
+            raise RuntimeError("THROTTLE_BACKEND=redis requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+        self.prefix = prefix
+
+    def take(self, key, capacity, rate, cost):
+        allowed, tokens = self.script(keys=[self.prefix + key], args=[capacity, rate, cost])
+        return bool(allowed), float(tokens)
+
+
+def get_throttle(app=None):
+    """Return the app's bucket store, or None when THROTTLE_BACKEND is "none"."""
+    app = app or current_app
+    if "throttle" not in app.extensions:
+        backend_name = app.config.get("THROTTLE_BACKEND", "memory")
+        if backend_name == "redis":
+            store = RedisBuckets(app.config["REDIS_URL"])
+        elif backend_name == "memory":
+            store = MemoryBuckets()
+        else:
+            store = None
+        app.extensions["throttle"] = store
+    return app.extensions["throttle"]
+
+
+def upload_size():
+    """
+    Cost for byte buckets: the declared body size, known before the body is read.
+
+    None for a chunked body without Content-Length, which is refused rather than let through for free.
+    """
+    return request.content_length
+
+
+def throttle(bucket, cost=None):
+    """
+    Refuse the request with a 429 once the caller's ``bucket`` is empty.
+
+    Args:
+        bucket (str): Name of a bucket in THROTTLE_BUCKETS
+        cost (callable): Returns the tokens this request takes, or None when it
+            cannot tell (the request is then refused with a 411); 1 by default
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            store = get_throttle()
+            if store is None:
+                return fn(*args, **kwargs)
+            amount = cost() if cost else 1
+            if amount is None:
+                return {"Success": False, "message": "Content-Length is required"}, 411
+
+            capacity, rate = current_app.config["THROTTLE_BUCKETS"][bucket]
+            try:
+                allowed, tokens = store.take(f"{bucket}:{client_key()}", capacity, rate, amount)
+            except Exception as e:
+                # An unreachable store must not take the write path down with it
+                current_app.logger.error(f"Throttle store unavailable: {str(e)}")
+                return fn(*args, **kwargs)
+            if allowed:
+                return fn(*args, **kwargs)
+
+            retry_after = math.ceil((amount - tokens) / rate) if amount <= capacity else None
+            headers = {"Retry-After": str(retry_after)} if retry_after else {}
+            return {
+                "Success": False,
+                "message": f"Rate limit exceeded for {bucket.replace('_', ' ')}, please try again later",
+                "retry_after": retry_after,
+            }, 429, headers
+        return wrapper
+    return decorator
@@ -0,0 +1,187 @@
+"""
+Incremental priority scoring for the admin triage queue.
+
+A pending report's live score is::
+
+    severity + CLUSTER_WEIGHT * min(cluster_size, MAX_CLUSTER)
+             + MEDIA_WEIGHT * has_media + AGE_WEIGHT * hours_waiting
+
+Only pending reports have a TriageEntry. Entries are written in the same
+transaction as the report, status update or media change that affects them.
+Clustering is symmetric, so dequeuing a report shrinks every cluster it
+was counted in.
+"""
+import math
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Report, StatusUpdate, MediaAttachment, TriageEntry
+from geocoding import KM_PER_DEGREE
+
+# Incident weights, matched case-insensitively on the incident type
+SEVERITY_WEIGHTS = {
+    "fire": 50,
+    "medical": 45,
+    "traffic accident": 40,
+    "accident": 40,
+    "workplace": 30,
+    "infrastructure": 20,
+}
+DEFAULT_SEVERITY = 10
+CLUSTER_WEIGHT = 5
+MAX_CLUSTER = 10
+MEDIA_WEIGHT = 10
+AGE_WEIGHT = 2  # points per hour waiting
+
+# Reports of the same incident within this distance and time form a cluster
+CLUSTER_RADIUS_KM = 2
+CLUSTER_WINDOW = timedelta(hours=6)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def severity_for(incident):
+    weights = current_app.config.get("TRIAGE_SEVERITY_WEIGHTS", SEVERITY_WEIGHTS)
+    return weights.get((incident or "").strip().lower(), DEFAULT_SEVERITY)
+
+
+def hours_since_epoch(moment):
+    return (moment - EPOCH).total_seconds() / 3600
+
+
+def base_score(entry):
+    return (entry.severity
+            + CLUSTER_WEIGHT * min(entry.cluster_size, MAX_CLUSTER)
+            + MEDIA_WEIGHT * entry.has_media)
+
+
+def recompute(entry):
+    entry.priority = base_score(entry) - AGE_WEIGHT * hours_since_epoch(entry.created_at)
+
+
+def live_score(entry, now=None):
+    return entry.priority + AGE_WEIGHT * hours_since_epoch(now or datetime.utcnow())
+
+
+def nearby_entries(latitude, longitude, incident, created_at):
+    """Queued reports of the same incident within the cluster radius and window either side."""
+    d_lat = CLUSTER_RADIUS_KM / KM_PER_DEGREE
+    d_lon = CLUSTER_RADIUS_KM / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (
+        TriageEntry.query
+        .join(Report, Report.id == TriageEntry.report_id)
+        .filter(
+            TriageEntry.latitude.between(latitude - d_lat, latitude + d_lat),
+            TriageEntry.longitude.between(longitude - d_lon, longitude + d_lon),
+            TriageEntry.created_at.between(created_at - CLUSTER_WINDOW, created_at + CLUSTER_WINDOW),
+            Report.incident == incident,
+        )
+        .all()
+    )
+
+
+def add_to_queue(report):
+    """Queue a new (unflushed) report and grow the clusters it joins."""
+    created_at = report.created_at or datetime.utcnow()
+    entry = TriageEntry(
+        latitude=report.latitude,
+        longitude=report.longitude,
+        severity=severity_for(report.incident),
+        has_media=False,
+        created_at=created_at,
+        cluster_size=0,
+    )
+    if report.latitude or report.longitude:
+        neighbours = nearby_entries(report.latitude, report.longitude, report.incident, created_at)
+        entry.cluster_size = len(neighbours)
+        for neighbour in neighbours:
+            neighbour.cluster_size += 1
+            recompute(neighbour)
+    recompute(entry)
+    report.triage_entry = entry
+    return entry
+
+
+def remove_entry(entry, incident):
+    """Dequeue ``entry`` and shrink the clusters it was counted in."""
+    if entry.latitude or entry.longitude:
+        for neighbour in nearby_entries(entry.latitude, entry.longitude, incident, entry.created_at):
+            if neighbour.id != entry.id and neighbour.cluster_size > 0:
+                neighbour.cluster_size -= 1
+                recompute(neighbour)
+    db.session.delete(entry)
+
+
+def remove_from_queue(report_id):
+    entry = TriageEntry.query.filter_by(report_id=report_id).first()
+    if entry:
+        remove_entry(entry, entry.report.incident)
+
+
+def sync_queue(report, status):
+    """Queue ``report`` while ``status`` is pending and dequeue it otherwise."""
+    if status != "pending":
+        remove_from_queue(report.id)
+    elif report.triage_entry is None:
+        entry = add_to_queue(report)
+        if report.media_attachments:
+            entry.has_media = True
+            recompute(entry)
+
+
+def mark_has_media(report_id):
+    entry = TriageEntry.query.filter_by(report_id=report_id).first()
+    if entry and not entry.has_media:
+        entry.has_media = True
+        recompute(entry)
+
+
+def top_entries(limit, options=()):
+    return (
+        TriageEntry.query
+        .options(*options)
+        .order_by(TriageEntry.priority.desc(), TriageEntry.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def rebuild_queue(batch_size=1000):
+    """Recreate every entry from scratch, e.g. to backfill or after changing weights."""
+    TriageEntry.query.delete()
+    db.session.commit()
+
+    latest = (
+        db.session.query(StatusUpdate.report_id, db.func.max(StatusUpdate.timestamp).label("timestamp"))
+        .group_by(StatusUpdate.report_id)
+        .subquery()
+    )
+    handled = (
+        db.session.query(StatusUpdate.report_id)
+        .join(latest, (latest.c.report_id == StatusUpdate.report_id) & (latest.c.timestamp == StatusUpdate.timestamp))
+        .filter(StatusUpdate.status != "pending")
+    )
+    with_media = db.session.query(MediaAttachment.report_id)
+
+    count = 0
+    last_id = 0
+    while True:
+        reports = (
+            Report.query
+            .filter(Report.id > last_id, ~Report.id.in_(handled))
+            .order_by(Report.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not reports:
+            break
+        media_ids = {report_id for (report_id,) in with_media.filter(MediaAttachment.report_id.in_([r.id for r in reports]))}
+        for report in reports:
+            entry = add_to_queue(report)
+            if report.id in media_ids:
+                entry.has_media = True
+                recompute(entry)
+            db.session.flush()
+        db.session.commit()
+        count += len(reports)
+        last_id = reports[-1].id
+    return count
@@ -0,0 +1,122 @@
+from datetime import datetime
+from sqlalchemy.orm import selectinload, load_only
+from models import User, Report, Location, EmergencyContact, MediaAttachment
+
+
+# Relationships a client may embed in report responses with ?include=
+REPORT_INCLUDES = {
+    "media": Report.media_attachments,
+    "location": Report.location,
+    "status_history": Report.status_updates,
+}
+
+
+def parse_includes(raw, allowed=REPORT_INCLUDES):
+    """
+    Parse a comma separated ?include= value.
+
+    Returns:
+        list: The requested relationship names, in request order
+
+    Raises:
+        ValueError: If any name is not in ``allowed``
+    """
+    if not raw:
+        return []
+    includes = []
+    for name in raw.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in allowed:
+            raise ValueError(f"Invalid include '{name}'. Must be one of {sorted(allowed)}")
+        if name not in includes:
+            includes.append(name)
+    return includes
+
+
+def include_options(includes, allowed=REPORT_INCLUDES):
+    # selectinload issues one extra IN query per relationship, whatever the row count
+    return [selectinload(allowed[name]) for name in includes]
+
+
+def serialize_status_update(status_update):
+    return {
+        "id": status_update.id,
+        "status": status_update.status,
+        "updated_by": status_update.updated_by,
+        "timestamp": status_update.timestamp.isoformat() if status_update.timestamp else None,
+    }
+
+
+def serialize_includes(report, includes):
+    """Serialize the requested relationships of an already loaded report."""
+    data = {}
+    if "media" in includes:
+        data["media"] = [m.to_dict(rules=("-report",)) for m in report.media_attachments]
+    if "location" in includes:
+        data["location"] = report.location.to_dict(rules=("-report",)) if report.location else None
+    if "status_history" in includes:
+        history = sorted(report.status_updates, key=lambda s: s.timestamp)
+        data["status_history"] = [serialize_status_update(s) for s in history]
+    return data
+
+
+# Columns a client may request with ?fields=, per model
+MODEL_FIELDS = {
+    User: ("id", "first_name", "last_name", "email", "phone_number", "role", "created_at", "updated_at"),
+    Report: ("id", "user_id", "incident", "details", "latitude", "longitude", "created_at", "updated_at"),
+    Location: ("id", "report_id", "latitude", "longitude", "address", "created_at", "updated_at"),
+    EmergencyContact: ("id", "user_id", "name", "relationship", "phone_number", "email", "address", "created_at", "updated_at"),
+    MediaAttachment: ("id", "report_id", "file_url", "media_type", "uploaded_at", "updated_at"),
+}
+
+
+def parse_fields(raw, model, extra=()):
+    """
+    Parse a comma separated ?fields= value against the model's allowlist.
+
+    Args:
+        raw (str): The raw query string value
+        model: The model being serialized
+        extra (tuple): Computed fields the endpoint adds on top of the columns
+
+    Returns:
+        tuple: The requested fields, or None when every field is wanted
+
+    Raises:
+        ValueError: If any field is not allowed
+    """
+    if not raw:
+        return None
+    allowed = MODEL_FIELDS[model] + tuple(extra)
+    fields = []
+    for name in raw.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in allowed:
+            raise ValueError(f"Invalid field '{name}'. Must be one of {list(allowed)}")
+        if name not in fields:
+            fields.append(name)
+    return tuple(fields) or None
+
+
+def fields_options(model, fields):
+    """Loader options restricting the SELECT to the requested columns."""
+    if not fields:
+        return []
+    columns = [getattr(model, name) for name in fields if name in MODEL_FIELDS[model]]
+    # The primary key is always loaded, so fall back to it for computed-only requests
+    return [load_only(*(columns or [model.id]))]
+
+
+def to_dict_fields(obj, fields):
+    return obj.to_dict(only=fields) if fields else obj.to_dict()
+
+
+def parse_date(value):
+    """Parse an optional ISO 8601 query argument; raises ValueError when it is malformed."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
@@ -0,0 +1,8 @@
+"""WSGI entry point, e.g. ``gunicorn -c gunicorn.conf.py wsgi:app``."""
+from app import create_app
+from geocoding import get_geocoder
+
+app = create_app()
+
+# Load the gazetteer before workers fork so they share it copy-on-write
+get_geocoder(app)